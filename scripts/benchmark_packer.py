@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+HueSurf Packer Benchmark
+
+Generates a deterministic synthetic wallpaper corpus and times each
+WallpaperPacker stage on its own: discovery (get_image_files),
+create_thumbnail, create_preview_image (mosaics), create_pack_zip,
+create_pack_tar_zst (with zstandard installed), calculate_file_hash and
+generate_manifest. Results include
+images/s, MB/s of source data and peak RSS, and can be saved as JSON and
+compared with a stored baseline. Each stage's peak RSS comes from one more
+run of it in a forked child process, so it isn't the high-water mark of the
+stages before it.
+
+The zip and tar.zst archives are also compared by total size and by the
+time it takes to extract every wallpaper one at a time (random access).
+
+Usage:
+    python scripts/benchmark_packer.py [--packs 4] [--images 8]
+        [--resolution 1920x1080] [--formats png,jpg] [--seed 0]
+        [--repeat 3] [--json] [--save FILE] [--baseline FILE]
+        [--max-regression 20]
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import PIL
+from PIL import Image, ImageDraw
+
+from pack_tarzst import index_path, read_entry, read_index, zstd_available
+from pack_wallpapers import WallpaperPacker
+
+FORMATS = {"png": ("PNG", {}), "jpg": ("JPEG", {"quality": 90}), "webp": ("WEBP", {})}
+
+STAGES = ["discovery", "thumbnail", "preview", "zip", "tar_zst", "hash", "manifest"]
+
+
+def make_wallpaper(path, size, fmt, seed):
+    """Gradient with random shapes; the same seed always draws the same image"""
+    rng = random.Random(seed)
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    img = Image.merge(
+        "RGB",
+        (
+            gradient,
+            gradient.transpose(Image.Transpose.ROTATE_90).resize(size),
+            Image.new("L", size, rng.randrange(256)),
+        ),
+    )
+    draw = ImageDraw.Draw(img)
+    for _ in range(24):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(width // 4) + 1, rng.randrange(height // 4) + 1
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.ellipse((x, y, x + w, y + h), fill=color)
+        else:
+            draw.rectangle((x, y, x + w, y + h), fill=color)
+
+    pil_format, options = FORMATS[fmt]
+    img.save(path, pil_format, **options)
+    return path
+
+
+def make_corpus(root, packs, images, resolution, formats, seed):
+    """Write packs of synthetic wallpapers, returning the pack directories"""
+    pack_dirs = []
+    for p in range(packs):
+        pack_dir = root / f"Pack{p:03d}"
+        pack_dir.mkdir(parents=True)
+        for i in range(images):
+            fmt = formats[i % len(formats)]
+            make_wallpaper(
+                pack_dir / f"wallpaper{i:03d}.{fmt}",
+                resolution,
+                fmt,
+                seed * 1_000_003 + p * 1009 + i,
+            )
+        pack_dirs.append(pack_dir)
+    return pack_dirs
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def extract_zip(path):
+    with zipfile.ZipFile(path) as zipf:
+        for name in zipf.namelist():
+            zipf.read(name)
+
+
+def extract_tar_zst(path):
+    index = read_index(index_path(path))
+    with open(path, "rb") as f:
+        for entry in index["entries"]:
+            read_entry(f, index, entry)
+
+
+def compare_archives(archives, source_bytes, repeat):
+    """
+    Size and one-entry-at-a-time extraction time of each archive format
+
+    Args:
+        archives: Dict of format -> archive paths
+    """
+    extract = {"zip": extract_zip, "tar.zst": extract_tar_zst}
+    results = {}
+    for fmt, paths in archives.items():
+        size = sum(path.stat().st_size for path in paths)
+        seconds = best_of(lambda: [extract[fmt](path) for path in paths], repeat)
+        results[fmt] = {
+            "bytes": size,
+            "ratio": round(size / source_bytes, 4),
+            "extract_seconds": round(seconds, 4),
+        }
+    return results
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_and_report_rss(func, conn):
+    func()
+    conn.send(peak_rss_mb())
+    conn.close()
+
+
+def stage_peak_rss_mb(func):
+    """
+    Peak RSS of a forked child process that runs func once
+
+    ru_maxrss only ever grows, so read in this process it would be the
+    biggest stage so far. A forked child starts at this process's current
+    RSS and grows by what func needs alone.
+
+    Returns:
+        Peak RSS in MB, or None where fork isn't available or func failed
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=run_and_report_rss, args=(func, sender))
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:
+        return None
+    finally:
+        process.join()
+
+
+def run_benchmark(args):
+    formats = args.formats.split(",")
+    width, height = (int(n) for n in args.resolution.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = Path(temp_dir) / "src"
+        pack_dirs = make_corpus(
+            source_dir, args.packs, args.images, (width, height), formats, args.seed
+        )
+        packer = WallpaperPacker(
+            source_dir=source_dir,
+            output_dir=Path(temp_dir) / "out",
+            duplicates="off",
+            palette=False,
+            variants=False,
+        )
+        packer.ensure_directories()
+        logging.getLogger("pack_wallpapers").setLevel(logging.WARNING)
+
+        image_files = {
+            pack_dir: packer.get_image_files(pack_dir) for pack_dir in pack_dirs
+        }
+        all_images = [path for paths in image_files.values() for path in paths]
+        total_bytes = sum(path.stat().st_size for path in all_images)
+        pack_infos = {
+            pack_dir: packer.load_pack_info(pack_dir) for pack_dir in pack_dirs
+        }
+
+        def discovery():
+            for pack_dir in pack_dirs:
+                packer.get_image_files(pack_dir)
+
+        def thumbnail():
+            for n, image_path in enumerate(all_images):
+                packer.create_thumbnail(
+                    image_path, packer.output_dir / "thumbs" / f"{n}.jpg"
+                )
+
+        def preview():
+            for pack_dir in pack_dirs:
+                packer.create_preview_image(
+                    pack_dir, image_files[pack_dir], pack_dir.name
+                )
+
+        def pack_zip():
+            for pack_dir in pack_dirs:
+                packer.create_pack_zip(
+                    pack_dir, pack_infos[pack_dir], image_files[pack_dir]
+                )
+
+        def pack_tar_zst():
+            for pack_dir in pack_dirs:
+                packer.create_pack_tar_zst(
+                    pack_dir, pack_infos[pack_dir], image_files[pack_dir]
+                )
+
+        def file_hash():
+            for image_path in all_images:
+                packer.calculate_file_hash(image_path)
+
+        # The manifest is built from real pack data, made once up front
+        packs_data = [packer.process_pack(pack_dir) for pack_dir in pack_dirs]
+        for pack_dir, pack_data in zip(pack_dirs, packs_data):
+            packer.pack_dirs[pack_data["id"]] = pack_dir
+
+        def manifest():
+            packer.generate_manifest(packs_data)
+
+        stage_funcs = {
+            "discovery": discovery,
+            "thumbnail": thumbnail,
+            "preview": preview,
+            "zip": pack_zip,
+            "tar_zst": pack_tar_zst,
+            "hash": file_hash,
+            "manifest": manifest,
+        }
+        names = [name for name in STAGES if name != "tar_zst" or zstd_available()]
+        # Before any stage runs here, so every child forks from the same RSS
+        peaks = {name: stage_peak_rss_mb(stage_funcs[name]) for name in names}
+        stages = {}
+        for name in names:
+            seconds = best_of(stage_funcs[name], args.repeat)
+            stages[name] = {
+                "seconds": round(seconds, 4),
+                "images_per_s": round(len(all_images) / seconds, 1),
+                "mb_per_s": round(total_bytes / 1024 / 1024 / seconds, 1),
+                "peak_rss_mb": peaks[name],
+            }
+
+        packs_dir = packer.output_dir / "packs"
+        archives = {"zip": sorted(packs_dir.glob("*.zip"))}
+        if zstd_available():
+            archives["tar.zst"] = sorted(packs_dir.glob("*.tar.zst"))
+        archive_results = compare_archives(archives, total_bytes, args.repeat)
+
+    return {
+        "corpus": {
+            "packs": args.packs,
+            "images_per_pack": args.images,
+            "resolution": f"{width}x{height}",
+            "formats": formats,
+            "seed": args.seed,
+            "images": len(all_images),
+            "source_mb": round(total_bytes / 1024 / 1024, 2),
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+        },
+        "stages": stages,
+        "archives": archive_results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """
+    Print each stage's time against the baseline
+
+    Returns:
+        Names of stages that got slower by more than max_regression percent
+    """
+    regressions = []
+    print(f"\n{'Stage':<10} {'Baseline':>10} {'Now':>10} {'Change':>8}")
+    for name in results["stages"]:
+        before = baseline.get("stages", {}).get(name, {}).get("seconds")
+        after = results["stages"][name]["seconds"]
+        if not before:
+            print(f"{name:<10} {'-':>10} {after * 1000:>8.1f}ms")
+            continue
+        change = (after - before) / before * 100
+        flag = ""
+        if change > max_regression:
+            regressions.append(name)
+            flag = " ❌"
+        print(
+            f"{name:<10} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms "
+            f"{change:>+7.1f}%{flag}"
+        )
+    if baseline.get("corpus") != results["corpus"]:
+        print("⚠️  Baseline was measured on a different corpus")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wallpaper packer")
+    parser.add_argument("--packs", type=int, default=4, help="Number of packs")
+    parser.add_argument("--images", type=int, default=8, help="Images per pack")
+    parser.add_argument(
+        "--resolution", default="1920x1080", help="Image size, WIDTHxHEIGHT"
+    )
+    parser.add_argument(
+        "--formats",
+        default="png,jpg",
+        help=f"Comma-separated image formats, cycled per image ({', '.join(FORMATS)})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per stage (best is kept)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=20.0,
+        help="Percent slowdown against the baseline that fails the run (default: 20)",
+    )
+    args = parser.parse_args()
+
+    for fmt in args.formats.split(","):
+        if fmt not in FORMATS:
+            parser.error(f"Unknown format: {fmt}")
+
+    results = run_benchmark(args)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        corpus = results["corpus"]
+        print(
+            f"{corpus['images']} images ({corpus['resolution']}, "
+            f"{'/'.join(corpus['formats'])}), {corpus['source_mb']} MB"
+        )
+        print(
+            f"{'Stage':<10} {'Time':>10} {'Images/s':>10} {'MB/s':>8} {'Peak RSS':>10}"
+        )
+        for name, stage in results["stages"].items():
+            rss = stage["peak_rss_mb"]
+            print(
+                f"{name:<10} {stage['seconds'] * 1000:>8.1f}ms "
+                f"{stage['images_per_s']:>10.1f} {stage['mb_per_s']:>8.1f} "
+                f"{f'{rss:.1f} MB' if rss is not None else '-':>10}"
+            )
+        print(f"\n{'Archive':<10} {'Size':>10} {'Ratio':>8} {'Extract':>10}")
+        for fmt, archive in results["archives"].items():
+            print(
+                f"{fmt:<10} {archive['bytes'] / 1024 / 1024:>7.2f} MB "
+                f"{archive['ratio']:>8.3f} {archive['extract_seconds'] * 1000:>8.1f}ms"
+            )
+        print(f"Peak RSS: {results['peak_rss_mb']} MB")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HueSurf Thumbnail Benchmark
+
+Times the original full-decode thumbnail path against the shrink-on-load
+engine in thumbnails.py on synthetic 4K and 8K sources (JPEG, opaque PNG and
+transparent PNG).
+
+Usage:
+    python scripts/benchmark_thumbnails.py [--repeat 3] [--json]
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from thumbnails import render_thumbnails
+
+RESOLUTIONS = {"4K": (3840, 2160), "8K": (7680, 4320)}
+SIZES = [(300, 200), (600, 400)]
+
+
+def make_source(path, size, mode, fmt):
+    """Deterministic gradient with shapes so codecs have something to chew on"""
+    width, height = size
+    vertical = Image.linear_gradient("L").resize(size)
+    horizontal = vertical.transpose(Image.Transpose.ROTATE_90).resize(size)
+    img = Image.merge("RGB", (vertical, horizontal, Image.new("L", size, 128)))
+
+    draw = ImageDraw.Draw(img)
+    for x in range(0, width, width // 16):
+        draw.ellipse(
+            (x, height // 4, x + width // 20, height // 2), fill=(x % 255, 80, 160)
+        )
+    if mode == "RGBA":
+        img.putalpha(horizontal)
+
+    if fmt == "JPEG":
+        img.save(path, fmt, quality=90)
+    else:
+        img.save(path, fmt)
+    return path
+
+
+def legacy_thumbnails(image_path, sizes):
+    """The packer's original path: full decode and composite, then resample"""
+    thumbs = []
+    for size in sizes:
+        with Image.open(image_path) as img:
+            if img.mode in ("RGBA", "LA", "P"):
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                if img.mode == "P":
+                    img = img.convert("RGBA")
+                background.paste(
+                    img, mask=img.split()[-1] if img.mode == "RGBA" else None
+                )
+                img = background
+            img.thumbnail(size, Image.Resampling.LANCZOS)
+            thumbs.append(img)
+    return thumbs
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thumbnail generation")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per case (best is kept)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    cases = [
+        ("JPEG", "RGB", ".jpg"),
+        ("PNG", "RGB", ".png"),
+        ("PNG", "RGBA", ".png"),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label, size in RESOLUTIONS.items():
+            for fmt, mode, suffix in cases:
+                source = make_source(
+                    Path(temp_dir) / f"{label}-{mode}{suffix}", size, mode, fmt
+                )
+                before = best_of(lambda: legacy_thumbnails(source, SIZES), args.repeat)
+                after = best_of(lambda: render_thumbnails(source, SIZES), args.repeat)
+                results.append(
+                    {
+                        "source": f"{label} {fmt} {mode}",
+                        "before_ms": round(before * 1000, 1),
+                        "after_ms": round(after * 1000, 1),
+                        "speedup": round(before / after, 2),
+                    }
+                )
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+
+    print(f"{'Source':<16} {'Before':>10} {'After':>10} {'Speedup':>8}")
+    for result in results:
+        print(
+            f"{result['source']:<16} {result['before_ms']:>8.1f}ms "
+            f"{result['after_ms']:>8.1f}ms {result['speedup']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+HueSurf Build Report
+
+Per-pack and per-stage timing of a packing run, with the bytes each stage
+read and wrote and the peak memory of the packer and its workers, written
+as JSON with the packer's --report option. Stages:
+
+- scan: listing source directories and fingerprinting their files
+- metadata: loading pack_info.json
+- hash: hashing sources outside the zip stage (the zip stage hashes the
+  files it copies itself)
+- analysis, optimize, variants: the optional image stages
+- zip, thumbnail: building a pack's archive and preview
+- manifest: writing the manifest and catalog index
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Functions listed in the log after a pack is profiled
+PROFILE_TOP = 20
+
+
+def peak_rss_bytes(who=resource.RUSAGE_SELF):
+    """Peak resident set size of this process (or of its largest child)"""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def empty_record():
+    return {"seconds": 0.0, "calls": 0, "bytes_read": 0, "bytes_written": 0}
+
+
+def add_record(total, record):
+    for key, value in record.items():
+        total[key] += value
+
+
+class BuildReport:
+    def __init__(self):
+        """Start an empty report; pack None holds stages outside any pack"""
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.packs = {}
+        self.peak_worker_rss = 0
+
+    def record(self, stage, pack=None):
+        """Mutable counters of one stage of one pack"""
+        stages = self.packs.setdefault(pack, {})
+        return stages.setdefault(stage, empty_record())
+
+    @contextmanager
+    def stage(self, stage, pack=None):
+        """
+        Time a block as part of a stage
+
+        Yields the stage record, so the block can add bytes_read and
+        bytes_written.
+        """
+        record = self.record(stage, pack)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.perf_counter() - start
+            record["calls"] += 1
+
+    def merge(self, packs, peak_rss=0):
+        """Add the stage records and peak memory of a worker's report"""
+        for pack, stages in packs.items():
+            for stage, record in stages.items():
+                add_record(self.record(stage, pack), record)
+        self.peak_worker_rss = max(self.peak_worker_rss, peak_rss)
+
+    def to_dict(self, stats=None):
+        """Report with per-pack stages and their totals"""
+        totals = {}
+        packs = {}
+        for pack, stages in self.packs.items():
+            for stage, record in stages.items():
+                add_record(totals.setdefault(stage, empty_record()), record)
+            if pack is not None:
+                packs[pack] = {
+                    "seconds": round(sum(r["seconds"] for r in stages.values()), 4),
+                    "stages": {
+                        stage: {**record, "seconds": round(record["seconds"], 4)}
+                        for stage, record in sorted(stages.items())
+                    },
+                }
+        for record in totals.values():
+            record["seconds"] = round(record["seconds"], 4)
+
+        return {
+            "started": self.started.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.start_time, 4),
+            "stages": dict(sorted(totals.items())),
+            "packs": dict(sorted(packs.items())),
+            "bytes_read": sum(r["bytes_read"] for r in totals.values()),
+            "bytes_written": sum(r["bytes_written"] for r in totals.values()),
+            "peak_rss_bytes": {
+                "main": peak_rss_bytes(),
+                "workers": max(
+                    self.peak_worker_rss, peak_rss_bytes(resource.RUSAGE_CHILDREN)
+                ),
+            },
+            "stats": stats or {},
+        }
+
+    def write(self, path, stats=None):
+        """Write the report as JSON, atomically"""
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(stats), f, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"📝 Wrote build report: {path}")
+
+
+def profile_call(path, func, *args):
+    """
+    Run func under cProfile and dump the pstats data to path
+
+    The functions with the most cumulative time are logged too.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(
+            PROFILE_TOP
+        )
+        logger.info(f"🔬 Profile written to {path}\n{summary.getvalue()}")
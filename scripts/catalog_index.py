@@ -0,0 +1,132 @@
+"""
+HueSurf Catalog Index
+
+Writes the binary catalog index the website mmaps to answer
+/api/wallpapers/packs and /api/wallpapers/all. The format and its reader
+ship with the website (website/catalog_reader.py), which can be deployed
+without scripts/; this module adds the writer and the wallpaper records.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import os
+import sys
+from pathlib import Path
+
+WEBSITE_DIR = Path(__file__).resolve().parent.parent / "website"
+if str(WEBSITE_DIR) not in sys.path:
+    sys.path.append(str(WEBSITE_DIR))
+
+from catalog_reader import (  # noqa: E402
+    FORMAT_VERSION,
+    HEADER,
+    INDEX_FILENAME,
+    MAGIC,
+    ORDER_ENTRY,
+    PACK_RECORD,
+    WALLPAPER_RECORD,
+    encode_json,
+    pack_api_record,
+)
+
+# INDEX_FILENAME and pack_api_record are the reader's, re-exported for the packer
+__all__ = [
+    "INDEX_FILENAME",
+    "WEB_IMAGE_EXTENSIONS",
+    "pack_api_record",
+    "wallpaper_api_record",
+    "write_catalog_index",
+]
+
+# Formats listed by /api/wallpapers/all
+WEB_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def wallpaper_api_record(pack_dir_name, file_path, wp_meta, variants=None):
+    """Shape a source wallpaper as returned by /api/wallpapers/all"""
+    record = {
+        "name": wp_meta.get("name", file_path.stem),
+        "pack": pack_dir_name,
+        "filename": file_path.name,
+        "path": f"/api/wallpapers/single/{pack_dir_name}/{file_path.name}",
+        "size_kb": round(file_path.stat().st_size / 1024, 2),
+        "description": wp_meta.get("description", ""),
+        "tags": wp_meta.get("tags", []),
+    }
+    # Resolution variants are only known for packed wallpapers
+    if variants:
+        record["variants"] = variants
+    return record
+
+
+def write_catalog_index(index_path, packs, meta):
+    """
+    Write the index atomically
+
+    Args:
+        index_path: Destination file (replaced with os.replace)
+        packs: List of (pack_id, pack_record, [(filename, wallpaper_record)])
+            in manifest order
+        meta: Dict of top-level response fields (manifest_version, generated)
+    """
+    strings = bytearray()
+
+    def add_string(data):
+        offset = len(strings)
+        strings.extend(data)
+        return offset, len(data)
+
+    meta_ref = add_string(encode_json(meta))
+
+    pack_records = []
+    wallpaper_records = []
+    for pack_id, pack_record, wallpapers in packs:
+        first = len(wallpaper_records)
+        for filename, wallpaper_record in sorted(wallpapers, key=lambda w: w[0]):
+            wallpaper_records.append(
+                add_string(filename.encode("utf-8"))
+                + add_string(encode_json(wallpaper_record))
+            )
+        pack_records.append(
+            add_string(pack_id.encode("utf-8"))
+            + add_string(encode_json(pack_record))
+            + (first, len(wallpaper_records) - first)
+        )
+
+    id_order = sorted(range(len(packs)), key=lambda i: packs[i][0].encode("utf-8"))
+
+    pack_table_offset = HEADER.size
+    order_offset = pack_table_offset + PACK_RECORD.size * len(pack_records)
+    wallpaper_table_offset = order_offset + ORDER_ENTRY.size * len(id_order)
+    string_offset = wallpaper_table_offset + WALLPAPER_RECORD.size * len(
+        wallpaper_records
+    )
+
+    index_path = Path(index_path)
+    tmp_path = index_path.with_name(f".{index_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                len(pack_records),
+                len(wallpaper_records),
+                *meta_ref,
+                pack_table_offset,
+                order_offset,
+                wallpaper_table_offset,
+                string_offset,
+            )
+        )
+        for record in pack_records:
+            f.write(PACK_RECORD.pack(*record))
+        for index in id_order:
+            f.write(ORDER_ENTRY.pack(index))
+        for record in wallpaper_records:
+            f.write(WALLPAPER_RECORD.pack(*record))
+        f.write(strings)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, index_path)
+    return index_path
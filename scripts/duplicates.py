@@ -0,0 +1,174 @@
+"""
+HueSurf Near-Duplicate Detection
+
+Groups wallpapers whose perceptual hashes are within a Hamming distance of
+each other. Candidates come from a BK-tree over the 64-bit hashes, so each
+image is compared with the few hashes near it instead of with every other
+image, and matches are merged into clusters with union-find. Identical
+files (same SHA256) always end up in the same cluster.
+
+Clusters chain: A near B and B near C puts A and C in one cluster however
+far apart they are. pick_keepers() therefore only drops an image for a
+keeper it is itself near.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes"""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Metric tree over integer hashes with Hamming distance"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        """Insert a hash with the item it belongs to"""
+        node = [value, [item], {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            if distance == 0:
+                current[1].append(item)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, radius):
+        """Items whose hash is within radius of value"""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.extend(items)
+            # Triangle inequality: only these subtrees can hold matches
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the lower index as root so clusters are deterministic
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def is_near_duplicate(a, b, threshold, confirm_threshold=None):
+    """Whether two images (dicts as for find_clusters) are near-duplicates"""
+    if a["sha256"] == b["sha256"]:
+        return True
+    if hamming(int(a["hash"], 16), int(b["hash"], 16)) > threshold:
+        return False
+    return (
+        confirm_threshold is None
+        or not a.get("confirm")
+        or not b.get("confirm")
+        or hamming(int(a["confirm"], 16), int(b["confirm"], 16)) <= confirm_threshold
+    )
+
+
+def pick_keepers(images, cluster, rank, threshold, confirm_threshold=None):
+    """
+    Split a cluster into the images to keep and the duplicates to drop
+
+    Members are taken best first; each is dropped as a duplicate of the
+    first keeper it's near, or kept when it isn't near any.
+
+    Args:
+        images: The list given to find_clusters
+        cluster: One of its clusters
+        rank: Sort key of an index, best copy first
+        threshold, confirm_threshold: As for find_clusters
+
+    Returns:
+        (keeper indices, dict of dropped index -> index of its keeper)
+    """
+    keepers = []
+    dropped = {}
+    for i in sorted(cluster, key=rank):
+        keeper = next(
+            (
+                k
+                for k in keepers
+                if is_near_duplicate(images[k], images[i], threshold, confirm_threshold)
+            ),
+            None,
+        )
+        if keeper is None:
+            keepers.append(i)
+        else:
+            dropped[i] = keeper
+    return keepers, dropped
+
+
+def find_clusters(images, threshold, confirm_threshold=None):
+    """
+    Cluster near-duplicate images
+
+    Args:
+        images: List of dicts with "sha256" and hex "hash" (the primary
+            perceptual hash), optionally "confirm" (a second hash that must
+            also be within confirm_threshold)
+        threshold: Maximum Hamming distance of the primary hash
+        confirm_threshold: Maximum distance of the confirming hash
+
+    Returns:
+        List of clusters, each a sorted list of indices into images; only
+        clusters of two or more images are returned
+    """
+    hashes = [int(image["hash"], 16) for image in images]
+    confirms = [
+        int(image["confirm"], 16) if image.get("confirm") else None for image in images
+    ]
+    union_find = UnionFind(len(images))
+
+    by_sha = {}
+    for i, image in enumerate(images):
+        by_sha.setdefault(image["sha256"], []).append(i)
+    for indices in by_sha.values():
+        for i in indices[1:]:
+            union_find.union(indices[0], i)
+
+    tree = BKTree()
+    for i, value in enumerate(hashes):
+        for j in tree.search(value, threshold):
+            if (
+                confirm_threshold is None
+                or confirms[i] is None
+                or confirms[j] is None
+                or hamming(confirms[i], confirms[j]) <= confirm_threshold
+            ):
+                union_find.union(i, j)
+        tree.add(value, i)
+
+    clusters = {}
+    for i in range(len(images)):
+        clusters.setdefault(union_find.find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
@@ -0,0 +1,278 @@
+"""
+HueSurf Image Analysis
+
+Per-image measurements the packer derives from pixels, computed from one
+small decode of each source and cached by the source's SHA256 so every
+distinct image is analysed once, whichever pack or run it turns up in:
+
+- dhash: 64-bit difference hash (row-wise brightness gradients of a 9x8
+  greyscale copy)
+- phash: 64-bit perceptual hash (signs of the low-frequency 8x8 block of a
+  32x32 DCT, compared with their median); needs NumPy
+- palette: dominant colours with their share of the image (k-means with
+  NumPy, Pillow's median cut without it) and the average luminance
+
+Hashes are stored as 16-digit hex strings, colours as "#rrggbb".
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import json
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+from publish import atomic_output
+from thumbnails import flatten, open_reduced
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, pHash needs it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_FILENAME = ".analysis_cache.json"
+# Bump when an analyzer changes so cached results are recomputed
+ANALYSIS_VERSION = 1
+
+# Every analyzer works from a copy at most this big
+ANALYSIS_BOX = (128, 128)
+
+# Dominant colours per wallpaper
+PALETTE_SIZE = 5
+KMEANS_ITERATIONS = 12
+
+# Rec. 709 luma weights
+LUMA = (0.2126, 0.7152, 0.0722)
+
+
+def dhash(img):
+    """Difference hash of an RGB or L image"""
+    small = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    if np is not None:
+        pixels = np.asarray(small, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+        return bits_to_hex(bits)
+
+    pixels = list(small.getdata())
+    bits = [
+        pixels[row * 9 + col + 1] > pixels[row * 9 + col]
+        for row in range(8)
+        for col in range(8)
+    ]
+    return bits_to_hex(bits)
+
+
+def _dct_matrix(size):
+    """Orthonormal DCT-II matrix, so dct(x) = D @ x @ D.T"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32) if np is not None else None
+
+
+def phash(img):
+    """Perceptual hash of an RGB or L image"""
+    small = img.convert("L").resize((32, 32), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.float64)
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8].ravel()
+    # The DC term only carries overall brightness
+    return bits_to_hex(low > np.median(low[1:]))
+
+
+def bits_to_hex(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | bool(bit)
+    return f"{value:016x}"
+
+
+def kmeans(points, k, weights=None, iterations=KMEANS_ITERATIONS):
+    """
+    Weighted k-means on an (n, 3) float array
+
+    Centres start at evenly spaced quantiles of the points sorted by
+    brightness, so results are deterministic.
+
+    Returns:
+        (centres, total weight of each centre), heaviest first
+    """
+    if weights is None:
+        weights = np.ones(len(points))
+    k = min(k, len(points))
+    order = np.argsort(points @ np.array(LUMA))
+    centres = points[order[np.linspace(0, len(points) - 1, k).astype(int)]]
+
+    for _ in range(iterations):
+        distances = ((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        totals = np.bincount(labels, weights=weights, minlength=k)
+        sums = np.stack(
+            [
+                np.bincount(labels, weights=weights * points[:, c], minlength=k)
+                for c in range(3)
+            ],
+            axis=1,
+        )
+        # Empty clusters keep their previous centre
+        filled = totals > 0
+        updated = centres.copy()
+        updated[filled] = sums[filled] / totals[filled, None]
+        if np.allclose(updated, centres):
+            break
+        centres = updated
+
+    heaviest = np.argsort(-totals)
+    return centres[heaviest], totals[heaviest]
+
+
+def hex_color(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*(int(round(c)) for c in rgb))
+
+
+def palette(img):
+    """Dominant colours and average luminance of an RGB image"""
+    rgb = img.convert("RGB")
+    if np is not None:
+        points = np.asarray(rgb, dtype=np.float64).reshape(-1, 3)
+        centres, totals = kmeans(points, PALETTE_SIZE)
+        colors = [
+            {"color": hex_color(centre), "share": round(float(total) / len(points), 4)}
+            for centre, total in zip(centres, totals)
+            if total > 0
+        ]
+        luminance = float((points @ np.array(LUMA)).mean() / 255)
+    else:
+        quantized = rgb.quantize(PALETTE_SIZE, Image.Quantize.MEDIANCUT)
+        flat = quantized.getpalette()
+        pixel_count = rgb.width * rgb.height
+        colors = [
+            {
+                "color": hex_color(flat[index * 3 : index * 3 + 3]),
+                "share": round(count / pixel_count, 4),
+            }
+            for count, index in sorted(quantized.getcolors(), reverse=True)
+        ]
+        luminance = sum(
+            weight * sum(i * n for i, n in enumerate(band.histogram()))
+            for weight, band in zip(LUMA, rgb.split())
+        ) / (pixel_count * 255)
+    return {"colors": colors, "luminance": round(luminance, 4)}
+
+
+def combine_palettes(palettes, k=3):
+    """
+    Dominant colours of a set of wallpapers from their own palettes
+
+    Returns:
+        Dict with "colors" (heaviest first, as in palette()) and the mean
+        "luminance"
+    """
+    entries = [entry for p in palettes for entry in p["colors"]]
+    if not entries:
+        return {"colors": [], "luminance": None}
+    luminance = round(sum(p["luminance"] for p in palettes) / len(palettes), 4)
+
+    if np is not None:
+        points = np.array(
+            [[int(e["color"][i : i + 2], 16) for i in (1, 3, 5)] for e in entries],
+            dtype=np.float64,
+        )
+        weights = np.array([e["share"] for e in entries])
+        centres, totals = kmeans(points, k, weights)
+        colors = [
+            {
+                "color": hex_color(centre),
+                "share": round(float(total / weights.sum()), 4),
+            }
+            for centre, total in zip(centres, totals)
+            if total > 0
+        ]
+    else:
+        # Without NumPy, take the colours covering the most wallpaper area
+        shares = {}
+        for entry in entries:
+            shares[entry["color"]] = shares.get(entry["color"], 0) + entry["share"]
+        total = sum(shares.values())
+        colors = [
+            {"color": color, "share": round(share / total, 4)}
+            for color, share in sorted(shares.items(), key=lambda item: -item[1])[:k]
+        ]
+    return {"colors": colors, "luminance": luminance}
+
+
+ANALYZERS = {"dhash": dhash, "palette": palette}
+if np is not None:
+    ANALYZERS["phash"] = phash
+
+
+def analyze_image(image_path, keys):
+    """
+    Decode an image once, small, and run the named analyzers on it
+
+    Returns:
+        Dict with the source "width" and "height" and one value per key
+    """
+    with Image.open(image_path) as img:
+        result = {"width": img.width, "height": img.height}
+        base = flatten(open_reduced(img, ANALYSIS_BOX))
+    base.thumbnail(ANALYSIS_BOX, Image.Resampling.LANCZOS)
+    for key in keys:
+        result[key] = ANALYZERS[key](base)
+    return result
+
+
+class AnalysisCache:
+    def __init__(self, path=None, images=None):
+        """
+        Initialize the analysis cache
+
+        Args:
+            path: JSON file the cache is saved to
+            images: Initial results by source SHA256
+        """
+        self.path = Path(path) if path else None
+        self.images = images or {}
+
+    @classmethod
+    def load(cls, path):
+        """Load a cache file, starting empty if it's missing or outdated"""
+        path = Path(path)
+        if path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == ANALYSIS_VERSION:
+                    return cls(path, data.get("images", {}))
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable analysis cache {path}: {e}")
+        return cls(path)
+
+    def save(self):
+        """Write the cache atomically"""
+        with atomic_output(self.path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": ANALYSIS_VERSION, "images": self.images}, f)
+
+    def missing(self, sha256, keys):
+        """Analyzers that haven't run on a source yet"""
+        known = self.images.get(sha256, {})
+        return [key for key in keys if key not in known]
+
+    def get(self, sha256):
+        return self.images.get(sha256, {})
+
+    def update(self, sha256, result):
+        self.images.setdefault(sha256, {}).update(result)
+
+    def prune(self, keep_hashes):
+        """Forget sources no pack uses any more"""
+        for sha256 in set(self.images) - set(keep_hashes):
+            del self.images[sha256]
@@ -0,0 +1,158 @@
+"""
+HueSurf Pack Mosaics
+
+Builds a pack's preview as a collage of up to MOSAIC_TILES wallpapers. The
+tiles are laid out in justified rows: every row keeps its wallpapers' aspect
+ratios and spans the full width, and the row count is the one whose natural
+height comes closest to the canvas, so tiles only lose a thin crop when the
+rows are stretched to fill it.
+
+Each source is decoded once, reduced to about twice the canvas (see
+thumbnails.open_reduced); the first one's decode also yields the pack's
+300x200 thumbnail. Tiles are resized and centre-cropped from those decodes
+and pasted into the canvas without touching the sources again. The mosaic
+is saved as a progressive JPEG and as WebP.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+from PIL import Image
+
+from publish import atomic_output
+from thumbnails import BACKGROUND, OVERSAMPLE, flatten, open_reduced
+
+# Preview canvas, tiles per preview and the gap between tiles, in pixels
+MOSAIC_SIZE = (600, 400)
+MOSAIC_TILES = 6
+GUTTER = 2
+
+JPEG_OPTIONS = {"quality": 85, "optimize": True, "progressive": True}
+WEBP_OPTIONS = {"quality": 80, "method": 4}
+
+
+def pick_tiles(count, tiles=MOSAIC_TILES):
+    """Indices of the images shown, spread over the pack; always includes 0"""
+    tiles = max(1, min(tiles, count))
+    return [i * count // tiles for i in range(tiles)]
+
+
+def split_rows(aspects, rows):
+    """Split aspect ratios into rows of consecutive tiles with similar widths"""
+    target = sum(aspects) / rows
+    layout = [[]]
+    total = 0.0
+    for index, aspect in enumerate(aspects):
+        rows_left = rows - len(layout)
+        images_left = len(aspects) - index
+        if (
+            layout[-1]
+            and rows_left
+            and (total + aspect / 2 > target * len(layout) or images_left == rows_left)
+        ):
+            layout.append([])
+        layout[-1].append(index)
+        total += aspect
+    return layout
+
+
+def row_heights(aspects, layout, width, gutter):
+    """Height of each row when its tiles keep their aspect ratio at full width"""
+    return [
+        (width - gutter * (len(row) - 1)) / sum(aspects[i] for i in row)
+        for row in layout
+    ]
+
+
+def justified_layout(aspects, size=MOSAIC_SIZE, gutter=GUTTER):
+    """
+    Tile boxes for images of the given aspect ratios (width / height)
+
+    Returns:
+        List of (x, y, width, height) boxes, in the order of aspects
+    """
+    width, height = size
+    layout = min(
+        (split_rows(aspects, rows) for rows in range(1, len(aspects) + 1)),
+        key=lambda layout: abs(
+            sum(row_heights(aspects, layout, width, gutter))
+            + gutter * (len(layout) - 1)
+            - height
+        ),
+    )
+
+    # Stretch or squeeze the rows in proportion to fill the canvas
+    naturals = row_heights(aspects, layout, width, gutter)
+    available = height - gutter * (len(layout) - 1)
+    boxes = [None] * len(aspects)
+    y = 0
+    for row_number, (row, natural) in enumerate(zip(layout, naturals)):
+        if row_number == len(layout) - 1:
+            row_height = height - y
+        else:
+            row_height = round(available * natural / sum(naturals))
+        row_width = width - gutter * (len(row) - 1)
+        row_aspect = sum(aspects[i] for i in row)
+        x = 0
+        for position, index in enumerate(row):
+            if position == len(row) - 1:
+                tile_width = width - x
+            else:
+                tile_width = round(row_width * aspects[index] / row_aspect)
+            boxes[index] = (x, y, tile_width, row_height)
+            x += tile_width + gutter
+        y += row_height + gutter
+    return boxes
+
+
+def cover(img, size):
+    """Resize img to cover size and crop the centre to exactly size"""
+    scale = max(size[0] / img.width, size[1] / img.height)
+    resized = (
+        max(size[0], round(img.width * scale)),
+        max(size[1], round(img.height * scale)),
+    )
+    left = (resized[0] - size[0]) // 2
+    top = (resized[1] - size[1]) // 2
+    return img.resize(
+        size,
+        Image.Resampling.LANCZOS,
+        box=(
+            left / scale,
+            top / scale,
+            (left + size[0]) / scale,
+            (top + size[1]) / scale,
+        ),
+        reducing_gap=OVERSAMPLE,
+    )
+
+
+def decode_tile(image_path, size=MOSAIC_SIZE):
+    """
+    Decode a source once, reduced to what any tile of the canvas needs
+
+    A tile can be as wide or as tall as the canvas, so the source is reduced
+    to fit a square of the canvas's longer side.
+    """
+    side = max(size)
+    with Image.open(image_path) as img:
+        base = open_reduced(img, (side, side))
+        base.load()
+    return base
+
+
+def compose_mosaic(images, size=MOSAIC_SIZE, gutter=GUTTER):
+    """Lay decoded images out on an RGB canvas"""
+    canvas = Image.new("RGB", size, BACKGROUND)
+    boxes = justified_layout([img.width / img.height for img in images], size, gutter)
+    for img, (x, y, width, height) in zip(images, boxes):
+        canvas.paste(flatten(cover(img, (width, height))), (x, y))
+    return canvas
+
+
+def save_mosaic(canvas, jpeg_path, webp_path):
+    """Write the mosaic as a progressive JPEG and a WebP"""
+    with atomic_output(jpeg_path) as tmp_path:
+        canvas.save(tmp_path, "JPEG", **JPEG_OPTIONS)
+    with atomic_output(webp_path) as tmp_path:
+        canvas.save(tmp_path, "WEBP", **WEBP_OPTIONS)
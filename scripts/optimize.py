@@ -0,0 +1,210 @@
+"""
+HueSurf Lossless Image Optimizer
+
+Shrinks wallpapers before they're packed without changing a single pixel:
+
+- PNG: re-encoded at maximum zlib effort with ancillary chunks (text, EXIF,
+  timestamps) dropped, and an alpha channel that is fully opaque removed
+- JPEG: EXIF/XMP, comment and other application segments are cut out of the
+  byte stream; the entropy-coded data is untouched, so nothing is re-encoded
+
+An EXIF Orientation other than upright is written back as a minimal EXIF
+block, since viewers rotate the image by it.
+
+ICC profiles are dropped unless keep_icc is set. Every result is decoded
+and compared with the source; it's only used when the pixels are identical
+and the file is smaller.
+
+Results are cached by the source's SHA256 in a content-addressed directory,
+so each distinct file is optimized once no matter how many packs or runs
+see it.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import io
+import logging
+import os
+import struct
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from thumbnails import check_pixel_budget
+
+logger = logging.getLogger(__name__)
+
+# Cache directory inside the packer output
+OPTIMIZE_CACHE_DIRNAME = ".optimized"
+
+# Bumped when optimized bytes change for the same settings, so older cache
+# entries and packs built from them are redone
+OPTIMIZE_VERSION = 2
+
+# Marker suffix for sources that optimizing didn't shrink
+KEEP_ORIGINAL_SUFFIX = ".orig"
+
+# JPEG APPn segments that affect decoding and are always kept: JFIF (APP0)
+# and Adobe (APP14, colour transform)
+JPEG_KEEP_MARKERS = {0xE0, 0xEE}
+JPEG_ICC_MARKER = 0xE2
+JPEG_EXIF_MARKER = 0xE1
+EXIF_HEADER = b"Exif\x00\x00"
+ORIENTATION_TAG = 0x0112
+
+
+def orientation_exif(exif):
+    """EXIF block holding only exif's Orientation, or None when upright"""
+    orientation = exif.get(ORIENTATION_TAG, 1)
+    if orientation == 1:
+        return None
+    kept = Image.Exif()
+    kept[ORIENTATION_TAG] = orientation
+    return kept.tobytes()
+
+
+def optimize_png(data, keep_icc=False):
+    """Losslessly re-encode PNG bytes"""
+    with Image.open(io.BytesIO(data)) as img:
+        check_pixel_budget(img)
+        img.load()
+        options = {"optimize": True}
+        options["icc_profile"] = img.info.get("icc_profile") if keep_icc else None
+        exif = orientation_exif(img.getexif())
+        if exif:
+            options["exif"] = exif
+        if img.mode == "RGBA" and img.getchannel("A").getextrema() == (255, 255):
+            img = img.convert("RGB")
+        output = io.BytesIO()
+        img.save(output, "PNG", **options)
+    return output.getvalue()
+
+
+def strip_jpeg(data, keep_icc=False):
+    """Drop metadata segments from JPEG bytes, leaving the image data as is"""
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+
+    output = bytearray(data[:2])
+    position = 2
+    while position < len(data):
+        if data[position] != 0xFF:
+            raise ValueError(f"Bad JPEG marker at byte {position}")
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker == 0xDA:
+            # Start of scan: the rest is image data
+            output += data[position:]
+            return bytes(output)
+
+        (length,) = struct.unpack(">H", data[position + 2 : position + 4])
+        segment = data[position : position + 2 + length]
+        is_app = 0xE0 <= marker <= 0xEF
+        keep = (
+            not (is_app or marker == 0xFE)
+            or marker in JPEG_KEEP_MARKERS
+            or (keep_icc and marker == JPEG_ICC_MARKER)
+        )
+        if keep:
+            output += segment
+        elif marker == JPEG_EXIF_MARKER and segment[4:10] == EXIF_HEADER:
+            exif = Image.Exif()
+            exif.load(segment[4:])
+            block = orientation_exif(exif)
+            if block:
+                output += b"\xff\xe1" + struct.pack(">H", len(block) + 2) + block
+        position += 2 + length
+
+    raise ValueError("JPEG has no image data")
+
+
+OPTIMIZERS = {".png": optimize_png, ".jpg": strip_jpeg, ".jpeg": strip_jpeg}
+
+
+def pixels_equal(original, optimized):
+    """
+    Decode both encodings and check they hold the same pixels, as displayed
+    (after their EXIF Orientation is applied)
+    """
+    with Image.open(io.BytesIO(original)) as a, Image.open(io.BytesIO(optimized)) as b:
+        if a.size != b.size:
+            return False
+        check_pixel_budget(a)
+        a = ImageOps.exif_transpose(a)
+        b = ImageOps.exif_transpose(b)
+        if a.size != b.size:
+            return False
+        if a.mode == b.mode and a.mode != "P":
+            return a.tobytes() == b.tobytes()
+        # Palette or alpha changes: compare what the pixels look like
+        return a.convert("RGBA").tobytes() == b.convert("RGBA").tobytes()
+
+
+class OptimizeCache:
+    def __init__(self, cache_dir, keep_icc=False):
+        """
+        Initialize the optimizer cache
+
+        Args:
+            cache_dir: Content-addressed directory optimized files are kept in
+            keep_icc: Keep embedded ICC colour profiles
+        """
+        self.cache_dir = Path(cache_dir)
+        self.keep_icc = keep_icc
+
+    def config(self):
+        """Settings that change optimized bytes, for build cache digests"""
+        return {"keep_icc": self.keep_icc, "version": OPTIMIZE_VERSION}
+
+    def entry_path(self, sha256, suffix):
+        tag = "icc" if self.keep_icc else "strip"
+        return self.cache_dir / sha256[:2] / f"{sha256}.{tag}{OPTIMIZE_VERSION}{suffix}"
+
+    def lookup(self, source_path, sha256):
+        """
+        Optimized copy of a source, optimizing it on a cache miss
+
+        Returns:
+            (path, bytes saved); the path is source_path itself when the
+            format isn't supported or optimizing didn't help
+        """
+        suffix = source_path.suffix.lower()
+        optimizer = OPTIMIZERS.get(suffix)
+        if optimizer is None:
+            return source_path, 0
+
+        cached = self.entry_path(sha256, suffix)
+        if cached.exists():
+            return cached, source_path.stat().st_size - cached.stat().st_size
+        if self.entry_path(sha256, KEEP_ORIGINAL_SUFFIX).exists():
+            return source_path, 0
+
+        original = source_path.read_bytes()
+        optimized = optimizer(original, self.keep_icc)
+        if len(optimized) < len(original) and not pixels_equal(original, optimized):
+            logger.warning(f"Optimizing {source_path} changed pixels, keeping original")
+            optimized = original
+        if len(optimized) >= len(original):
+            self.write(self.entry_path(sha256, KEEP_ORIGINAL_SUFFIX), b"")
+            return source_path, 0
+
+        self.write(cached, optimized)
+        return cached, len(original) - len(optimized)
+
+    def prune(self, keep_hashes):
+        """Delete entries for sources no pack uses any more"""
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.split(".", 1)[0] not in keep_hashes:
+                path.unlink(missing_ok=True)
+
+    def write(self, path, data):
+        """Write a cache entry atomically, safe against concurrent workers"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
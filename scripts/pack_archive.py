@@ -0,0 +1,206 @@
+"""
+HueSurf Pack Archive Writer
+
+Helpers for writing pack zips in a single pass: the archive is hashed while
+it's written (HashingWriter) and every source file is hashed while it's
+copied into the archive (copy_into_zip), so nothing is read back afterwards.
+
+How each entry is compressed is up to a CompressionPolicy, which ships with
+the website (website/zip_policy.py) because its on-the-fly pack zips use it
+too.
+
+Large packs can also be split into self-contained volumes of whole files
+(plan_volumes), so clients can fetch them in parallel.
+
+Reproducible archives give every entry the same timestamp (SOURCE_DATE_EPOCH
+or 1980-01-01), Unix 0644 permissions and no host-specific attributes, so
+the same inputs always produce the same bytes.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import hashlib
+import os
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+WEBSITE_DIR = Path(__file__).resolve().parent.parent / "website"
+if str(WEBSITE_DIR) not in sys.path:
+    sys.path.append(str(WEBSITE_DIR))
+
+from zip_policy import (  # noqa: E402
+    PRECOMPRESSED_EXTENSIONS,
+    TEXT_EXTENSIONS,
+    CompressionPolicy,
+    normalize_entry,
+    write_text_entry,
+)
+
+# The policy's names are re-exported for the packer
+__all__ = [
+    "CHUNK_SIZE",
+    "PRECOMPRESSED_EXTENSIONS",
+    "TEXT_EXTENSIONS",
+    "CompressionPolicy",
+    "CompressionReport",
+    "HashingWriter",
+    "copy_into_zip",
+    "entry_size",
+    "plan_volumes",
+    "reproducible_date_time",
+    "write_text_entry",
+]
+
+# Read/write block size for copying sources into archives
+CHUNK_SIZE = 1024 * 1024
+
+# Earliest timestamp a zip entry can hold
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# Bytes an entry adds besides its data and name: local header, data
+# descriptor and central directory record
+ENTRY_OVERHEAD = 30 + 24 + 46
+
+# End of central directory record
+END_RECORD_SIZE = 22
+
+
+def reproducible_date_time():
+    """Fixed entry timestamp: SOURCE_DATE_EPOCH (UTC) if set, else ZIP_EPOCH"""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return ZIP_EPOCH
+    return max(time.gmtime(int(epoch))[:6], ZIP_EPOCH)
+
+
+def entry_size(arcname, size):
+    """Upper bound of the bytes a stored entry takes up in a zip"""
+    return ENTRY_OVERHEAD + 2 * len(arcname.encode("utf-8")) + size
+
+
+def plan_volumes(entry_sizes, volume_size, reserve=0):
+    """
+    Split entries into volumes of at most volume_size bytes, keeping order
+
+    Args:
+        entry_sizes: Dict of entry key -> bytes it takes up (see entry_size)
+        volume_size: Upper bound of a volume
+        reserve: Bytes every volume keeps free for its metadata entries
+
+    Returns:
+        List of volumes, each a list of keys; an entry too big for any volume
+        gets one of its own
+    """
+    budget = volume_size - reserve - END_RECORD_SIZE
+    volumes = []
+    current, current_size = [], 0
+    for key, size in entry_sizes.items():
+        if current and current_size + size > budget:
+            volumes.append(current)
+            current, current_size = [], 0
+        current.append(key)
+        current_size += size
+    if current:
+        volumes.append(current)
+    return volumes
+
+
+class HashingWriter:
+    """
+    Write-only file wrapper that hashes and counts bytes on their way to disk
+
+    It deliberately has no seek(), so zipfile streams entries with data
+    descriptors instead of seeking back to patch local headers, and the
+    bytes hashed are exactly the bytes in the file.
+    """
+
+    def __init__(self, f, algorithm="sha256"):
+        self.f = f
+        self.hasher = hashlib.new(algorithm)
+        self.size = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        self.f.flush()
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
+class CompressionReport:
+    """CPU time spent writing an archive and what compression saved"""
+
+    def __init__(self):
+        self.started = time.process_time()
+        self.cpu_seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stored = 0
+        self.deflated = 0
+
+    def finish(self, zipf):
+        """Tally the entries of a written zip"""
+        self.cpu_seconds = time.process_time() - self.started
+        for zinfo in zipf.infolist():
+            self.bytes_in += zinfo.file_size
+            self.bytes_out += zinfo.compress_size
+            if zinfo.compress_type == zipfile.ZIP_STORED:
+                self.stored += 1
+            else:
+                self.deflated += 1
+        return self
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_in - self.bytes_out
+
+    def to_dict(self):
+        return {
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "bytes_in": self.bytes_in,
+            "bytes_saved": self.bytes_saved,
+            "stored": self.stored,
+            "deflated": self.deflated,
+        }
+
+
+def copy_into_zip(zipf, source_path, arcname, policy, date_time=None):
+    """
+    Stream a file into an open zip, hashing it on the way
+
+    The first chunk is read before the entry is opened so the policy can
+    run its trial compression on it without a second read.
+
+    Args:
+        date_time: Fixed entry timestamp for reproducible archives; None
+            keeps the file's mtime and mode
+
+    Returns:
+        SHA256 hex digest of the source file
+    """
+    zinfo = zipfile.ZipInfo.from_file(source_path, arcname)
+    if date_time:
+        normalize_entry(zinfo, date_time)
+
+    hash_sha256 = hashlib.sha256()
+    with open(source_path, "rb") as src:
+        chunk = src.read(CHUNK_SIZE)
+        zinfo.compress_type, compresslevel = policy.choose(arcname, chunk)
+        # Same per-entry attribute ZipFile.write() sets
+        zinfo._compresslevel = compresslevel
+        with zipf.open(zinfo, "w") as dest:
+            while chunk:
+                hash_sha256.update(chunk)
+                dest.write(chunk)
+                chunk = src.read(CHUNK_SIZE)
+    return hash_sha256.hexdigest()
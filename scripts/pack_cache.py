@@ -0,0 +1,167 @@
+"""
+HueSurf Packer Build Cache
+
+Remembers what each pack was last built from so a repack only redoes the
+stages whose inputs changed. Stored as JSON next to the packer output:
+
+    {
+      "version": 1,
+      "packs": {
+        "<pack dir name>": {
+          "pack_info": "<sha256 of pack_info.json bytes>",
+          "files": {"<relative path>": {"size", "mtime_ns", "sha256"}},
+          "stages": {
+            "<stage>": {
+              "digest": "<digest of the stage inputs>",
+              "outputs": {"<path relative to output dir>": {"size", "mtime_ns"}},
+              ...stage specific values, e.g. the zip hash
+            }
+          },
+          "pack_data": {...manifest entry...}
+        }
+      }
+    }
+
+A source file whose size and mtime are unchanged keeps its recorded hash;
+changed files are hashed by the stage that reads them anyway (the zip
+writer), so no source is read just to be fingerprinted. A stage is fresh when
+its input digest matches and every output it recorded is still on disk with
+the recorded size and mtime.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from publish import atomic_output
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILENAME = ".build_cache.json"
+CACHE_VERSION = 1
+
+
+def digest_json(value):
+    """SHA256 of the canonical JSON encoding of value"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def file_sha256(file_path):
+    """SHA256 of a file's contents"""
+    hash_sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+class BuildCache:
+    def __init__(self, path=None, packs=None):
+        """
+        Initialize the build cache
+
+        Args:
+            path: JSON file the cache is saved to (None for an in-memory cache,
+                as used in worker processes)
+            packs: Initial pack entries by pack directory name
+        """
+        self.path = Path(path) if path else None
+        self.packs = packs or {}
+
+    @classmethod
+    def load(cls, path):
+        """Load a cache file, starting empty if it's missing or unreadable"""
+        path = Path(path)
+        if path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    return cls(path, data.get("packs", {}))
+                logger.info("Build cache format changed, rebuilding everything")
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable build cache {path}: {e}")
+        return cls(path)
+
+    def save(self):
+        """Write the cache atomically"""
+        with atomic_output(self.path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "packs": self.packs}, f, indent=1)
+
+    def get(self, key):
+        return self.packs.get(key)
+
+    def set(self, key, entry):
+        self.packs[key] = entry
+
+    def discard(self, key):
+        return self.packs.pop(key, None)
+
+    def keys(self):
+        return set(self.packs)
+
+    @staticmethod
+    def fingerprint_files(base_dir, file_paths, previous):
+        """
+        Fingerprint source files without reading them
+
+        Files whose size and mtime match the last build keep their recorded
+        hash; the others get sha256 None, meaning "changed, hash it while it's
+        being packed".
+
+        Args:
+            base_dir: Directory paths are recorded relative to
+            file_paths: Files to fingerprint
+            previous: The "files" dict from the last build, or {}
+        """
+        files = {}
+        for file_path in file_paths:
+            stat = file_path.stat()
+            relative = file_path.relative_to(base_dir).as_posix()
+            known = previous.get(relative)
+            if (
+                known
+                and known["size"] == stat.st_size
+                and known["mtime_ns"] == stat.st_mtime_ns
+            ):
+                files[relative] = dict(known)
+                continue
+            files[relative] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": None,
+            }
+        return files
+
+    @staticmethod
+    def record_outputs(output_dir, output_paths):
+        """Stat outputs so later runs can tell whether they were touched"""
+        outputs = {}
+        for output_path in output_paths:
+            stat = output_path.stat()
+            outputs[output_path.relative_to(output_dir).as_posix()] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        return outputs
+
+    @staticmethod
+    def outputs_fresh(output_dir, outputs):
+        """Check that every recorded output is still there, untouched"""
+        for relative, recorded in outputs.items():
+            try:
+                stat = (output_dir / relative).stat()
+            except FileNotFoundError:
+                return False
+            if (stat.st_size, stat.st_mtime_ns) != (
+                recorded["size"],
+                recorded["mtime_ns"],
+            ):
+                return False
+        return True
@@ -0,0 +1,334 @@
+"""
+HueSurf Pack Integrity
+
+Checks published pack archives against the manifest and the source
+wallpapers without extracting anything:
+
+- every archive and volume is hashed through a read-only mmap, HASH_BLOCK
+  bytes at a time, and compared with its manifest "hash" and "size_bytes"
+- a zip's entries are read from its central directory alone; their names,
+  sizes and CRC-32s are compared with the source files
+- a tar.zst's entries are read from its sidecar index, whose frames are
+  compared with the seek table at the end of the archive and whose SHA256s
+  are compared with the source files
+
+Archives and sources are hashed on a thread pool: hashlib and zlib release
+the GIL on large buffers, so the hashing runs in parallel.
+
+Images the packer swapped for optimized copies (the manifest's "optimized"
+files) differ from their sources by design, so only their names are checked.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import hashlib
+import mmap
+import os
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pack_tarzst import read_index, read_seek_table
+
+# Bytes hashed per slice of the mapping
+HASH_BLOCK = 8 * 1024 * 1024
+
+# Files hashed at once
+HASH_THREADS = 8
+
+# Image suffixes the packer archives (WallpaperPacker.supported_formats)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tiff"}
+
+# Entries the packer writes next to the images of every archive
+METADATA_FILES = ("pack_info.json", "README.md")
+
+STATIC_PREFIX = "/static/wallpapers/"
+
+
+def hash_file(path, sha256=True, crc32=False):
+    """
+    Hash a file through a read-only mmap
+
+    Returns:
+        Dict with the file "size" and its "sha256" hex digest and "crc32"
+        when asked for
+    """
+    hash_sha256 = hashlib.sha256() if sha256 else None
+    crc = 0
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # Empty files can't be mapped
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    for start in range(0, size, HASH_BLOCK):
+                        with view[start : start + HASH_BLOCK] as block:
+                            if hash_sha256:
+                                hash_sha256.update(block)
+                            if crc32:
+                                crc = zlib.crc32(block, crc)
+
+    result = {"size": size}
+    if sha256:
+        result["sha256"] = hash_sha256.hexdigest()
+    if crc32:
+        result["crc32"] = crc
+    return result
+
+
+def static_path(static_dir, url):
+    """File in the output directory behind a /static/wallpapers/ URL"""
+    if not url or not url.startswith(STATIC_PREFIX):
+        return None
+    return Path(static_dir) / url[len(STATIC_PREFIX) :]
+
+
+def pack_archives(static_dir, pack):
+    """
+    Archives a manifest pack points at: its download and any volumes
+
+    Returns:
+        List of dicts with a "label" for messages, the archive "path",
+        manifest "size" and "hash", "format", the image "files" it holds
+        (None for all of them) and the sidecar "index" path of a tar.zst
+    """
+    archive_format = pack.get("archive_format", "zip")
+    download = static_path(static_dir, pack.get("download_url"))
+    archives = [
+        {
+            "label": download.name if download else "download",
+            "path": download,
+            "size": pack.get("size_bytes"),
+            "hash": pack.get("hash"),
+            "format": archive_format,
+            "files": None,
+            "index": static_path(static_dir, pack.get("index_url"))
+            if archive_format == "tar.zst"
+            else None,
+        }
+    ]
+    for volume in pack.get("volumes") or []:
+        path = static_path(static_dir, volume.get("url"))
+        archives.append(
+            {
+                "label": path.name if path else f"volume {volume.get('index')}",
+                "path": path,
+                "size": volume.get("size_bytes"),
+                "hash": volume.get("hash"),
+                "format": "zip",
+                "files": volume.get("files"),
+                "index": None,
+            }
+        )
+    return archives
+
+
+def zip_listing(path):
+    """
+    (size, CRC-32) of every entry by name, read from the central directory
+
+    zipfile only reads the end of the archive to list it; no entry data or
+    local header is touched.
+    """
+    with zipfile.ZipFile(path) as zipf:
+        return {
+            info.filename: (info.file_size, info.CRC)
+            for info in zipf.infolist()
+            if not info.is_dir()
+        }
+
+
+def tar_zst_listing(path, index_file):
+    """
+    (size, SHA256) of every entry by name, read from a tar.zst's index
+
+    Returns:
+        (listing, index)
+
+    Raises:
+        ValueError: The index's frames don't match the archive's seek table
+    """
+    index = read_index(index_file)
+    with open(path, "rb") as f:
+        frames = read_seek_table(f)
+    if [list(frame) for frame in frames] != index["frames"]:
+        raise ValueError("index frames don't match the archive's seek table")
+    listing = {
+        entry["name"]: (entry["size"], entry["sha256"]) for entry in index["entries"]
+    }
+    return listing, index
+
+
+def source_images(pack_dir):
+    """Source images of a pack by path relative to the pack directory"""
+    if not pack_dir.is_dir():
+        return {}
+    return {
+        path.relative_to(pack_dir).as_posix(): path
+        for path in sorted(pack_dir.rglob("*"))
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    }
+
+
+class IntegrityCheck:
+    def __init__(self, static_dir, source_dir, workers=HASH_THREADS):
+        """
+        Initialize the integrity check
+
+        Args:
+            static_dir: Output directory the manifest lives in
+            source_dir: Source wallpapers directory
+            workers: Files hashed at once
+        """
+        self.static_dir = Path(static_dir)
+        self.source_dir = Path(source_dir)
+        self.workers = max(1, workers)
+
+    def verify(self, packs):
+        """
+        Check the archives of manifest packs
+
+        Returns:
+            List of (pack name, errors, warnings), in manifest order
+        """
+        plans = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for pack in packs:
+                pack_name = pack.get("pack_name", pack.get("name", "Unknown"))
+                archives = pack_archives(self.static_dir, pack)
+                formats = {archive["format"] for archive in archives}
+                optimized = set((pack.get("optimized") or {}).get("files", []))
+                sources = source_images(self.source_dir / pack_name)
+                for archive in archives:
+                    archive["hashed"] = self.submit(
+                        executor, hash_file, archive["path"]
+                    )
+                    archive["listing"] = self.submit(
+                        executor,
+                        tar_zst_listing
+                        if archive["format"] == "tar.zst"
+                        else zip_listing,
+                        archive["path"],
+                        *([archive["index"]] if archive["format"] == "tar.zst" else []),
+                    )
+                hashed_sources = {
+                    relative: executor.submit(
+                        hash_file,
+                        path,
+                        sha256="tar.zst" in formats,
+                        crc32="zip" in formats,
+                    )
+                    for relative, path in sources.items()
+                    if relative not in optimized
+                }
+                plans.append(
+                    (pack, pack_name, archives, sources, hashed_sources, optimized)
+                )
+
+            return [self.verify_pack(*plan) for plan in plans]
+
+    @staticmethod
+    def submit(executor, func, path, *args):
+        """Submit func(path, ...) unless the manifest gave no path"""
+        if path is None:
+            return None
+        return executor.submit(func, path, *args)
+
+    def verify_pack(
+        self, pack, pack_name, archives, sources, hashed_sources, optimized
+    ):
+        """Compare one pack's archives with its manifest entry and sources"""
+        errors = []
+        warnings = []
+        archived = set()
+        listed = True
+
+        for archive in archives:
+            label = archive["label"]
+            if archive["hashed"] is None:
+                errors.append(f"{label}: no archive URL in the manifest")
+                continue
+            try:
+                hashed = archive["hashed"].result()
+            except OSError as e:
+                errors.append(f"{label}: can't read archive: {e}")
+                continue
+            if hashed["size"] != archive["size"]:
+                errors.append(
+                    f"{label}: size is {hashed['size']} bytes, manifest says "
+                    f"{archive['size']}"
+                )
+            if hashed["sha256"] != archive["hash"]:
+                errors.append(f"{label}: SHA256 doesn't match the manifest hash")
+
+            try:
+                listing = archive["listing"].result()
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                errors.append(f"{label}: can't list archive: {e}")
+                listed = False
+                continue
+            if archive["format"] == "tar.zst":
+                listing, index = listing
+                if index.get("hash") != archive["hash"]:
+                    errors.append(f"{label}: index hash doesn't match the manifest")
+
+            expected = (
+                set(sources) if archive["files"] is None else set(archive["files"])
+            )
+            expected |= {
+                relative
+                for relative in optimized
+                if archive["files"] is None or relative in archive["files"]
+            }
+            images = {}
+            for name, entry in listing.items():
+                prefix, _, relative = name.partition("/")
+                if prefix != pack_name:
+                    errors.append(f"{label}: entry {name} is outside {pack_name}/")
+                elif relative not in METADATA_FILES:
+                    images[relative] = entry
+            for relative in METADATA_FILES:
+                if f"{pack_name}/{relative}" not in listing:
+                    errors.append(f"{label}: {relative} is missing")
+
+            if archive["files"] is None and len(images) != pack.get("count"):
+                errors.append(
+                    f"{label}: {len(images)} images, manifest count is "
+                    f"{pack.get('count')}"
+                )
+            for relative in sorted(set(archive["files"] or ()) - set(images)):
+                errors.append(f"{label}: {relative} is missing")
+            if sources:
+                for relative in sorted(set(images) - expected):
+                    errors.append(f"{label}: {relative} has no source image")
+            archived |= set(images)
+
+            for relative, (size, checksum) in sorted(images.items()):
+                if relative in optimized or relative not in hashed_sources:
+                    continue
+                try:
+                    source = hashed_sources[relative].result()
+                except OSError as e:
+                    errors.append(f"{relative}: can't read source image: {e}")
+                    continue
+                if size != source["size"]:
+                    errors.append(
+                        f"{label}: {relative} is {size} bytes, source is "
+                        f"{source['size']}"
+                    )
+                elif archive["format"] == "tar.zst":
+                    if checksum != source["sha256"]:
+                        errors.append(f"{label}: {relative} SHA256 differs from source")
+                elif checksum != source["crc32"]:
+                    errors.append(f"{label}: {relative} CRC-32 differs from source")
+
+        # Duplicates dropped by the packer aren't recorded in the manifest
+        if listed:
+            for relative in sorted(set(sources) - archived):
+                warnings.append(f"{relative} is not in any archive")
+
+        return pack_name, errors, warnings
@@ -0,0 +1,303 @@
+"""
+HueSurf Indexed tar.zst Archives
+
+Alternative pack archive format: a tar stream compressed with zstd in
+independent frames, so any wallpaper can be decompressed without reading
+the rest of the archive:
+
+    frame 0..n     tar headers and data, whole entries only
+    frame n+1      tar end-of-archive blocks
+    seek table     zstd skippable frame in the zstd seekable format
+
+Decompressing the whole file with any zstd tool gives a plain tar (zstd
+skips the seek table). Small entries of the same kind share a frame of up to
+FRAME_SIZE bytes, so metadata still compresses across entries; an entry
+never spans two frames. Text frames are compressed at TEXT_LEVEL and frames
+of already-compressed images at PRECOMPRESSED_LEVEL, which keeps packing and
+unpacking fast where zstd can't win much.
+
+The sidecar index (<archive>.index.json) lists the frames and, for every
+entry, its frame, offset in the decompressed frame, size and SHA256, so a
+client can fetch a single wallpaper with one HTTP range request.
+
+zstandard is optional: without it the packer only writes zips.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import calendar
+import hashlib
+import io
+import json
+import os
+import struct
+import tarfile
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from pack_archive import CHUNK_SIZE, PRECOMPRESSED_EXTENSIONS, TEXT_EXTENSIONS
+
+ARCHIVE_SUFFIX = ".tar.zst"
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+
+# Uncompressed bytes after which the next entry starts a new frame
+FRAME_SIZE = 4 * 1024 * 1024
+
+# zstd levels for text, precompressed images and anything else
+TEXT_LEVEL = 19
+PRECOMPRESSED_LEVEL = 3
+LEVEL = 9
+
+# Seek table of the zstd seekable format: a skippable frame holding the
+# compressed and decompressed size of every frame, then a footer
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_ENTRY = struct.Struct("<II")
+SEEK_FOOTER = struct.Struct("<IBI")
+
+BLOCK_SIZE = tarfile.BLOCKSIZE
+
+
+def zstd_available():
+    """Whether tar.zst archives can be written and read here"""
+    return zstandard is not None
+
+
+def tar_zst_config():
+    """Settings that change the archive bytes, for build cache digests"""
+    return {
+        "frame_size": FRAME_SIZE,
+        "levels": [TEXT_LEVEL, PRECOMPRESSED_LEVEL, LEVEL],
+        "zstd": zstandard.ZSTD_VERSION if zstandard else None,
+    }
+
+
+_compressors = threading.local()
+
+
+def compressor(level):
+    """
+    This thread's ZstdCompressor for a level
+
+    Compressors are kept because setting one up costs more than compressing
+    a small frame (tens of ms at high levels); they aren't thread-safe.
+    """
+    cache = _compressors.__dict__.setdefault("by_level", {})
+    if level not in cache:
+        cache[level] = zstandard.ZstdCompressor(level=level)
+    return cache[level]
+
+
+def index_path(archive_path):
+    """Sidecar index of an archive"""
+    return archive_path.with_name(archive_path.name + INDEX_SUFFIX)
+
+
+def entry_level(arcname):
+    """zstd level for the frame an entry goes in"""
+    suffix = os.path.splitext(arcname)[1].lower()
+    if suffix in TEXT_EXTENSIONS:
+        return TEXT_LEVEL
+    if suffix in PRECOMPRESSED_EXTENSIONS:
+        return PRECOMPRESSED_LEVEL
+    return LEVEL
+
+
+def padding(size):
+    return b"\0" * (-size % BLOCK_SIZE)
+
+
+class TarZstWriter:
+    """
+    Write a framed tar.zst archive to a file object, entry by entry
+
+    Offsets are counted from the bytes written, so f may be a HashingWriter.
+    """
+
+    def __init__(self, f, date_time=None):
+        """
+        Initialize the writer
+
+        Args:
+            f: Binary file object, written sequentially
+            date_time: Fixed entry timestamp (UTC) for reproducible
+                archives; None keeps file mtimes
+        """
+        self.f = f
+        self.mtime = calendar.timegm(date_time + (0, 0, 0)) if date_time else None
+        self.offset = 0
+        self.frames = []
+        self.entries = []
+        self.compressor = None
+        self.level = None
+        self.frame_raw = 0
+
+    def tarinfo(self, arcname, size, mtime):
+        info = tarfile.TarInfo(arcname)
+        info.size = size
+        info.mtime = int(mtime if self.mtime is None else self.mtime)
+        info.mode = 0o644
+        return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+    def start_entry(self, arcname, header, size):
+        """
+        Write an entry's header, starting a new frame if the current one
+        can't take the entry
+
+        Returns:
+            Index entry with the offset of the entry's data in its frame
+        """
+        level = entry_level(arcname)
+        if (
+            self.compressor is None
+            or level != self.level
+            or self.frame_raw + len(header) + size > FRAME_SIZE
+        ):
+            self.finish_frame()
+            self.compressor = compressor(level).compressobj()
+            self.level = level
+        self.write(header)
+        return {
+            "name": arcname,
+            "frame": len(self.frames),
+            "offset": self.frame_raw,
+            "size": size,
+        }
+
+    def write(self, data):
+        """Compress data into the current frame"""
+        self.frame_raw += len(data)
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.f.write(compressed)
+
+    def finish_frame(self):
+        if self.compressor is None:
+            return
+        self.f.write(self.compressor.flush())
+        size = self.f.tell() - self.offset
+        self.frames.append([self.offset, size, self.frame_raw])
+        self.offset += size
+        self.compressor = None
+        self.frame_raw = 0
+
+    def add_file(self, source_path, arcname):
+        """
+        Stream a file into the archive, hashing it on the way
+
+        Returns:
+            SHA256 hex digest of the source file
+        """
+        stat = os.stat(source_path)
+        entry = self.start_entry(
+            arcname, self.tarinfo(arcname, stat.st_size, stat.st_mtime), stat.st_size
+        )
+        hash_sha256 = hashlib.sha256()
+        with open(source_path, "rb") as src:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                hash_sha256.update(chunk)
+                self.write(chunk)
+        self.write(padding(stat.st_size))
+        entry["sha256"] = hash_sha256.hexdigest()
+        self.entries.append(entry)
+        return entry["sha256"]
+
+    def add_text(self, arcname, text):
+        data = text.encode("utf-8")
+        entry = self.start_entry(
+            arcname, self.tarinfo(arcname, len(data), time.time()), len(data)
+        )
+        self.write(data + padding(len(data)))
+        entry["sha256"] = hashlib.sha256(data).hexdigest()
+        self.entries.append(entry)
+
+    def close(self):
+        """
+        Write the end-of-archive frame and the seek table
+
+        Returns:
+            The archive index (see read_index)
+        """
+        self.finish_frame()
+        self.compressor = compressor(LEVEL).compressobj()
+        self.write(b"\0" * (2 * BLOCK_SIZE))
+        self.finish_frame()
+
+        table = b"".join(SEEK_ENTRY.pack(size, raw) for _, size, raw in self.frames)
+        table += SEEK_FOOTER.pack(len(self.frames), 0, SEEKABLE_MAGIC)
+        self.f.write(struct.pack("<II", SKIPPABLE_MAGIC, len(table)) + table)
+
+        return {
+            "format": "tar.zst",
+            "version": INDEX_VERSION,
+            "frames": self.frames,
+            "entries": self.entries,
+        }
+
+
+def write_index(path, index):
+    """Write a sidecar index next to its archive"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+
+def read_index(path):
+    """
+    Load a sidecar index
+
+    Returns:
+        Dict with "frames" as [offset, compressed size, decompressed size]
+        lists and "entries" as dicts with the entry "name", "frame", "offset"
+        of its data in the decompressed frame, "size" and "sha256"
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_seek_table(f):
+    """
+    Frame (offset, compressed size, decompressed size) list from the seek
+    table at the end of an archive, for archives without their index
+    """
+    f.seek(-SEEK_FOOTER.size, io.SEEK_END)
+    count, descriptor, magic = SEEK_FOOTER.unpack(f.read(SEEK_FOOTER.size))
+    if magic != SEEKABLE_MAGIC:
+        raise ValueError("No zstd seek table at the end of the archive")
+    entry_size = SEEK_ENTRY.size + (4 if descriptor & 0x80 else 0)
+    f.seek(-(SEEK_FOOTER.size + count * entry_size), io.SEEK_END)
+    table = f.read(count * entry_size)
+
+    frames = []
+    offset = 0
+    for n in range(count):
+        size, raw = SEEK_ENTRY.unpack_from(table, n * entry_size)
+        frames.append((offset, size, raw))
+        offset += size
+    return frames
+
+
+def read_frame(f, frame):
+    """Decompress one frame of an open archive"""
+    offset, size, _ = frame
+    f.seek(offset)
+    return zstandard.ZstdDecompressor().decompressobj().decompress(f.read(size))
+
+
+def read_entry(f, index, entry):
+    """
+    Bytes of one entry, decompressing only its frame
+
+    Args:
+        f: Archive opened in binary mode
+        index: Archive index (read_index)
+        entry: One of the index's entries
+    """
+    data = read_frame(f, index["frames"][entry["frame"]])
+    return data[entry["offset"] : entry["offset"] + entry["size"]]
@@ -4,10 +4,28 @@ HueSurf Wallpaper Packer
 
 This script packages wallpaper packs from the assets folder into the website's
 static folder for web distribution. It creates zip files, copies preview images,
-and generates metadata for the web interface.
+renders resolution variants of each wallpaper, and generates metadata for the
+web interface.
+
+It is also a library: WallpaperPacker.run() packs in-process and returns a
+structured result, reporting progress events to a callback and stopping
+between packs when a cancel event is set (see packer_api.PackJob for
+running it in a background thread).
 
 Usage:
-    python scripts/pack_wallpapers.py [--force] [--verbose]
+    python scripts/pack_wallpapers.py [--force] [--verbose] [--jobs N]
+                                      [--trial-compression [--min-savings PCT]]
+                                      [--no-variants] [--optimize [--keep-icc]]
+                                      [--duplicates {off,warn,fail,dedupe}]
+                                      [--no-palette] [--reproducible]
+                                      [--pixel-budget MP] [--worker-memory MB]
+                                      [--keep-versions N] [--rollback [VERSION]]
+                                      [--versions-dir DIR]
+                                      [--volume-size MB]
+                                      [--archive-format {zip,tar.zst}]
+                                      [--preview-tiles N]
+                                      [--report FILE] [--profile-pack NAME]
+                                      [--watch [--debounce SECONDS]]
 
 Author: HueSurf Team
 License: MIT
@@ -16,24 +34,130 @@ License: MIT
 import os
 import json
 import zipfile
-import shutil
 import argparse
 from pathlib import Path
 from datetime import datetime
 import hashlib
-import mimetypes
-from PIL import Image
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import logging
 
+from catalog_index import (
+    INDEX_FILENAME,
+    WEB_IMAGE_EXTENSIONS,
+    pack_api_record,
+    wallpaper_api_record,
+    write_catalog_index,
+)
+from build_report import BuildReport, peak_rss_bytes, profile_call
+from duplicates import find_clusters, pick_keepers
+from image_analysis import (
+    ANALYSIS_CACHE_FILENAME,
+    ANALYZERS,
+    AnalysisCache,
+    analyze_image,
+    combine_palettes,
+)
+from optimize import OPTIMIZE_CACHE_DIRNAME, OptimizeCache
+from pack_archive import (
+    CHUNK_SIZE,
+    CompressionPolicy,
+    CompressionReport,
+    HashingWriter,
+    copy_into_zip,
+    entry_size,
+    plan_volumes,
+    reproducible_date_time,
+    write_text_entry,
+)
+from pack_cache import CACHE_FILENAME, BuildCache, digest_json, file_sha256
+from pack_tarzst import (
+    ARCHIVE_SUFFIX,
+    INDEX_SUFFIX,
+    TarZstWriter,
+    index_path,
+    tar_zst_config,
+    write_index,
+    zstd_available,
+)
+from publish import (
+    DEFAULT_KEEP_VERSIONS,
+    OutputLock,
+    OutputLocked,
+    VersionedOutput,
+    atomic_output,
+)
+from mosaic import (
+    GUTTER,
+    JPEG_OPTIONS,
+    MOSAIC_SIZE,
+    MOSAIC_TILES,
+    WEBP_OPTIONS,
+    compose_mosaic,
+    decode_tile,
+    pick_tiles,
+    save_mosaic,
+)
+from thumbnails import (
+    PIXEL_BUDGET,
+    render_thumbnails,
+    replace_pillow_limit,
+    resize_thumbnail,
+    save_jpeg,
+    set_pixel_budget,
+)
+from variants import (
+    FORMATS,
+    LADDER,
+    VARIANTS_VERSION,
+    render_variants,
+    variant_stem,
+)
+from watcher import RESCAN, create_watcher, wait_for_batch
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Pack archive formats; a pack's pack_info.json may pick one with
+# "archive_format"
+ARCHIVE_FORMATS = ["zip", "tar.zst"]
+
+
+class PackCancelled(Exception):
+    """A packing run was stopped through its cancel event"""
+
 
 class WallpaperPacker:
-    def __init__(self, source_dir=None, output_dir=None, force=False, verbose=False):
+    def __init__(
+        self,
+        source_dir=None,
+        output_dir=None,
+        force=False,
+        verbose=False,
+        jobs=1,
+        compression=None,
+        variants=True,
+        optimize=False,
+        keep_icc=False,
+        duplicates="warn",
+        duplicate_threshold=8,
+        palette=True,
+        reproducible=False,
+        pixel_budget=PIXEL_BUDGET,
+        worker_memory=None,
+        keep_versions=0,
+        versions_dir=None,
+        volume_size=None,
+        archive_format="zip",
+        preview_tiles=MOSAIC_TILES,
+        report_path=None,
+        profile_pack=None,
+        profile_path=None,
+    ):
         """
         Initialize the wallpaper packer
 
@@ -42,6 +166,44 @@ class WallpaperPacker:
             output_dir: Output static directory (default: website/static/wallpapers)
             force: Force overwrite existing files
             verbose: Enable verbose logging
+            jobs: Number of worker processes packs are spread over
+            compression: CompressionPolicy for zip entries (default: store
+                images, DEFLATE text)
+            variants: Render the resolution ladder of every wallpaper
+            optimize: Losslessly optimize images before they're zipped
+            keep_icc: Keep ICC colour profiles when optimizing
+            duplicates: What to do about near-duplicate wallpapers: "off",
+                "warn", "fail" (abort packing) or "dedupe" (pack only the
+                highest resolution copy)
+            duplicate_threshold: Maximum perceptual hash distance, in bits,
+                for two wallpapers to count as near-duplicates
+            palette: Extract dominant colours and luminance of every wallpaper
+                and fill in pack colours that pack_info.json leaves out
+            reproducible: Build byte-identical zips and manifests from
+                identical inputs (fixed timestamps, no wall-clock dates)
+            pixel_budget: Most pixels a source may be decoded to for
+                thumbnails, variants, analysis and optimizing (0 = no limit);
+                bigger images are still zipped but skipped by those stages
+            worker_memory: Address space limit of each worker process, in
+                bytes; images that need more fail on their own
+            keep_versions: Build into a new version directory and publish
+                it at output_dir with an atomic symlink swap, keeping this
+                many versions for rollback (0 = write output_dir in place,
+                unless it is already a published version symlink, which is
+                always staged and swapped)
+            versions_dir: Where the output versions live (default:
+                website/.wallpapers-versions for the default output_dir,
+                the published version's directory or next to output_dir
+                otherwise)
+            volume_size: Also split packs bigger than this many bytes into
+                self-contained zip volumes of whole images
+            archive_format: Archive format of packs whose pack_info.json
+                doesn't choose one ("zip" or "tar.zst")
+            preview_tiles: Wallpapers in each pack's preview mosaic
+            report_path: Write per-pack and per-stage timings to this JSON file
+            profile_pack: Directory name of a pack to run under cProfile
+            profile_path: Where the profile's pstats data goes (default:
+                <pack>.pstats in the working directory)
         """
         # Set up paths relative to project root
         self.project_root = Path(__file__).parent.parent
@@ -55,9 +217,53 @@ class WallpaperPacker:
             if output_dir
             else self.project_root / "website" / "static" / "wallpapers"
         )
+        if versions_dir:
+            self.versions_dir = Path(versions_dir)
+        elif output_dir and self.output_dir.is_symlink():
+            # Keep staging next to the version that is published
+            self.versions_dir = Path(os.path.realpath(self.output_dir)).parent
+        elif output_dir:
+            self.versions_dir = None
+        else:
+            # Outside website/static, which the site serves as is
+            self.versions_dir = self.project_root / "website" / ".wallpapers-versions"
 
         self.force = force
         self.verbose = verbose
+        self.jobs = max(1, jobs or 1)
+        self.compression = compression or CompressionPolicy()
+        self.variants = variants
+        self.optimizer = (
+            OptimizeCache(self.output_dir / OPTIMIZE_CACHE_DIRNAME, keep_icc)
+            if optimize
+            else None
+        )
+        self.duplicates = duplicates
+        self.duplicate_threshold = duplicate_threshold
+        self.palette = palette
+        self.reproducible = reproducible
+        self.pixel_budget = pixel_budget
+        self.worker_memory = worker_memory
+        self.volume_size = volume_size
+        self.archive_format = archive_format
+        self.preview_tiles = max(1, preview_tiles)
+        if not keep_versions and self.output_dir.is_symlink():
+            # A published version is being read and shares its files with
+            # older versions through hardlinks, so it's never written in place
+            keep_versions = DEFAULT_KEEP_VERSIONS
+            logger.info(
+                f"{self.output_dir} is a published version, staging the build "
+                f"(keeping {keep_versions} versions)"
+            )
+        self.publisher = (
+            VersionedOutput(self.output_dir, keep_versions, self.versions_dir)
+            if keep_versions
+            else None
+        )
+        self.output_lock = OutputLock(self.output_dir)
+        self.report_path = Path(report_path) if report_path else None
+        self.profile_pack = profile_pack
+        self.profile_path = Path(profile_path) if profile_path else None
 
         if verbose:
             logger.setLevel(logging.DEBUG)
@@ -66,14 +272,75 @@ class WallpaperPacker:
         self.supported_formats = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tiff"}
 
         # Statistics
-        self.stats = {
+        self.stats = self.empty_stats()
+        self.report = BuildReport()
+
+        # Inputs and outputs of the last build, per pack
+        self.cache = BuildCache()
+
+        # Source directory of each packed pack, by pack id
+        self.pack_dirs = {}
+
+        # Per-image analysis results by source SHA256
+        self.analysis = AnalysisCache()
+
+        # Wallpapers left out of their pack as duplicates, by pack directory
+        self.excluded = {}
+
+        # Progress callback and cancel event of the current run(), and the
+        # packs it put in the manifest
+        self.on_event = None
+        self.cancel = None
+        self.packs_data = []
+
+    @staticmethod
+    def empty_stats():
+        """Counters of one packing run"""
+        return {
             "packs_processed": 0,
             "wallpapers_processed": 0,
             "zips_created": 0,
+            "volumes_created": 0,
+            "tar_zst_created": 0,
             "previews_created": 0,
+            "variants_created": 0,
             "total_size": 0,
+            "packs_up_to_date": 0,
+            "compression_cpu_seconds": 0.0,
+            "compression_bytes_saved": 0,
+            "optimize_bytes_saved": 0,
+            "duplicate_clusters": 0,
+            "duplicates_removed": 0,
         }
 
+    def emit(self, event, **fields):
+        """Send a progress event to the run's callback, if it has one"""
+        if self.on_event is None:
+            return
+        try:
+            self.on_event({"event": event, "time": time.time(), **fields})
+        except Exception as e:
+            logger.warning(f"Progress callback failed on {event}: {e}")
+
+    def check_cancelled(self, futures=()):
+        """Raise PackCancelled if the run was cancelled, dropping queued tasks"""
+        if self.cancel is not None and self.cancel.is_set():
+            for future in futures:
+                future.cancel()
+            raise PackCancelled()
+
+    def now(self):
+        """Current time, or the fixed build time of a reproducible build"""
+        if self.reproducible:
+            return datetime(*reproducible_date_time())
+        return datetime.now()
+
+    def use_output_dir(self, output_dir):
+        """Write all outputs, caches included, to another directory"""
+        self.output_dir = Path(output_dir)
+        if self.optimizer:
+            self.optimizer.cache_dir = self.output_dir / OPTIMIZE_CACHE_DIRNAME
+
     def ensure_directories(self):
         """Create necessary output directories"""
         directories = [
@@ -81,6 +348,7 @@ class WallpaperPacker:
             self.output_dir / "packs",
             self.output_dir / "previews",
             self.output_dir / "thumbs",
+            self.output_dir / "variants",
         ]
 
         for directory in directories:
@@ -100,24 +368,25 @@ class WallpaperPacker:
 
     def create_thumbnail(self, image_path, thumb_path, size=(300, 200)):
         """Create a thumbnail for preview"""
-        try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency)
-                if img.mode in ("RGBA", "LA", "P"):
-                    background = Image.new("RGB", img.size, (255, 255, 255))
-                    if img.mode == "P":
-                        img = img.convert("RGBA")
-                    background.paste(
-                        img, mask=img.split()[-1] if img.mode == "RGBA" else None
-                    )
-                    img = background
+        return self.create_thumbnails(image_path, {thumb_path: size})
 
-                # Create thumbnail
-                img.thumbnail(size, Image.Resampling.LANCZOS)
-                img.save(thumb_path, "JPEG", quality=85, optimize=True)
-                return True
+    def create_thumbnails(self, image_path, outputs):
+        """
+        Create several thumbnails of one image from a single decode
+
+        Args:
+            image_path: Source image
+            outputs: Dict of thumbnail path -> (width, height) bounding box
+        """
+        try:
+            thumbs = render_thumbnails(image_path, list(outputs.values()))
+            for thumb_path, thumb in zip(outputs, thumbs):
+                save_jpeg(thumb, thumb_path)
+            return True
         except Exception as e:
-            logger.error(f"Failed to create thumbnail for {image_path}: {e}")
+            logger.error(
+                f"Failed to create thumbnail for {image_path}: {image_error(e)}"
+            )
             return False
 
     def calculate_file_hash(self, file_path):
@@ -137,7 +406,7 @@ class WallpaperPacker:
             "author": "HueSurf Team",
             "description": f"{pack_dir.name} wallpaper pack for HueSurf browser",
             "category": "General",
-            "created_date": datetime.now().isoformat().split("T")[0],
+            "created_date": self.now().isoformat().split("T")[0],
             "shuffle_enabled": True,
             "shuffle_on_new_tab": True,
             "wallpapers": [],
@@ -166,118 +435,536 @@ class WallpaperPacker:
 
         return default_info
 
-    def create_pack_zip(self, pack_dir, pack_info, image_files):
-        """Create a zip file for a wallpaper pack"""
+    def create_pack_zip(self, pack_dir, pack_info, image_files, sources=None):
+        """
+        Create a zip file for a wallpaper pack, and its volumes if the pack
+        is bigger than the volume size
+
+        Args:
+            sources: Optional file to read each image from instead, by path
+                relative to pack_dir (optimized copies)
+
+        Returns:
+            Dict with the zip "path", its "size" and SHA256 "hash", the
+            SHA256 of each source by relative path ("files") and the
+            "volumes" (None when the pack isn't split); None on failure
+        """
         pack_name = pack_info["pack_name"]
         zip_path = (
             self.output_dir / "packs" / f"{pack_name.lower().replace(' ', '_')}.zip"
         )
-
-        if zip_path.exists() and not self.force:
-            logger.info(f"Zip already exists: {zip_path} (use --force to overwrite)")
-            return zip_path
+        # Add all wallpaper images, in path order
+        relatives = sorted(
+            image_path.relative_to(pack_dir).as_posix() for image_path in image_files
+        )
+        sources = {
+            relative: (sources or {}).get(relative, pack_dir / relative)
+            for relative in relatives
+        }
 
         try:
-            with zipfile.ZipFile(
-                zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=6
-            ) as zipf:
-                # Add all wallpaper images
-                for image_path in image_files:
-                    arcname = f"{pack_name}/{image_path.relative_to(pack_dir)}"
-                    zipf.write(image_path, arcname)
-
-                # Create separate metadata for ZIP (don't modify original pack_info)
-                zip_pack_info = pack_info.copy()
-                zip_pack_info["count"] = len(image_files)
-                zip_pack_info["packed_date"] = datetime.now().isoformat()
-
-                # Add pack info to zip
-                pack_info_json = json.dumps(zip_pack_info, indent=2, ensure_ascii=False)
-                zipf.writestr(f"{pack_name}/pack_info.json", pack_info_json)
-
-                # Add README
-                readme_content = f"""# {pack_name} Wallpaper Pack
+            archive = self.write_pack_zip(zip_path, pack_info, sources)
+            report = archive["report"]
+
+            self.stats["zips_created"] += 1
+            self.stats["total_size"] += archive["size"]
+            self.stats["compression_cpu_seconds"] += report.cpu_seconds
+            self.stats["compression_bytes_saved"] += report.bytes_saved
+            logger.info(
+                f"Created zip: {zip_path} ({archive['size'] / 1024 / 1024:.1f} MB)"
+            )
+            logger.info(
+                f"🗜️  {pack_name}: {report.stored} stored, {report.deflated} "
+                f"deflated, saved {report.bytes_saved / 1024:.1f} KB "
+                f"in {report.cpu_seconds * 1000:.0f} ms CPU"
+            )
+
+            volumes = None
+            if self.volume_size and archive["size"] > self.volume_size:
+                volumes = self.create_pack_volumes(zip_path, pack_info, sources)
+
+            return {
+                "path": zip_path,
+                "size": archive["size"],
+                "hash": archive["hash"],
+                "files": archive["files"],
+                "compression": report.to_dict(),
+                "volumes": volumes,
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to create zip for {pack_name}: {e}")
+            return None
+
+    def write_pack_zip(self, zip_path, pack_info, sources, volume=None):
+        """
+        Write one pack archive: the images, pack_info.json and a README
+
+        Args:
+            zip_path: Archive to write (replaced atomically)
+            pack_info: Pack metadata
+            sources: Dict of image path relative to the pack -> file to read
+            volume: Dict with the "index" and "count" of a volume, which is
+                recorded in its pack_info.json and README
+
+        Returns:
+            Dict with the archive "size", "hash", the SHA256 of every source
+            ("files") and the CompressionReport ("report")
+        """
+        pack_name = pack_info["pack_name"]
+        # Hash the archive as it's written and each source as it's copied
+        source_hashes = {}
+        date_time = reproducible_date_time() if self.reproducible else None
+        report = CompressionReport()
+        with atomic_output(zip_path) as tmp_zip_path:
+            with open(tmp_zip_path, "wb", buffering=CHUNK_SIZE) as f:
+                writer = HashingWriter(f)
+                with zipfile.ZipFile(writer, "w") as zipf:
+                    for relative, source_path in sources.items():
+                        source_hashes[relative] = copy_into_zip(
+                            zipf,
+                            source_path,
+                            f"{pack_name}/{relative}",
+                            self.compression,
+                            date_time,
+                        )
+
+                    for arcname, text in self.pack_metadata_entries(
+                        pack_info, source_hashes, volume
+                    ):
+                        write_text_entry(
+                            zipf, arcname, text, self.compression, date_time
+                        )
+                    report.finish(zipf)
+
+        return {
+            "size": writer.size,
+            "hash": writer.hexdigest(),
+            "files": source_hashes,
+            "report": report,
+        }
+
+    def pack_metadata_entries(
+        self, pack_info, source_hashes, volume=None, archive_format="zip"
+    ):
+        """pack_info.json and README.md of an archive, as (arcname, text)"""
+        pack_name = pack_info["pack_name"]
+
+        # Separate metadata for the ZIP (original pack_info is untouched)
+        zip_pack_info = pack_info.copy()
+        zip_pack_info["count"] = len(source_hashes)
+        if volume:
+            zip_pack_info["volume"] = volume
+        if self.reproducible:
+            # Identifies the build by its inputs instead of the time
+            zip_pack_info["source_digest"] = digest_json(
+                {"files": source_hashes, "pack_info": pack_info}
+            )
+        else:
+            zip_pack_info["packed_date"] = datetime.now().isoformat()
+        pack_info_json = json.dumps(zip_pack_info, indent=2, ensure_ascii=False)
+
+        volume_line = (
+            f"\n- Volume {volume['index']} of {volume['count']}; every volume "
+            f"installs on its own"
+            if volume
+            else ""
+        )
+        readme_content = f"""# {pack_name} Wallpaper Pack
 
 {pack_info["description"]}
 
 ## Contents
-- {len(image_files)} wallpapers
+- {len(source_hashes)} wallpapers{volume_line}
 - Shuffle enabled: {"Yes" if pack_info["shuffle_enabled"] else "No"}
 - New tab shuffle: {"Yes" if pack_info["shuffle_on_new_tab"] else "No"}
 
 ## Installation
-1. Extract this zip file to your HueSurf wallpapers directory
+1. Extract this {archive_format} file to your HueSurf wallpapers directory
 2. Restart HueSurf to see the new wallpapers
 3. Enable shuffle in wallpaper settings if desired
 
 ## Created by HueSurf Team
 Licensed under MIT License
 """
-                zipf.writestr(f"{pack_name}/README.md", readme_content)
+        return [
+            (f"{pack_name}/pack_info.json", pack_info_json),
+            (f"{pack_name}/README.md", readme_content),
+        ]
 
-            self.stats["zips_created"] += 1
-            self.stats["total_size"] += zip_path.stat().st_size
+    def create_pack_volumes(self, zip_path, pack_info, sources):
+        """
+        Split a pack into self-contained volumes of whole images
+
+        Every volume holds its own pack_info.json and README, so it can be
+        downloaded, verified and installed independently of the others. The
+        volumes come on top of the full zip at zip_path, which stays the
+        pack's download_url for clients that don't fetch volumes.
+
+        Returns:
+            List of volume dicts (index, path, size_bytes, hash, count and
+            the image "files" it holds), in order
+        """
+        pack_name = pack_info["pack_name"]
+        # Metadata is stored compressed, so its raw size is a safe reserve
+        probe = {relative: "0" * 64 for relative in sources}
+        reserve = sum(
+            entry_size(arcname, len(text.encode("utf-8")) + 256)
+            for arcname, text in self.pack_metadata_entries(
+                pack_info, probe, {"index": 999, "count": 999}
+            )
+        )
+        plan = plan_volumes(
+            {
+                relative: entry_size(
+                    f"{pack_name}/{relative}", Path(source).stat().st_size
+                )
+                for relative, source in sources.items()
+            },
+            self.volume_size,
+            reserve,
+        )
+
+        volumes = []
+        for index, relatives in enumerate(plan, 1):
+            volume_path = zip_path.with_name(f"{zip_path.stem}-part{index}.zip")
+            archive = self.write_pack_zip(
+                volume_path,
+                pack_info,
+                {relative: sources[relative] for relative in relatives},
+                {"index": index, "count": len(plan)},
+            )
+            self.stats["volumes_created"] += 1
+            self.stats["total_size"] += archive["size"]
+            volumes.append(
+                {
+                    "index": index,
+                    "path": volume_path,
+                    "size_bytes": archive["size"],
+                    "hash": archive["hash"],
+                    "count": len(relatives),
+                    "files": relatives,
+                }
+            )
+        logger.info(
+            f"📦 {pack_name}: split into {len(volumes)} volumes of at most "
+            f"{self.volume_size / 1024 / 1024:.1f} MB (full zip kept)"
+        )
+        return volumes
+
+    def pack_archive_format(self, pack_info):
+        """Archive format of a pack: its own choice, else the packer default"""
+        archive_format = pack_info.get("archive_format", self.archive_format)
+        if archive_format not in ARCHIVE_FORMATS:
+            logger.warning(
+                f"{pack_info['pack_name']}: unknown archive format "
+                f"{archive_format!r}, using zip"
+            )
+            return "zip"
+        if archive_format == "tar.zst" and not zstd_available():
+            logger.warning(
+                f"{pack_info['pack_name']}: tar.zst needs zstandard "
+                f"(pip install zstandard), using zip"
+            )
+            return "zip"
+        return archive_format
+
+    def create_pack_tar_zst(self, pack_dir, pack_info, image_files, sources=None):
+        """
+        Create an indexed tar.zst archive for a wallpaper pack
+
+        Returns:
+            Same dict as create_pack_zip, plus the sidecar "index" path;
+            None on failure
+        """
+        pack_name = pack_info["pack_name"]
+        archive_path = (
+            self.output_dir
+            / "packs"
+            / f"{pack_name.lower().replace(' ', '_')}{ARCHIVE_SUFFIX}"
+        )
+        relatives = sorted(
+            image_path.relative_to(pack_dir).as_posix() for image_path in image_files
+        )
+        date_time = reproducible_date_time() if self.reproducible else None
+
+        try:
+            started = time.process_time()
+            source_hashes = {}
+            with atomic_output(archive_path) as tmp_path:
+                with open(tmp_path, "wb", buffering=CHUNK_SIZE) as f:
+                    writer = HashingWriter(f)
+                    archive = TarZstWriter(writer, date_time)
+                    for relative in relatives:
+                        source_hashes[relative] = archive.add_file(
+                            (sources or {}).get(relative, pack_dir / relative),
+                            f"{pack_name}/{relative}",
+                        )
+                    for arcname, text in self.pack_metadata_entries(
+                        pack_info, source_hashes, archive_format="tar.zst"
+                    ):
+                        archive.add_text(arcname, text)
+                    index = archive.close()
+            index["size"] = writer.size
+            index["hash"] = writer.hexdigest()
+            with atomic_output(index_path(archive_path)) as tmp_path:
+                write_index(tmp_path, index)
+
+            bytes_in = sum(entry["size"] for entry in index["entries"])
+            compression = {
+                "cpu_seconds": round(time.process_time() - started, 4),
+                "bytes_in": bytes_in,
+                "bytes_saved": bytes_in - writer.size,
+                "frames": len(index["frames"]),
+            }
+            self.stats["tar_zst_created"] += 1
+            self.stats["total_size"] += writer.size
+            self.stats["compression_cpu_seconds"] += compression["cpu_seconds"]
+            self.stats["compression_bytes_saved"] += compression["bytes_saved"]
             logger.info(
-                f"Created zip: {zip_path} ({zip_path.stat().st_size / 1024 / 1024:.1f} MB)"
+                f"Created tar.zst: {archive_path} "
+                f"({writer.size / 1024 / 1024:.1f} MB, "
+                f"{len(index['frames'])} frames)"
             )
-            return zip_path
+            return {
+                "path": archive_path,
+                "index": index_path(archive_path),
+                "size": writer.size,
+                "hash": index["hash"],
+                "files": source_hashes,
+                "compression": compression,
+                "volumes": None,
+            }
 
         except Exception as e:
-            logger.error(f"Failed to create zip for {pack_name}: {e}")
+            logger.error(f"Failed to create tar.zst for {pack_name}: {e}")
             return None
 
-    def create_preview_image(self, pack_dir, image_files, pack_name):
-        """Create a preview image for the pack"""
-        preview_path = (
-            self.output_dir / "previews" / f"{pack_name.lower().replace(' ', '_')}.jpg"
+    def optimize_sources(self, pack_dir, pack_name, files):
+        """
+        Swap in losslessly optimized copies of a pack's images
+
+        Returns:
+            (manifest record of the optimized files and bytes saved, dict of
+            optimized copy by relative path)
+        """
+        results = self.map_images(
+            _optimize_source,
+            [
+                (self.optimizer, pack_dir / relative, source["sha256"])
+                for relative, source in sorted(files.items())
+            ],
         )
 
-        if preview_path.exists() and not self.force:
-            logger.debug(f"Preview already exists: {preview_path}")
-            return preview_path
+        sources = {}
+        bytes_saved = 0
+        for relative, (path, saved) in zip(sorted(files), results):
+            if saved > 0:
+                sources[relative] = path
+                bytes_saved += saved
 
-        if not image_files:
-            return None
+        self.stats["optimize_bytes_saved"] += bytes_saved
+        logger.info(
+            f"🪶 {pack_name}: optimized {len(sources)} of {len(files)} images, "
+            f"saved {bytes_saved / 1024:.1f} KB"
+        )
+        return {"files": sorted(sources), "bytes_saved": bytes_saved}, sources
 
-        # Use the first image as preview
-        first_image = image_files[0]
-        thumb_path = (
-            self.output_dir / "thumbs" / f"{pack_name.lower().replace(' ', '_')}.jpg"
+    def create_preview_image(self, pack_dir, image_files, pack_name):
+        """
+        Create the pack preview: a mosaic of up to preview_tiles wallpapers
+        as progressive JPEG and WebP, plus the thumbnail of the first one
+
+        Every source is decoded once for both. Wallpapers that can't be
+        decoded are left out of the mosaic.
+
+        Returns:
+            List of the files written, the JPEG preview first; empty if no
+            wallpaper could be decoded
+        """
+        preview_path = (
+            self.output_dir / "previews" / f"{pack_name.lower().replace(' ', '_')}.jpg"
         )
+        webp_path = preview_path.with_suffix(".webp")
+        thumb_path = self.thumb_path(pack_name)
 
-        if self.create_thumbnail(first_image, thumb_path):
-            # Copy thumbnail as preview
-            shutil.copy2(thumb_path, preview_path)
-            self.stats["previews_created"] += 1
-            logger.debug(f"Created preview: {preview_path}")
-            return preview_path
+        tiles = []
+        outputs = []
+        for index in pick_tiles(len(image_files), self.preview_tiles):
+            try:
+                tile = decode_tile(image_files[index])
+                if index == 0:
+                    save_jpeg(resize_thumbnail(tile, (300, 200)), thumb_path)
+                    outputs.append(thumb_path)
+                tiles.append(tile)
+            except Exception as e:
+                logger.error(
+                    f"Failed to create thumbnail for {image_files[index]}: "
+                    f"{image_error(e)}"
+                )
+        if not tiles:
+            return []
+
+        save_mosaic(compose_mosaic(tiles), preview_path, webp_path)
+        self.stats["previews_created"] += 1
+        logger.debug(f"Created preview: {preview_path} ({len(tiles)} tiles)")
+        return [preview_path, webp_path] + outputs
+
+    def preview_sources(self, pack_dir, image_files):
+        """Paths relative to pack_dir of the wallpapers in the preview mosaic"""
+        return [
+            image_files[index].relative_to(pack_dir).as_posix()
+            for index in pick_tiles(len(image_files), self.preview_tiles)
+        ]
 
-        return None
+    def thumb_path(self, pack_name):
+        """Cached thumbnail the pack preview is copied from"""
+        return self.output_dir / "thumbs" / f"{pack_name.lower().replace(' ', '_')}.jpg"
 
     def process_pack(self, pack_dir):
-        """Process a single wallpaper pack"""
+        """Process a single wallpaper pack, under cProfile if it was chosen"""
+        if self.profile_pack == pack_dir.name:
+            return profile_call(
+                self.profile_path or Path(f"{pack_dir.name}.pstats"),
+                self.build_pack,
+                pack_dir,
+            )
+        return self.build_pack(pack_dir)
+
+    def build_pack(self, pack_dir):
+        """Build a single wallpaper pack, rebuilding only its stale outputs"""
         if not pack_dir.is_dir():
             return None
 
         logger.info(f"Processing pack: {pack_dir.name}")
 
-        # Get all image files
-        image_files = self.get_image_files(pack_dir)
+        # Compare inputs with the last build to find the stale stages. Files
+        # whose size or mtime changed have no hash yet: they make the zip
+        # stale and get hashed while they're copied into it.
+        with self.report.stage("scan", pack_dir.name):
+            # Get all image files, minus any dropped as duplicates
+            excluded = self.excluded.get(pack_dir.name, set())
+            image_files = [
+                image_path
+                for image_path in self.get_image_files(pack_dir)
+                if image_path.relative_to(pack_dir).as_posix() not in excluded
+            ]
+            previous = self.cache.get(pack_dir.name) or {}
+            files = self.cache.fingerprint_files(
+                pack_dir, image_files, previous.get("files", {})
+            )
         if not image_files:
             logger.warning(f"No image files found in {pack_dir.name}")
             return None
 
         # Load pack information
-        pack_info = self.load_pack_info(pack_dir)
+        with self.report.stage("metadata", pack_dir.name) as record:
+            pack_info = self.load_pack_info(pack_dir)
+            pack_info_path = pack_dir / "pack_info.json"
+            pack_info_digest = ""
+            if pack_info_path.exists():
+                pack_info_digest = file_sha256(pack_info_path)
+                record["bytes_read"] += pack_info_path.stat().st_size
+
+        if self.optimizer:
+            # Optimized copies are looked up by content hash, so changed files
+            # have to be hashed before the zip is written
+            with self.report.stage("hash", pack_dir.name) as record:
+                for relative, source in files.items():
+                    if source["sha256"] is None:
+                        source["sha256"] = file_sha256(pack_dir / relative)
+                        record["bytes_read"] += source["size"]
+        preview_sources = self.preview_sources(pack_dir, image_files)
+
+        zip_fresh = self.stage_is_fresh(
+            previous, "zip", self.zip_digest(files, pack_info_digest)
+        )
+        preview_fresh = self.stage_is_fresh(
+            previous,
+            "preview",
+            self.preview_digest(files, preview_sources, pack_info["pack_name"]),
+        )
+
+        if zip_fresh and preview_fresh and previous.get("pack_data"):
+            logger.info(f"⏭️  {pack_info['pack_name']} is up to date")
+            self.stats["packs_up_to_date"] += 1
+            self.cache.set(pack_dir.name, {**previous, "files": files})
+            return previous["pack_data"]
+
+        stages = dict(previous.get("stages", {}))
 
         # Create zip file (pack_info won't be modified)
-        zip_path = self.create_pack_zip(pack_dir, pack_info, image_files)
-        if not zip_path:
-            return None
+        if not zip_fresh:
+            optimized = None
+            sources = None
+            if self.optimizer:
+                with self.report.stage("optimize", pack_dir.name) as record:
+                    optimized, sources = self.optimize_sources(
+                        pack_dir, pack_info["pack_name"], files
+                    )
+                    record["bytes_read"] += sum(f["size"] for f in files.values())
+            archive_format = self.pack_archive_format(pack_info)
+            create_archive = (
+                self.create_pack_tar_zst
+                if archive_format == "tar.zst"
+                else self.create_pack_zip
+            )
+            with self.report.stage("zip", pack_dir.name) as record:
+                archive = create_archive(pack_dir, pack_info, image_files, sources)
+                if not archive:
+                    return None
+                record["bytes_read"] += sum(f["size"] for f in files.values()) - (
+                    optimized["bytes_saved"] if optimized else 0
+                )
+                record["bytes_written"] += archive["size"]
+            for relative, sha256 in archive["files"].items():
+                if files[relative]["sha256"] is None:
+                    files[relative]["sha256"] = sha256
+            volumes = archive["volumes"]
+            output_paths = [archive["path"]]
+            if archive.get("index"):
+                output_paths.append(archive["index"])
+            for volume in volumes or []:
+                output_paths.append(volume.pop("path"))
+                volume["url"] = f"/static/wallpapers/packs/{output_paths[-1].name}"
+            stages["zip"] = self.stage_record(
+                previous,
+                "zip",
+                self.zip_digest(files, pack_info_digest),
+                output_paths,
+                hash=archive["hash"],
+                size=archive["size"],
+                compression=archive["compression"],
+                optimized=optimized,
+                volumes=volumes,
+                archive_format=archive_format,
+            )
+        zip_path = self.stage_output(stages["zip"])
 
         # Create preview image
-        preview_path = self.create_preview_image(
-            pack_dir, image_files, pack_info["pack_name"]
+        if not preview_fresh:
+            with self.report.stage("thumbnail", pack_dir.name) as record:
+                preview_outputs = self.create_preview_image(
+                    pack_dir, image_files, pack_info["pack_name"]
+                )
+                record["bytes_read"] += sum(
+                    files[relative]["size"] for relative in preview_sources
+                )
+                record["bytes_written"] += sum(
+                    path.stat().st_size for path in preview_outputs
+                )
+            stages["preview"] = self.stage_record(
+                previous,
+                "preview",
+                self.preview_digest(files, preview_sources, pack_info["pack_name"]),
+                preview_outputs,
+            )
+        preview_path = self.stage_output(stages["preview"])
+        preview_webp = (
+            f"previews/{preview_path.stem}.webp"
+            if preview_path
+            and f"previews/{preview_path.stem}.webp" in stages["preview"]["outputs"]
+            else None
         )
 
         # Generate pack manifest data directly from original pack_info.json
@@ -289,18 +976,31 @@ Licensed under MIT License
                 "id": pack_info["pack_name"].lower().replace(" ", "_"),
                 "name": pack_info["pack_name"],
                 "count": len(image_files),
-                "size_bytes": zip_path.stat().st_size,
-                "size_mb": round(zip_path.stat().st_size / 1024 / 1024, 2),
+                "size_bytes": stages["zip"]["size"],
+                "size_mb": round(stages["zip"]["size"] / 1024 / 1024, 2),
                 "download_url": f"/static/wallpapers/packs/{zip_path.name}",
                 "preview_url": f"/static/wallpapers/previews/{preview_path.name}"
                 if preview_path
                 else None,
-                "hash": self.calculate_file_hash(zip_path),
-                "packed_date": datetime.now().isoformat(),
+                "preview_webp_url": f"/static/wallpapers/{preview_webp}"
+                if preview_webp
+                else None,
+                "hash": stages["zip"]["hash"],
+                "packed_date": self.now().isoformat(),
             }
         )
 
         # Ensure required defaults for missing fields
+        if stages["zip"].get("optimized"):
+            pack_data["optimized"] = stages["zip"]["optimized"]
+        if stages["zip"].get("volumes"):
+            pack_data["volumes"] = stages["zip"]["volumes"]
+        pack_data["archive_format"] = stages["zip"].get("archive_format", "zip")
+        if pack_data["archive_format"] == "tar.zst":
+            pack_data["index_url"] = (
+                f"/static/wallpapers/packs/{zip_path.name}{INDEX_SUFFIX}"
+            )
+
         pack_data.setdefault("category", "General")
         pack_data.setdefault("author", "Unknown")
         pack_data.setdefault("version", "1.0.0")
@@ -324,21 +1024,129 @@ Licensed under MIT License
         self.stats["packs_processed"] += 1
         self.stats["wallpapers_processed"] += len(image_files)
 
+        self.cache.set(
+            pack_dir.name,
+            {
+                "pack_info": pack_info_digest,
+                "files": files,
+                "stages": stages,
+                "pack_data": pack_data,
+            },
+        )
+
         logger.info(
             f"✅ Processed {pack_info['pack_name']}: {len(image_files)} wallpapers"
         )
         return pack_data
 
+    def stage_config(self, stage):
+        """Packer settings that change a stage's output"""
+        return {
+            "zip": {
+                "compression": self.compression.config(),
+                "optimize": self.optimizer.config() if self.optimizer else None,
+                "reproducible": (
+                    list(reproducible_date_time()) if self.reproducible else None
+                ),
+                "volume_size": self.volume_size,
+                "archive_format": self.archive_format,
+                "tar_zst": tar_zst_config(),
+            },
+            # A preview that was over the budget is retried once it's raised
+            "preview": {
+                "size": list(MOSAIC_SIZE),
+                "tiles": self.preview_tiles,
+                "gutter": GUTTER,
+                "jpeg": JPEG_OPTIONS,
+                "webp": WEBP_OPTIONS,
+                "thumbnail": [300, 200],
+                "pixel_budget": self.pixel_budget,
+            },
+            "variants": {
+                "ladder": list(LADDER),
+                "formats": {fmt: options for fmt, (_, _, options) in FORMATS.items()},
+                "version": VARIANTS_VERSION,
+            },
+        }[stage]
+
+    def zip_digest(self, files, pack_info_digest):
+        """Digest of everything that goes into a pack zip, None if unknown yet"""
+        if any(f["sha256"] is None for f in files.values()):
+            return None
+        return digest_json(
+            {
+                "files": {path: f["sha256"] for path, f in files.items()},
+                "pack_info": pack_info_digest,
+                "config": self.stage_config("zip"),
+            }
+        )
+
+    def preview_digest(self, files, sources, pack_name):
+        """Digest of the preview inputs, None if a source isn't hashed yet"""
+        if any(files[relative]["sha256"] is None for relative in sources):
+            return None
+        return digest_json(
+            {
+                "sources": [files[relative]["sha256"] for relative in sources],
+                "pack_name": pack_name,
+                "config": self.stage_config("preview"),
+            }
+        )
+
+    def variants_digest(self, source):
+        """Digest of one wallpaper's variant inputs"""
+        return digest_json(
+            {"source": source["sha256"], "config": self.stage_config("variants")}
+        )
+
+    def stage_is_fresh(self, previous, stage, digest):
+        """Check whether a stage's recorded outputs match its current inputs"""
+        record = previous.get("stages", {}).get(stage)
+        return (
+            not self.force
+            and digest is not None
+            and record is not None
+            and record["digest"] == digest
+            and BuildCache.outputs_fresh(self.output_dir, record["outputs"])
+        )
+
+    def stage_record(self, previous, stage, digest, output_paths, **extra):
+        """Cache record for a rebuilt stage; outputs it no longer makes are removed"""
+        outputs = BuildCache.record_outputs(self.output_dir, output_paths)
+        old_outputs = previous.get("stages", {}).get(stage, {}).get("outputs", {})
+        self.remove_outputs(set(old_outputs) - set(outputs))
+        return {"digest": digest, "outputs": outputs, **extra}
+
+    def stage_output(self, record):
+        """Path of a stage's main output, or None if it produced nothing"""
+        outputs = list(record["outputs"])
+        return self.output_dir / outputs[0] if outputs else None
+
+    def remove_outputs(self, relative_paths):
+        """Delete outputs the cache no longer accounts for"""
+        for relative in sorted(relative_paths):
+            (self.output_dir / relative).unlink(missing_ok=True)
+            logger.debug(f"Removed stale output: {relative}")
+
+    def prune_cache(self, pack_keys):
+        """Forget packs that are gone from the source tree and delete their outputs"""
+        for key in sorted(self.cache.keys() - set(pack_keys)):
+            entry = self.cache.discard(key)
+            for record in entry.get("stages", {}).values():
+                self.remove_outputs(record["outputs"])
+            logger.info(f"🗑️  Removed outputs of deleted pack: {key}")
+
     def generate_manifest(self, packs_data):
         """Generate manifest file for the website"""
-        # Gather all unique values for global manifest metadata
-        all_categories = list(set(pack["category"] for pack in packs_data))
-        all_licenses = list(set(pack["license"] for pack in packs_data))
-        all_resolutions = list(set(pack["min_resolution"] for pack in packs_data))
+        # Gather all unique values for global manifest metadata (sorted so the
+        # manifest doesn't depend on set iteration order)
+        all_categories = sorted(set(pack["category"] for pack in packs_data))
+        all_licenses = sorted(set(pack["license"] for pack in packs_data))
+        all_resolutions = sorted(set(pack["min_resolution"] for pack in packs_data))
 
         manifest = {
             "version": "1.0.0",
-            "generated": datetime.now().isoformat(),
+            "generated": self.now().isoformat(),
             "total_packs": len(packs_data),
             "total_wallpapers": sum(pack["count"] for pack in packs_data),
             "total_size_mb": round(
@@ -381,15 +1189,137 @@ Licensed under MIT License
             },
         }
 
+        # Written to a temporary file and renamed, so the website never reads
+        # a half-written manifest
         manifest_path = self.output_dir / "manifest.json"
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        with atomic_output(manifest_path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
 
         logger.info(f"Generated manifest: {manifest_path}")
+
+        self.generate_catalog_index(manifest)
         return manifest_path
 
-    def pack_wallpapers(self):
-        """Main method to pack all wallpapers"""
+    def generate_catalog_index(self, manifest):
+        """Write the mmap-able catalog index the website workers share"""
+        packs = []
+        for pack in manifest["packs"]:
+            pack_dir = self.pack_dirs.get(pack["id"])
+            wallpapers = []
+            if pack_dir:
+                wallpaper_metadata = {
+                    wp["filename"]: wp for wp in pack.get("wallpapers", [])
+                }
+                variant_lists = pack.get("variants", {})
+                excluded = self.excluded.get(pack_dir.name, set())
+                for image_path in self.get_image_files(pack_dir):
+                    if image_path.suffix.lower() not in WEB_IMAGE_EXTENSIONS:
+                        continue
+                    if image_path.relative_to(pack_dir).as_posix() in excluded:
+                        continue
+                    wallpapers.append(
+                        (
+                            image_path.name,
+                            wallpaper_api_record(
+                                pack_dir.name,
+                                image_path,
+                                wallpaper_metadata.get(image_path.name, {}),
+                                variant_lists.get(
+                                    image_path.relative_to(pack_dir).as_posix()
+                                ),
+                            ),
+                        )
+                    )
+            packs.append((pack["id"], pack_api_record(pack), wallpapers))
+
+        index_path = write_catalog_index(
+            self.output_dir / INDEX_FILENAME,
+            packs,
+            {
+                "manifest_version": manifest.get("version"),
+                "generated": manifest.get("generated"),
+            },
+        )
+        logger.info(f"Generated catalog index: {index_path}")
+        return index_path
+
+    def run(self, affected=None, on_event=None, cancel=None):
+        """
+        Pack everything and return a structured result; the library entry
+        point, which never raises for a failed or cancelled run
+
+        Args:
+            affected: Pack directory names to check, see pack_wallpapers()
+            on_event: Called with a dict for every progress event: "started"
+                (packs, rebuild), "stage" (stage), "pack" (pack, id, status
+                "built", "up_to_date" or "failed", done, total) and
+                "finished" (success, cancelled, error)
+            cancel: threading.Event (anything with is_set()) that stops the
+                run at the next pack or image; a versioned build is then
+                discarded unpublished
+
+        Returns:
+            Dict with success, cancelled, error, seconds, output_dir, stats
+            and a summary of every pack in the manifest ("packs")
+        """
+        self.on_event = on_event
+        self.cancel = cancel
+        self.stats = self.empty_stats()
+        self.report = BuildReport()
+        self.packs_data = []
+        start = time.perf_counter()
+        cancelled = False
+        error = None
+        try:
+            success = self.pack_wallpapers(affected)
+        except PackCancelled:
+            logger.warning("🛑 Packing cancelled")
+            success, cancelled = False, True
+        except OutputLocked as e:
+            # Already logged by pack_wallpapers()
+            success, error = False, str(e)
+        except Exception as e:
+            logger.error(f"Packing failed: {e}")
+            success, error = False, str(e)
+
+        result = {
+            "success": success,
+            "cancelled": cancelled,
+            "error": error,
+            "seconds": round(time.perf_counter() - start, 3),
+            "output_dir": str(self.output_dir),
+            "stats": dict(self.stats),
+            "packs": [
+                {
+                    key: pack_data.get(key)
+                    for key in (
+                        "id",
+                        "name",
+                        "count",
+                        "size_bytes",
+                        "hash",
+                        "archive_format",
+                        "download_url",
+                    )
+                }
+                for pack_data in self.packs_data
+            ],
+        }
+        self.emit("finished", success=success, cancelled=cancelled, error=error)
+        self.on_event = None
+        self.cancel = None
+        return result
+
+    def pack_wallpapers(self, affected=None):
+        """
+        Main method to pack all wallpapers
+
+        Args:
+            affected: Names of the pack directories that changed; the other
+                packs reuse their last build without being looked at. None
+                checks every pack.
+        """
         logger.info("🎨 Starting HueSurf Wallpaper Packer")
         logger.info(f"Source: {self.source_dir}")
         logger.info(f"Output: {self.output_dir}")
@@ -398,30 +1328,596 @@ Licensed under MIT License
             logger.error(f"Source directory does not exist: {self.source_dir}")
             return False
 
+        # Stages run in this process read the budget; worker processes get it
+        # from _init_worker
+        set_pixel_budget(self.pixel_budget)
+
+        # Held for the whole run: concurrent runs would overwrite each
+        # other's archives, caches and manifest
+        try:
+            self.output_lock.acquire(f"pid {os.getpid()}")
+        except OutputLocked as e:
+            logger.error(f"🔒 {e}")
+            raise
+        try:
+            return self.publish_output(affected)
+        finally:
+            self.output_lock.release()
+
+    def publish_output(self, affected=None):
+        """Build the output, in a new version when versioning is on"""
+        if not self.publisher:
+            return self.build_output(affected)
+
+        # Build a new version next to the published one; readers only ever
+        # see the old version or the complete new one
+        version_dir = self.publisher.stage()
+        self.use_output_dir(version_dir)
+        try:
+            success = self.build_output(affected)
+        except BaseException:
+            self.publisher.discard(version_dir)
+            raise
+        finally:
+            self.use_output_dir(self.publisher.link_path)
+
+        if success:
+            self.publisher.publish(version_dir)
+        else:
+            self.publisher.discard(version_dir)
+        return success
+
+    def build_output(self, affected=None):
+        """Pack everything into the output directory, see pack_wallpapers()"""
         # Ensure output directories exist
         self.ensure_directories()
+        self.cache = BuildCache.load(self.output_dir / CACHE_FILENAME)
+        self.analysis = AnalysisCache.load(self.output_dir / ANALYSIS_CACHE_FILENAME)
+
+        # Process all wallpaper packs, in name order so serial and parallel
+        # runs produce the same manifest
+        with self.report.stage("scan"):
+            pack_dirs = sorted(
+                pack_dir for pack_dir in self.source_dir.iterdir() if pack_dir.is_dir()
+            )
+        if affected is not None:
+            # Packs that were never built successfully have to be processed
+            affected = set(affected) | {
+                pack_dir.name
+                for pack_dir in pack_dirs
+                if not (self.cache.get(pack_dir.name) or {}).get("pack_data")
+            }
+
+        self.emit(
+            "started",
+            packs=len(pack_dirs),
+            rebuild=len(pack_dirs) if affected is None else len(affected),
+        )
 
-        # Process all wallpaper packs
+        # Analyse the sources and look for near-duplicates before anything
+        # is written
+        analysis_keys = []
+        if self.duplicates != "off":
+            analysis_keys += self.duplicate_hash_keys()
+        if self.palette:
+            analysis_keys.append("palette")
+        images = []
+        if analysis_keys:
+            self.emit("stage", stage="analysis")
+            images = self.analyze_sources(pack_dirs, analysis_keys, affected)
+            self.analysis.save()
+        if self.duplicates != "off":
+            previous_excluded = self.excluded
+            if not self.check_duplicates(images):
+                self.cache.save()
+                return False
+            if affected is not None:
+                # Dedupe can drop copies from packs that didn't change
+                affected |= {
+                    name
+                    for name in previous_excluded.keys() | self.excluded.keys()
+                    if previous_excluded.get(name) != self.excluded.get(name)
+                }
+
+        self.pack_dirs = {}
+        rebuild_dirs = [
+            pack_dir
+            for pack_dir in pack_dirs
+            if affected is None or pack_dir.name in affected
+        ]
+        self.emit("stage", stage="packs")
+        rebuilt = dict(zip(rebuild_dirs, self.process_packs(rebuild_dirs)))
         packs_data = []
-        for pack_dir in self.source_dir.iterdir():
-            if pack_dir.is_dir():
-                pack_data = self.process_pack(pack_dir)
+        rebuilt_data = []
+        for pack_dir in pack_dirs:
+            if pack_dir in rebuilt:
+                pack_data = rebuilt[pack_dir]
                 if pack_data:
-                    packs_data.append(pack_data)
+                    rebuilt_data.append(pack_data)
+            else:
+                pack_data = self.cache.get(pack_dir.name)["pack_data"]
+            if pack_data:
+                packs_data.append(pack_data)
+                self.pack_dirs[pack_data["id"]] = pack_dir
+
+        # Render resolution variants, fanning single images out over the pool
+        if self.variants:
+            self.emit("stage", stage="variants")
+            self.build_variants(rebuilt_data)
+        else:
+            for pack_data in rebuilt_data:
+                pack_data.pop("variants", None)
+
+        if self.palette:
+            self.apply_palettes(rebuilt_data, images)
+
+        # Drop outputs of packs that were deleted or no longer have wallpapers
+        self.prune_cache(pack_dir.name for pack_dir in self.pack_dirs.values())
+        self.cache.save()
+        if self.optimizer:
+            self.optimizer.prune(
+                {
+                    source["sha256"]
+                    for key in self.cache.keys()
+                    for source in self.cache.get(key)["files"].values()
+                }
+            )
 
         if not packs_data:
             logger.warning("No wallpaper packs were processed")
             return False
 
         # Generate manifest file
-        self.generate_manifest(packs_data)
+        self.check_cancelled()
+        self.emit("stage", stage="manifest")
+        self.packs_data = packs_data
+        with self.report.stage("manifest") as record:
+            manifest_path = self.generate_manifest(packs_data)
+            record["bytes_written"] += (
+                manifest_path.stat().st_size
+                + (self.output_dir / INDEX_FILENAME).stat().st_size
+            )
 
         # Print statistics
         self.print_statistics()
+        if self.report_path:
+            self.report.write(self.report_path, self.stats)
 
         logger.info("✅ Wallpaper packing completed successfully!")
         return True
 
+    def analyze_sources(self, pack_dirs, keys, affected=None):
+        """
+        Hash every source and run the named image analyzers on it
+
+        Results come from the analysis cache where possible; the remaining
+        distinct images are analysed in the worker pool. Source hashes are
+        recorded in the build cache, so the pack stages don't hash again.
+        Packs outside affected (if given) are taken from the build cache
+        without touching their files.
+
+        Returns:
+            List of dicts (pack, path, sha256, size and the analysis results)
+            for every source image, in pack and path order
+        """
+        images = []
+        for pack_dir in pack_dirs:
+            previous = self.cache.get(pack_dir.name) or {}
+            if affected is not None and pack_dir.name not in affected:
+                files = previous.get("files", {})
+            else:
+                with self.report.stage("scan", pack_dir.name):
+                    image_files = self.get_image_files(pack_dir)
+                    files = self.cache.fingerprint_files(
+                        pack_dir, image_files, previous.get("files", {})
+                    )
+                if not image_files:
+                    continue
+            with self.report.stage("hash", pack_dir.name) as record:
+                for relative, source in files.items():
+                    if source["sha256"] is None:
+                        source["sha256"] = file_sha256(pack_dir / relative)
+                        record["bytes_read"] += source["size"]
+            for relative, source in files.items():
+                images.append(
+                    {
+                        "pack": pack_dir.name,
+                        "path": relative,
+                        "source": pack_dir / relative,
+                        "sha256": source["sha256"],
+                        "size": source["size"],
+                    }
+                )
+            self.cache.set(pack_dir.name, {**previous, "files": files})
+
+        tasks = {}
+        for image in images:
+            missing = self.analysis.missing(image["sha256"], keys)
+            if missing and image["sha256"] not in tasks:
+                tasks[image["sha256"]] = (image["source"], missing)
+        if tasks:
+            logger.info(f"Analysing {len(tasks)} images")
+        with self.report.stage("analysis") as record:
+            results = self.map_images(_analyze_image, list(tasks.values()))
+            record["bytes_read"] += sum(
+                source.stat().st_size for source, _ in tasks.values()
+            )
+        for sha256, result in zip(tasks, results):
+            if result is not None:
+                self.analysis.update(sha256, result)
+
+        self.analysis.prune(image["sha256"] for image in images)
+        for image in images:
+            image.update(self.analysis.get(image["sha256"]))
+        return images
+
+    def duplicate_hash_keys(self):
+        """Perceptual hashes near-duplicate detection compares"""
+        return ["phash", "dhash"] if "phash" in ANALYZERS else ["dhash"]
+
+    def check_duplicates(self, images):
+        """
+        Report clusters of near-duplicate wallpapers and apply the policy
+
+        With pHash available (NumPy installed) it finds the candidates and the
+        dHash has to agree as well; without NumPy the dHash decides alone.
+
+        Returns:
+            False if the "fail" policy found duplicates, otherwise True
+        """
+        primary = self.duplicate_hash_keys()[0]
+        hashed = [image for image in images if image.get(primary)]
+        entries = [
+            {
+                "sha256": image["sha256"],
+                "hash": image[primary],
+                "confirm": image.get("dhash") if primary == "phash" else None,
+            }
+            for image in hashed
+        ]
+        confirm_threshold = self.duplicate_threshold if primary == "phash" else None
+        clusters = find_clusters(entries, self.duplicate_threshold, confirm_threshold)
+
+        def rank(i):
+            # Keep the highest resolution copy, then the biggest file
+            image = hashed[i]
+            return (-image.get("width", 0) * image.get("height", 0), -image["size"])
+
+        def label(image):
+            return f"{image['pack']}/{image['path']}"
+
+        self.excluded = {}
+        for cluster in clusters:
+            members = [hashed[i] for i in cluster]
+            packs = {image["pack"] for image in members}
+            scope = "across packs" if len(packs) > 1 else "within a pack"
+            names = ", ".join(label(image) for image in members)
+            self.stats["duplicate_clusters"] += 1
+
+            if self.duplicates == "fail":
+                logger.error(f"Near-duplicate wallpapers ({scope}): {names}")
+            elif self.duplicates == "dedupe":
+                # Only images near their keeper go; the cluster may chain
+                # through images that aren't near each other
+                keepers, dropped = pick_keepers(
+                    entries,
+                    cluster,
+                    rank,
+                    self.duplicate_threshold,
+                    confirm_threshold,
+                )
+                logger.warning(
+                    f"🔁 Near-duplicates ({scope}), keeping "
+                    f"{', '.join(label(hashed[k]) for k in keepers)}: {names}"
+                )
+                for i, keeper in sorted(dropped.items()):
+                    image = hashed[i]
+                    logger.debug(
+                        f"Dropping {label(image)} as a copy of {label(hashed[keeper])}"
+                    )
+                    self.excluded.setdefault(image["pack"], set()).add(image["path"])
+                    self.stats["duplicates_removed"] += 1
+            else:
+                logger.warning(f"🔁 Near-duplicate wallpapers ({scope}): {names}")
+
+        if clusters and self.duplicates == "fail":
+            logger.error(
+                f"Found {len(clusters)} clusters of near-duplicate wallpapers; "
+                f"remove them or pack with --duplicates warn/dedupe"
+            )
+            return False
+        return True
+
+    def apply_palettes(self, packs_data, images):
+        """
+        Add wallpaper and pack palettes to the manifest
+
+        Pack colours written by hand in pack_info.json win; packs without
+        them get primary, secondary and accent from their dominant colours.
+        """
+        palettes = {}
+        for image in images:
+            if image.get("palette"):
+                palettes.setdefault(image["pack"], {})[image["path"]] = image["palette"]
+
+        for pack_data in packs_data:
+            pack_dir = self.pack_dirs[pack_data["id"]]
+            excluded = self.excluded.get(pack_dir.name, set())
+            wallpapers = {
+                path: palette
+                for path, palette in sorted(palettes.get(pack_dir.name, {}).items())
+                if path not in excluded
+            }
+            combined = combine_palettes(list(wallpapers.values()))
+            pack_data["palette"] = {**combined, "wallpapers": wallpapers}
+
+            if combined["colors"] and not self.load_pack_info(pack_dir).get("colors"):
+                pack_data["colors"] = dict(
+                    zip(
+                        ("primary", "secondary", "accent"),
+                        (entry["color"] for entry in combined["colors"]),
+                    )
+                )
+            self.cache.get(pack_dir.name)["pack_data"] = pack_data
+
+    def watch(self, debounce=2.0):
+        """
+        Pack everything, then repack whenever the source tree changes
+
+        Each debounced batch of filesystem events repacks only the packs it
+        touched; after a failed build, the next batch repacks everything.
+        Runs until interrupted.
+        """
+        try:
+            full_repack = not self.pack_wallpapers()
+        except Exception as e:
+            # Keep watching; the next change retries every pack
+            logger.error(f"Initial pack failed: {e}")
+            full_repack = True
+        watcher = create_watcher(self.source_dir)
+        logger.info(f"👀 Watching {self.source_dir} for changes")
+        try:
+            while True:
+                changed = wait_for_batch(watcher, debounce)
+                affected = None if full_repack else self.affected_packs(changed)
+                if affected is not None and not affected:
+                    continue
+                logger.info(
+                    "👀 Changes in "
+                    + (", ".join(sorted(affected)) if affected else "every pack")
+                    + ", repacking"
+                )
+                self.stats = self.empty_stats()
+                self.report = BuildReport()
+                try:
+                    success = self.pack_wallpapers(affected)
+                except Exception as e:
+                    # Keep watching; the next change retries the pack
+                    logger.error(f"Repack failed: {e}")
+                    success = False
+                if affected is None:
+                    full_repack = not success
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+            return True
+        finally:
+            watcher.close()
+
+    def affected_packs(self, changed):
+        """Pack directory names a batch of changed paths belongs to, None = all"""
+        if changed is RESCAN:
+            return None
+        affected = set()
+        for path in changed:
+            try:
+                relative = path.relative_to(self.source_dir)
+            except ValueError:
+                continue
+            if relative.parts:
+                affected.add(relative.parts[0])
+        return affected
+
+    def process_packs(self, pack_dirs):
+        """Process packs, in worker processes when jobs > 1, in input order"""
+        if self.jobs == 1 or len(pack_dirs) < 2:
+            packs_data = []
+            for done, pack_dir in enumerate(pack_dirs, 1):
+                self.check_cancelled()
+                up_to_date = self.stats["packs_up_to_date"]
+                packs_data.append(self.process_pack(pack_dir))
+                self.emit_pack(
+                    pack_dir,
+                    packs_data[-1],
+                    self.stats["packs_up_to_date"] > up_to_date,
+                    done,
+                    len(pack_dirs),
+                )
+            return packs_data
+
+        logger.info(f"Packing {len(pack_dirs)} packs with {self.jobs} workers")
+        options = self.worker_options()
+        with self.worker_pool(len(pack_dirs)) as pool:
+            futures = {
+                pool.submit(
+                    _process_pack_in_worker,
+                    options,
+                    pack_dir,
+                    self.cache.get(pack_dir.name),
+                    self.excluded.get(pack_dir.name, set()),
+                ): pack_dir
+                for pack_dir in pack_dirs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                self.check_cancelled(futures)
+                pack_data, stats = future.result()[:2]
+                self.emit_pack(
+                    futures[future],
+                    pack_data,
+                    stats["packs_up_to_date"] > 0,
+                    done,
+                    len(pack_dirs),
+                )
+            results = [future.result() for future in futures]
+
+        # Merge worker statistics and cache entries in pack order so totals
+        # are deterministic
+        packs_data = []
+        for pack_dir, (pack_data, stats, cache_entry, report) in zip(
+            pack_dirs, results
+        ):
+            for key, value in stats.items():
+                self.stats[key] += value
+            self.report.merge(*report)
+            if cache_entry:
+                self.cache.set(pack_dir.name, cache_entry)
+            packs_data.append(pack_data)
+        return packs_data
+
+    def emit_pack(self, pack_dir, pack_data, up_to_date, done, total):
+        """Report a finished pack to the progress callback"""
+        if not pack_data:
+            status = "failed"
+        elif up_to_date:
+            status = "up_to_date"
+        else:
+            status = "built"
+        self.emit(
+            "pack",
+            pack=pack_dir.name,
+            id=pack_data["id"] if pack_data else None,
+            status=status,
+            done=done,
+            total=total,
+        )
+
+    def build_variants(self, packs_data):
+        """
+        Render the resolution ladder of every wallpaper and list it in the
+        manifest
+
+        Runs after the packs are processed, so every source hash is known. The
+        stale images of all packs go into one list that is mapped over the
+        worker pool image by image, which keeps the workers busy even when
+        one pack is much bigger than the others.
+        """
+        tasks = []
+        for pack_data in packs_data:
+            pack_dir = self.pack_dirs[pack_data["id"]]
+            entry = self.cache.get(pack_dir.name)
+            stages = entry["stages"]
+
+            # Forget variants of wallpapers that were removed from the pack
+            for stage in [name for name in stages if name.startswith("variants/")]:
+                if stage.split("/", 1)[1] not in entry["files"]:
+                    self.remove_outputs(stages.pop(stage)["outputs"])
+
+            for relative, source in sorted(entry["files"].items()):
+                stage = f"variants/{relative}"
+                if not self.stage_is_fresh(entry, stage, self.variants_digest(source)):
+                    tasks.append((pack_data, relative))
+
+        if tasks:
+            logger.info(f"Rendering variants of {len(tasks)} wallpapers")
+        with self.report.stage("variants") as record:
+            results = self.map_images(
+                _render_variants,
+                [
+                    (
+                        self.pack_dirs[pack_data["id"]] / relative,
+                        self.output_dir / "variants" / pack_data["id"],
+                        variant_stem(relative),
+                    )
+                    for pack_data, relative in tasks
+                ],
+            )
+            for (pack_data, relative), variants in zip(tasks, results):
+                entry = self.cache.get(self.pack_dirs[pack_data["id"]].name)
+                record["bytes_read"] += entry["files"][relative]["size"]
+                record["bytes_written"] += sum(
+                    variant["size_bytes"] for variant in variants or []
+                )
+
+        for (pack_data, relative), variants in zip(tasks, results):
+            entry = self.cache.get(self.pack_dirs[pack_data["id"]].name)
+            stage = f"variants/{relative}"
+            if variants is None:
+                old_record = entry["stages"].pop(stage, None)
+                if old_record:
+                    self.remove_outputs(old_record["outputs"])
+                continue
+            output_paths = []
+            for variant in variants:
+                output_paths.append(variant.pop("path"))
+                variant["url"] = (
+                    f"/static/wallpapers/variants/{pack_data['id']}/"
+                    f"{output_paths[-1].name}"
+                )
+            entry["stages"][stage] = self.stage_record(
+                entry,
+                stage,
+                self.variants_digest(entry["files"][relative]),
+                output_paths,
+                variants=variants,
+            )
+            self.stats["variants_created"] += len(variants)
+
+        for pack_data in packs_data:
+            entry = self.cache.get(self.pack_dirs[pack_data["id"]].name)
+            pack_data["variants"] = self.variant_lists(entry)
+            entry["pack_data"] = pack_data
+
+    def variant_lists(self, entry):
+        """Manifest variant lists of a pack, by wallpaper path in the pack"""
+        return {
+            stage.split("/", 1)[1]: record["variants"]
+            for stage, record in sorted(entry["stages"].items())
+            if stage.startswith("variants/")
+        }
+
+    def map_images(self, func, args_list):
+        """Run an image task for every argument tuple, over the pool if jobs > 1"""
+        if self.jobs == 1 or len(args_list) < 2:
+            results = []
+            for args in args_list:
+                self.check_cancelled()
+                results.append(func(*args))
+            return results
+        with self.worker_pool(len(args_list)) as pool:
+            futures = [pool.submit(func, *args) for args in args_list]
+            results = []
+            for future in futures:
+                self.check_cancelled(futures)
+                results.append(future.result())
+            return results
+
+    def worker_pool(self, tasks):
+        """Process pool for up to tasks tasks, with the image limits applied"""
+        return ProcessPoolExecutor(
+            max_workers=min(self.jobs, tasks),
+            initializer=_init_worker,
+            initargs=(self.pixel_budget, self.worker_memory),
+        )
+
+    def worker_options(self):
+        """Constructor arguments for the packer each worker process builds"""
+        return {
+            "source_dir": self.source_dir,
+            "output_dir": self.output_dir,
+            "force": self.force,
+            "verbose": self.verbose,
+            "compression": self.compression,
+            "variants": self.variants,
+            "optimize": self.optimizer is not None,
+            "keep_icc": self.optimizer.keep_icc if self.optimizer else False,
+            "reproducible": self.reproducible,
+            "pixel_budget": self.pixel_budget,
+            "volume_size": self.volume_size,
+            "archive_format": self.archive_format,
+            "preview_tiles": self.preview_tiles,
+            "profile_pack": self.profile_pack,
+            "profile_path": self.profile_path,
+        }
+
     def print_statistics(self):
         """Print packing statistics"""
         print("\n" + "=" * 50)
@@ -430,11 +1926,101 @@ Licensed under MIT License
         print(f"Packs processed:      {self.stats['packs_processed']}")
         print(f"Wallpapers processed: {self.stats['wallpapers_processed']}")
         print(f"ZIP files created:    {self.stats['zips_created']}")
+        if self.stats["volumes_created"]:
+            print(f"Volumes created:      {self.stats['volumes_created']}")
+        if self.stats["tar_zst_created"]:
+            print(f"tar.zst created:      {self.stats['tar_zst_created']}")
         print(f"Previews created:     {self.stats['previews_created']}")
+        print(f"Variants created:     {self.stats['variants_created']}")
+        print(f"Packs up to date:     {self.stats['packs_up_to_date']}")
         print(f"Total size:           {self.stats['total_size'] / 1024 / 1024:.1f} MB")
+        if self.stats["duplicate_clusters"]:
+            print(
+                f"Near-duplicates:      {self.stats['duplicate_clusters']} clusters, "
+                f"{self.stats['duplicates_removed']} removed"
+            )
+        if self.optimizer:
+            print(
+                f"Optimization saved:   "
+                f"{self.stats['optimize_bytes_saved'] / 1024 / 1024:.1f} MB"
+            )
+        print(
+            f"Compression saved:    "
+            f"{self.stats['compression_bytes_saved'] / 1024 / 1024:.1f} MB "
+            f"in {self.stats['compression_cpu_seconds']:.2f} s CPU"
+        )
         print("=" * 50)
 
 
+def _init_worker(pixel_budget, memory_limit):
+    """
+    Apply the image limits in a new worker process
+
+    With an address space limit, an image that needs more memory raises
+    MemoryError in its own task instead of getting the worker (or the build
+    box) killed.
+    """
+    set_pixel_budget(pixel_budget)
+    replace_pillow_limit(pixel_budget)
+    if memory_limit:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_limit = min(memory_limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def image_error(e):
+    """Readable reason an image couldn't be processed"""
+    if isinstance(e, MemoryError):
+        return "out of memory (raise --worker-memory or lower --pixel-budget)"
+    return str(e) or type(e).__name__
+
+
+def _process_pack_in_worker(options, pack_dir, cache_entry, excluded):
+    """
+    Process one pack in a worker, returning its data, stats, cache entry and
+    report (stage records and peak memory)
+    """
+    packer = WallpaperPacker(**options)
+    if cache_entry:
+        packer.cache.set(pack_dir.name, cache_entry)
+    packer.excluded[pack_dir.name] = excluded
+    pack_data = packer.process_pack(pack_dir)
+    return (
+        pack_data,
+        packer.stats,
+        packer.cache.get(pack_dir.name),
+        (packer.report.packs, peak_rss_bytes()),
+    )
+
+
+def _analyze_image(image_path, keys):
+    """Analyse one image in a worker, None if it can't be read"""
+    try:
+        return analyze_image(image_path, keys)
+    except Exception as e:
+        logger.error(f"Failed to analyse {image_path}: {image_error(e)}")
+        return None
+
+
+def _optimize_source(optimizer, source_path, sha256):
+    """Optimize one image in a worker; (path to zip, bytes saved)"""
+    try:
+        return optimizer.lookup(source_path, sha256)
+    except Exception as e:
+        logger.error(f"Failed to optimize {source_path}: {image_error(e)}")
+        return source_path, 0
+
+
+def _render_variants(image_path, output_dir, stem):
+    """Render one wallpaper's variants in a worker, None if it can't be read"""
+    try:
+        return render_variants(image_path, output_dir, stem)
+    except Exception as e:
+        logger.error(f"Failed to render variants of {image_path}: {image_error(e)}")
+        return None
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Pack HueSurf wallpapers for web distribution"
@@ -442,21 +2028,197 @@ def main():
     parser.add_argument("--source", help="Source wallpapers directory")
     parser.add_argument("--output", help="Output static directory")
     parser.add_argument(
-        "--force", action="store_true", help="Force overwrite existing files"
+        "--force",
+        action="store_true",
+        help="Rebuild every pack, ignoring the build cache",
     )
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Pack in N worker processes (default: 1, 0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--trial-compression",
+        action="store_true",
+        help="Deflate a sample of each file and store it unless that saves enough",
+    )
+    parser.add_argument(
+        "--min-savings",
+        type=float,
+        default=5.0,
+        help="Percent a trial compression must save to keep it (default: 5)",
+    )
+    parser.add_argument(
+        "--no-variants",
+        action="store_true",
+        help="Skip rendering the WebP/JPEG resolution ladder of each wallpaper",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Losslessly optimize PNGs and strip JPEG metadata before zipping",
+    )
+    parser.add_argument(
+        "--keep-icc",
+        action="store_true",
+        help="Keep ICC colour profiles when optimizing",
+    )
+    parser.add_argument(
+        "--duplicates",
+        choices=["off", "warn", "fail", "dedupe"],
+        default="warn",
+        help="Near-duplicate wallpapers: report them (default), fail, "
+        "pack only the best copy, or skip the check",
+    )
+    parser.add_argument(
+        "--duplicate-threshold",
+        type=int,
+        default=8,
+        help="Max perceptual hash distance in bits for near-duplicates (default: 8)",
+    )
+    parser.add_argument(
+        "--no-palette",
+        action="store_true",
+        help="Skip extracting dominant colours into the manifest",
+    )
+    parser.add_argument(
+        "--reproducible",
+        action="store_true",
+        help="Byte-identical zips and manifest from identical inputs "
+        "(timestamps from SOURCE_DATE_EPOCH or 1980-01-01)",
+    )
+    parser.add_argument(
+        "--pixel-budget",
+        type=float,
+        default=PIXEL_BUDGET / 1e6,
+        help="Megapixels a source may decode to for thumbnails, variants and "
+        f"analysis (default: {PIXEL_BUDGET / 1e6:.0f}, 0 = no limit)",
+    )
+    parser.add_argument(
+        "--worker-memory",
+        type=int,
+        metavar="MB",
+        help="Memory limit of each worker process with --jobs > 1",
+    )
+    parser.add_argument(
+        "--volume-size",
+        type=float,
+        metavar="MB",
+        help="Also split packs bigger than this into self-contained zip "
+        "volumes for parallel download",
+    )
+    parser.add_argument(
+        "--archive-format",
+        choices=ARCHIVE_FORMATS,
+        default="zip",
+        help="Archive format of packs whose pack_info.json doesn't set "
+        '"archive_format" (tar.zst needs zstandard; default: zip)',
+    )
+    parser.add_argument(
+        "--preview-tiles",
+        type=int,
+        default=MOSAIC_TILES,
+        metavar="N",
+        help=f"Wallpapers in each pack's preview mosaic (default: {MOSAIC_TILES}, "
+        "1 = first wallpaper only)",
+    )
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Publish each build as a new output version with an atomic "
+        "symlink swap, keeping N versions (default: 0, write in place)",
+    )
+    parser.add_argument(
+        "--rollback",
+        nargs="?",
+        const="",
+        metavar="VERSION",
+        help="Publish the previous output version (or VERSION) and exit",
+    )
+    parser.add_argument(
+        "--versions-dir",
+        help="Directory output versions live in (default: "
+        "website/.wallpapers-versions, or next to --output); keep it out of "
+        "the served static directory",
+    )
+    parser.add_argument(
+        "--report",
+        help="Write per-pack and per-stage timings, bytes and peak memory "
+        "to this JSON file",
+    )
+    parser.add_argument(
+        "--profile-pack",
+        metavar="NAME",
+        help="Run the pack in this source directory under cProfile",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="File for the --profile-pack pstats data (default: NAME.pstats)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and repack the packs that change",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="Seconds without changes before a watch batch is repacked (default: 2)",
+    )
 
     args = parser.parse_args()
 
+    # This process only packs, so the budget can replace Pillow's check
+    replace_pillow_limit(int(args.pixel_budget * 1e6))
+
     try:
         packer = WallpaperPacker(
             source_dir=args.source,
             output_dir=args.output,
             force=args.force,
             verbose=args.verbose,
+            jobs=args.jobs or os.cpu_count(),
+            compression=CompressionPolicy(
+                trial=args.trial_compression, min_savings=args.min_savings / 100
+            ),
+            variants=not args.no_variants,
+            optimize=args.optimize,
+            keep_icc=args.keep_icc,
+            duplicates=args.duplicates,
+            duplicate_threshold=args.duplicate_threshold,
+            palette=not args.no_palette,
+            reproducible=args.reproducible,
+            pixel_budget=int(args.pixel_budget * 1e6),
+            worker_memory=(
+                args.worker_memory * 1024 * 1024 if args.worker_memory else None
+            ),
+            keep_versions=args.keep_versions,
+            versions_dir=args.versions_dir,
+            volume_size=(
+                int(args.volume_size * 1024 * 1024) if args.volume_size else None
+            ),
+            archive_format=args.archive_format,
+            preview_tiles=args.preview_tiles,
+            report_path=args.report,
+            profile_pack=args.profile_pack,
+            profile_path=args.profile_output,
         )
 
-        success = packer.pack_wallpapers()
+        if args.rollback is not None:
+            VersionedOutput(
+                packer.output_dir, versions_dir=packer.versions_dir
+            ).rollback(args.rollback or None)
+            success = True
+        elif args.watch:
+            success = packer.watch(args.debounce)
+        else:
+            success = packer.run()["success"]
         exit(0 if success else 1)
 
     except KeyboardInterrupt:
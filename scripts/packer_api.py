@@ -0,0 +1,246 @@
+"""
+HueSurf Packer API
+
+Runs WallpaperPacker in-process on a background thread, for callers like
+the website that can't block on a packing run or shell out to the CLI:
+
+    job = PackJob({"force": True})
+    job.start()
+    for event in job.events():
+        print(event)
+    result = job.wait()
+
+A job keeps every progress event and its final result, so status() can be
+polled from any thread while it runs. cancel() stops the run at the next
+pack or image.
+
+start() takes the packer's output lock before the thread starts, so a second
+job on the same output fails right away with OutputLocked, whichever process
+runs the other one. With a state_dir, the job also writes its status to
+<state_dir>/<id>.json and stops when <id>.cancel appears there, so other
+processes (website workers) can follow and cancel it with read_status() and
+request_cancel().
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import json
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from pack_wallpapers import WallpaperPacker
+from publish import OutputLock, atomic_output
+
+# Events included in status(); the job itself keeps all of them
+STATUS_EVENTS = 20
+
+
+class CancelFlag:
+    """threading.Event-like cancel flag that can also be set by a file"""
+
+    def __init__(self, path=None):
+        self.event = threading.Event()
+        self.path = path
+
+    def set(self):
+        self.event.set()
+
+    def is_set(self):
+        if not self.event.is_set() and self.path and self.path.exists():
+            self.event.set()
+        return self.event.is_set()
+
+
+def status_path(state_dir, job_id):
+    return Path(state_dir) / f"{job_id}.json"
+
+
+def read_status(state_dir, job_id):
+    """
+    Last status a job wrote to state_dir, None for an unknown job
+
+    A job still "running" while nobody holds its output lock died with its
+    process; it's reported as "interrupted".
+    """
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(status_path(state_dir, job_id), "r", encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if status["state"] == "running" and not OutputLock(status["output_dir"]).locked():
+        status["state"] = "interrupted"
+    return status
+
+
+def prune_status(state_dir, keep):
+    """Delete the status files of all but the newest keep jobs"""
+    paths = sorted(
+        Path(state_dir).glob("*.json"), key=lambda path: path.stat().st_mtime
+    )
+    for path in paths[: max(0, len(paths) - keep)]:
+        path.unlink(missing_ok=True)
+
+
+def request_cancel(state_dir, job_id):
+    """Ask a job running in any process to stop; False for an unknown job"""
+    status = read_status(state_dir, job_id)
+    if status is None:
+        return False
+    if status["state"] == "running":
+        (Path(state_dir) / f"{job_id}.cancel").touch()
+    return True
+
+
+class PackJob:
+    def __init__(self, packer_options=None, affected=None, state_dir=None):
+        """
+        Initialize a packing job
+
+        Args:
+            packer_options: WallpaperPacker constructor arguments
+            affected: Pack directory names to check (default: every pack)
+            state_dir: Directory the job's status is shared through
+        """
+        self.id = uuid.uuid4().hex[:12]
+        # Built here, so bad options raise in the caller's thread
+        self.packer = WallpaperPacker(**(packer_options or {}))
+        self.affected = affected
+        self.output_dir = self.packer.output_dir
+        self.state_dir = Path(state_dir) if state_dir else None
+        if self.state_dir:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.cancel_event = CancelFlag(
+            self.state_dir / f"{self.id}.cancel" if self.state_dir else None
+        )
+        self.changed = threading.Condition()
+        self.history = []
+        self.result = None
+        self.state = "pending"
+        self.created = time.time()
+        self.finished = None
+        self.thread = None
+
+    def start(self):
+        """
+        Start packing on a daemon thread; returns the job
+
+        Raises:
+            OutputLocked: Another run is writing the packer's output
+        """
+        self.packer.output_lock.acquire(self.id)
+        self.state = "running"
+        self.save_status()
+        self.thread = threading.Thread(
+            target=self.run, name=f"pack-job-{self.id}", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def run(self):
+        """Pack in the calling thread (start() runs this on the job's thread)"""
+        try:
+            result = self.packer.run(self.affected, self.on_event, self.cancel_event)
+            with self.changed:
+                self.result = result
+                if result["success"]:
+                    self.state = "succeeded"
+                else:
+                    self.state = "cancelled" if result["cancelled"] else "failed"
+                self.finished = time.time()
+            # Saved before the lock goes, so the job never looks interrupted
+            self.save_status()
+        finally:
+            self.packer.output_lock.release()
+        if self.state_dir:
+            (self.state_dir / f"{self.id}.cancel").unlink(missing_ok=True)
+        # Waiters wake once the output is free for the next job
+        with self.changed:
+            self.changed.notify_all()
+        return result
+
+    def on_event(self, event):
+        with self.changed:
+            self.history.append(event)
+            self.changed.notify_all()
+        if event["event"] != "finished":
+            self.save_status()
+
+    def save_status(self):
+        """Share status() through state_dir, if the job has one"""
+        if not self.state_dir:
+            return
+        status = self.status()
+        with atomic_output(status_path(self.state_dir, self.id)) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(status, f)
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def cancel(self):
+        """Ask the run to stop at the next pack or image"""
+        self.cancel_event.set()
+
+    def wait(self, timeout=None):
+        """Result of the run, or None if it's still running after timeout"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.done, timeout)
+            return self.result
+
+    def events(self, timeout=None):
+        """
+        Yield every progress event, past and future, until the run finishes
+
+        Args:
+            timeout: Seconds to wait for the next event before giving up
+        """
+        seen = 0
+        while True:
+            with self.changed:
+                self.changed.wait_for(
+                    lambda: len(self.history) > seen or self.done, timeout
+                )
+                new = self.history[seen:]
+                done = self.done and len(self.history) == seen + len(new)
+            if not new and not done:
+                return
+            seen += len(new)
+            yield from new
+            if done:
+                return
+
+    def status(self):
+        """JSON-ready snapshot of the job"""
+        with self.changed:
+            packs = [event for event in self.history if event["event"] == "pack"]
+            started = next(
+                (event for event in self.history if event["event"] == "started"), {}
+            )
+            return {
+                "id": self.id,
+                "state": self.state,
+                "output_dir": str(self.output_dir),
+                "created": self.created,
+                "finished": self.finished,
+                "cancel_requested": self.cancel_event.is_set(),
+                "progress": {
+                    "packs_done": len(packs),
+                    "packs_total": started.get("rebuild"),
+                    "stage": next(
+                        (
+                            event["stage"]
+                            for event in reversed(self.history)
+                            if event["event"] == "stage"
+                        ),
+                        None,
+                    ),
+                },
+                "events": self.history[-STATUS_EVENTS:],
+                "result": self.result,
+            }
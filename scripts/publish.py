@@ -0,0 +1,296 @@
+"""
+HueSurf Versioned Publishing
+
+Lets the packer build into a fresh version directory and publish it with a
+single atomic symlink swap, so the website never sees a half-written zip or
+a manifest that points at files that don't exist yet:
+
+    static/wallpapers -> ../.wallpapers-versions/20261019T101500123456
+    .wallpapers-versions/
+        20261019T094500000001/    previous versions, kept for rollback
+        20261019T101500123456/    published
+
+The versions live outside the directory the website serves, so only the
+published one is reachable through the link; old versions and their build
+caches aren't.
+
+A new version starts as a hardlinked clone of the published one, so
+unchanged outputs (and the build caches) cost no copying. Because of the
+hardlinks, nothing in a version directory may be rewritten in place: every
+writer puts a temporary file next to its output and renames it over the
+old one (atomic_output), which gives the new version a new inode and leaves
+the published file untouched.
+
+OutputLock keeps two packer runs (other processes, website workers or
+threads) from writing the same output at once.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Version name of an output directory from before versioning; sorts first
+UNVERSIONED_NAME = "0-unversioned"
+
+# Versions kept, the published one included, unless asked for another number
+DEFAULT_KEEP_VERSIONS = 3
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yield a temporary path to write path's new contents to
+
+    The file is renamed over path when the block succeeds and deleted when
+    it raises. The temporary name ends in .tmp, so writers that pick a format
+    from the extension have to name it explicitly.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class OutputLocked(Exception):
+    """Another packer run holds the output lock"""
+
+
+class OutputLock:
+    """
+    Exclusive flock on a lock file next to an output directory
+
+    The lock file sits beside the directory rather than in it, so it stays
+    the same file while versioned publishing swaps the directory. Holding it
+    is reentrant within one OutputLock; a second OutputLock on the same path
+    fails even in the same process. Without fcntl (Windows) nothing is
+    locked.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir.with_name(f".{self.output_dir.name}.lock")
+        self.file = None
+        self.depth = 0
+
+    def acquire(self, owner=""):
+        """
+        Take the lock without waiting and record owner in the lock file
+
+        Raises:
+            OutputLocked: Another run holds the lock
+        """
+        if self.depth:
+            self.depth += 1
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "a+", encoding="utf-8")
+        if fcntl:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                raise OutputLocked(
+                    f"Another packer run is writing {self.output_dir} "
+                    f"({self.path} is locked)"
+                )
+        f.seek(0)
+        f.truncate()
+        f.write(owner)
+        f.flush()
+        self.file = f
+        self.depth = 1
+        return self
+
+    def release(self):
+        if not self.depth:
+            return
+        self.depth -= 1
+        if not self.depth:
+            # Closing the file drops the flock
+            self.file.close()
+            self.file = None
+
+    @property
+    def held(self):
+        return self.depth > 0
+
+    def locked(self):
+        """Whether any run holds the lock, this one included"""
+        if self.held:
+            return True
+        if not fcntl or not self.path.exists():
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                return True
+        return False
+
+    def owner(self):
+        """What the holder recorded when it took the lock, None if it's free"""
+        if not self.locked():
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class VersionedOutput:
+    def __init__(self, link_path, keep=DEFAULT_KEEP_VERSIONS, versions_dir=None):
+        """
+        Initialize versioned publishing
+
+        Args:
+            link_path: Path readers use; becomes a symlink to the published
+                version
+            keep: Number of versions kept, the published one included
+            versions_dir: Directory the versions live in (default:
+                .<link name>-versions next to the link); keep it out of any
+                directory that is served as is
+        """
+        self.link_path = Path(link_path)
+        self.legacy_dir = self.link_path.parent / f".{self.link_path.name}-versions"
+        self.versions_dir = Path(versions_dir) if versions_dir else self.legacy_dir
+        self.keep = max(1, keep)
+
+    def versions(self):
+        """Version directories, oldest first"""
+        if not self.versions_dir.is_dir():
+            return []
+        return sorted(path for path in self.versions_dir.iterdir() if path.is_dir())
+
+    def published(self):
+        """Version directory the link points at, or None"""
+        if not self.link_path.is_symlink():
+            return None
+        target = Path(os.readlink(self.link_path))
+        if Path(os.path.realpath(self.link_path)).parent != Path(
+            os.path.realpath(self.versions_dir)
+        ):
+            # Still published from the old versions directory next to the link
+            return self.link_path.parent / target
+        return self.versions_dir / target.name
+
+    def stage(self):
+        """
+        Create the next version directory as a hardlinked clone of the
+        published output
+
+        An output directory from before versioning was turned on is cloned
+        too and replaced by the link on the first publish.
+        """
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        version_dir = self.versions_dir / datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        version_dir.mkdir()
+
+        current = self.published()
+        if current is None and self.link_path.is_dir():
+            current = self.link_path
+        if current is not None:
+            shutil.copytree(
+                current,
+                version_dir,
+                symlinks=True,
+                copy_function=os.link,
+                dirs_exist_ok=True,
+            )
+        logger.debug(f"Staged output version: {version_dir}")
+        return version_dir
+
+    def publish(self, version_dir):
+        """Point the link at version_dir in one rename, then prune old versions"""
+        version_dir = Path(version_dir)
+        if self.link_path.is_dir() and not self.link_path.is_symlink():
+            # First versioned publish: keep the plain directory as the oldest
+            # version. Readers see the path missing for the moment between
+            # the two renames.
+            self.link_path.rename(self.versions_dir / UNVERSIONED_NAME)
+
+        self.point_to(version_dir)
+        logger.info(f"🚀 Published {self.link_path} -> {version_dir.name}")
+        self.adopt_legacy_versions()
+        self.prune()
+
+    def adopt_legacy_versions(self):
+        """
+        Move versions out of the old default versions directory next to the
+        link into versions_dir, so they stop being served with the link
+        """
+        legacy = self.legacy_dir
+        if not legacy.is_dir() or legacy.resolve() == self.versions_dir.resolve():
+            return
+        for path in sorted(legacy.iterdir()):
+            if path.is_dir() and not (self.versions_dir / path.name).exists():
+                shutil.move(path, self.versions_dir / path.name)
+        shutil.rmtree(legacy, ignore_errors=True)
+        logger.info(
+            f"📦 Moved old output versions from {legacy} to {self.versions_dir}"
+        )
+
+    def point_to(self, version_dir):
+        """Swap the link to version_dir atomically (a new link renamed over it)"""
+        tmp_link = self.link_path.with_name(f".{self.link_path.name}.link.tmp")
+        tmp_link.unlink(missing_ok=True)
+        os.symlink(os.path.relpath(version_dir, self.link_path.parent), tmp_link)
+        os.replace(tmp_link, self.link_path)
+
+    def discard(self, version_dir):
+        """Delete a staged version that won't be published"""
+        shutil.rmtree(version_dir, ignore_errors=True)
+
+    def prune(self):
+        """Delete the oldest versions beyond keep, never the published one"""
+        published = self.published()
+        versions = [path for path in self.versions() if path != published]
+        for path in versions[: max(0, len(versions) - (self.keep - 1))]:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.debug(f"Removed old output version: {path.name}")
+
+    def rollback(self, version=None):
+        """
+        Publish an older version
+
+        Args:
+            version: Version directory name (default: the one before the
+                published version)
+
+        Returns:
+            The version directory now published
+        """
+        versions = self.versions()
+        published = self.published()
+        if version:
+            target = self.versions_dir / version
+            if target not in versions:
+                raise ValueError(f"No output version named {version}")
+        else:
+            older = [path for path in versions if published and path < published]
+            if not older:
+                raise ValueError("No older output version to roll back to")
+            target = older[-1]
+
+        self.point_to(target)
+        logger.info(f"⏪ Rolled {self.link_path} back to {target.name}")
+        return target
@@ -0,0 +1,146 @@
+"""
+HueSurf Thumbnail Engine
+
+Decodes each source image once, as small as the largest requested thumbnail
+allows, and renders every requested size from that:
+
+1. JPEG sources use draft mode, so libjpeg decodes at 1/2, 1/4 or 1/8 scale
+2. Other formats are box-reduced with Image.reduce() to about twice the
+   largest target, which is cheap and keeps enough detail for LANCZOS
+3. Each size is resampled from the reduced image, and transparency is
+   composited onto white only at thumbnail size
+
+Decoding is bounded by a pixel budget: an image that would still decode to
+more pixels than PIXEL_BUDGET after draft scaling raises PixelBudgetError
+before any pixel data is read.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+from PIL import Image
+
+from publish import atomic_output
+
+# Decode at least this many times the target size before the final resample
+OVERSAMPLE = 2
+
+# Modes Image.reduce() can't work on, or would average palette indices in
+REDUCE_UNSUPPORTED = {"1", "P", "PA", "I;16", "I;16B", "I;16L", "I;16N"}
+
+BACKGROUND = (255, 255, 255)
+
+# Most pixels a source may decode to, about 720 MB as RGBA; 0 = no limit
+PIXEL_BUDGET = 180_000_000
+
+
+class PixelBudgetError(ValueError):
+    """An image would decode to more pixels than the budget allows"""
+
+
+def set_pixel_budget(pixels):
+    """Set the pixel budget of this process (0 = no limit)"""
+    global PIXEL_BUDGET
+    PIXEL_BUDGET = pixels
+
+
+def replace_pillow_limit(pixels):
+    """
+    Let a pixel budget stand in for Pillow's decompression bomb check
+
+    Pillow checks the size stored in the file, while the budget is checked
+    after JPEG draft scaling, so huge JPEGs can still be decoded at reduced
+    size. The setting is process-wide: only call it in processes that do
+    nothing but pack (the CLI and worker processes). Without a budget (0)
+    Pillow's check stays on.
+    """
+    if pixels:
+        Image.MAX_IMAGE_PIXELS = None
+
+
+def check_pixel_budget(img):
+    """Raise PixelBudgetError if decoding img would go over the budget"""
+    pixels = img.width * img.height
+    if PIXEL_BUDGET and pixels > PIXEL_BUDGET:
+        raise PixelBudgetError(
+            f"{img.width}x{img.height} decodes to {pixels / 1e6:.0f} megapixels, "
+            f"over the {PIXEL_BUDGET / 1e6:.0f} megapixel budget"
+        )
+
+
+def fit_size(source_size, box):
+    """Size of source_size scaled down to fit box, keeping aspect ratio"""
+    width, height = source_size
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def open_reduced(img, box):
+    """
+    Shrink an opened image on load so it's still at least OVERSAMPLE x the
+    thumbnail that fits box
+
+    Returns the reduced image in a mode that can be resampled (RGB, RGBA, L
+    or LA); may be img itself.
+    """
+    target = fit_size(img.size, box)
+    wanted = (target[0] * OVERSAMPLE, target[1] * OVERSAMPLE)
+
+    # JPEG: let the decoder scale down by up to 8x
+    if img.format == "JPEG":
+        img.draft("RGB", wanted)
+    check_pixel_budget(img)
+
+    # Reduce before converting where Image.reduce() supports the mode, so
+    # no full-size converted copy is made
+    factor = min(img.width // wanted[0], img.height // wanted[1])
+    if factor > 1 and img.mode not in REDUCE_UNSUPPORTED:
+        img = img.reduce(factor)
+        factor = 1
+
+    if img.mode == "P":
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    if factor > 1:
+        img = img.reduce(factor)
+    return img
+
+
+def flatten(img):
+    """Composite transparency onto the background and return an RGB image"""
+    if img.mode in ("RGBA", "LA"):
+        background = Image.new("RGB", img.size, BACKGROUND)
+        background.paste(img.convert("RGBA"), mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def render_thumbnails(image_path, sizes):
+    """
+    Decode image_path once and render an RGB thumbnail for each size
+
+    Args:
+        image_path: Source image
+        sizes: Bounding boxes as (width, height) tuples
+
+    Returns:
+        List of PIL images, in the order of sizes
+    """
+    largest = (max(w for w, _ in sizes), max(h for _, h in sizes))
+    with Image.open(image_path) as img:
+        base = open_reduced(img, largest)
+        base.load()
+
+    return [resize_thumbnail(base, size) for size in sizes]
+
+
+def resize_thumbnail(img, box):
+    """RGB thumbnail fitting box, resampled from an already decoded image"""
+    return flatten(img.resize(fit_size(img.size, box), Image.Resampling.LANCZOS))
+
+
+def save_jpeg(img, path, quality=85):
+    with atomic_output(path) as tmp_path:
+        img.save(tmp_path, "JPEG", quality=quality, optimize=True)
@@ -12,49 +12,196 @@ It checks:
 - Extended metadata (colors, settings, recommended platforms)
 - Completeness of all fields
 
+Packs are validated in parallel with --jobs. A pack whose manifest entry and
+pack_info.json hash (canonical JSON) to the same digest as when it last
+passed is skipped; the digests live in .validation_state.json next to the
+manifest. --since goes further and doesn't even read pack_info.json of packs
+whose manifest entry and pack_info.json file stat are unchanged.
+
+--integrity also checks every pack archive against the manifest and the
+source images without extracting it (see pack_integrity).
+
 Usage:
-    python scripts/validate_manifest.py [--verbose] [--fix-issues]
+    python scripts/validate_manifest.py [--verbose] [--jobs N] [--since]
+                                        [--integrity]
 
 Author: HueSurf Team
 License: MIT
 """
 
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import argparse
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional
 import difflib
 
+from pack_cache import digest_json
+from pack_integrity import HASH_THREADS, IntegrityCheck
+from publish import atomic_output
+
+STATE_FILENAME = ".validation_state.json"
+STATE_VERSION = 1
+
+# pack_info.json fields that should match the manifest exactly
+DIRECT_FIELDS = (
+    "pack_name",
+    "version",
+    "author",
+    "description",
+    "category",
+    "created_date",
+    "shuffle_enabled",
+    "shuffle_on_new_tab",
+    "colors",
+    "recommended_for",
+    "min_resolution",
+    "license",
+    "settings",
+)
+
+# Manifest field of each direct field (the manifest calls pack_name "name")
+MANIFEST_FIELDS = {field: field for field in DIRECT_FIELDS}
+MANIFEST_FIELDS["pack_name"] = "name"
+
+WALLPAPER_FIELDS = ("name", "description", "tags")
+
+# Fields only the packer adds (these are expected)
+MANIFEST_ONLY_FIELDS = (
+    "id",
+    "count",
+    "size_bytes",
+    "size_mb",
+    "download_url",
+    "preview_url",
+    "hash",
+    "packed_date",
+)
+
+REQUIRED_MANIFEST_FIELDS = (
+    "version",
+    "generated",
+    "total_packs",
+    "total_wallpapers",
+    "total_size_mb",
+    "packs",
+)
+
+EXPECTED_FEATURES = (
+    "shuffle_supported",
+    "new_tab_shuffle",
+    "color_themes",
+    "multi_resolution",
+)
+
+# Saved pack results only count for the rules they were checked against
+RULES_DIGEST = digest_json(
+    [
+        STATE_VERSION,
+        DIRECT_FIELDS,
+        MANIFEST_FIELDS,
+        WALLPAPER_FIELDS,
+        MANIFEST_ONLY_FIELDS,
+    ]
+)
+
+
+def manifest_pack_name(manifest_pack: Dict[str, Any]) -> str:
+    return manifest_pack.get("pack_name", manifest_pack.get("name", "Unknown"))
+
+
+def file_stat(path: Path) -> Optional[List[int]]:
+    """[mtime_ns, size] of a file, or None if it's missing"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
 
 class ManifestValidator:
-    def __init__(self, verbose: bool = False):
+    def __init__(
+        self,
+        verbose: bool = False,
+        source_dir=None,
+        manifest_path=None,
+        jobs: int = 1,
+        incremental: bool = True,
+        since: bool = False,
+        integrity: bool = False,
+        echo: bool = True,
+    ):
+        """
+        Initialize the manifest validator
+
+        Args:
+            verbose: Print warnings and info messages as well as errors
+            source_dir: Source wallpapers directory (default: assets/Wallpapers)
+            manifest_path: Manifest to validate (default:
+                website/static/wallpapers/manifest.json)
+            jobs: Number of worker processes packs are validated in
+            incremental: Skip packs unchanged since they last passed
+            since: Only read packs whose manifest entry or pack_info.json
+                changed since they last passed
+            integrity: Also hash every pack archive and check its entries
+                against the manifest and source images
+            echo: Print errors as they're logged (off in worker processes,
+                whose messages are printed by the parent)
+        """
         self.verbose = verbose
         self.project_root = Path(__file__).parent.parent
-        self.assets_dir = self.project_root / "assets" / "Wallpapers"
+        self.assets_dir = (
+            Path(source_dir)
+            if source_dir
+            else self.project_root / "assets" / "Wallpapers"
+        )
         self.manifest_path = (
-            self.project_root / "website" / "static" / "wallpapers" / "manifest.json"
+            Path(manifest_path)
+            if manifest_path
+            else self.project_root
+            / "website"
+            / "static"
+            / "wallpapers"
+            / "manifest.json"
         )
+        self.state_path = self.manifest_path.with_name(STATE_FILENAME)
+        self.jobs = max(1, jobs or 1)
+        self.incremental = incremental or since
+        self.since = since
+        self.integrity = integrity
+        self.echo = echo
 
         self.errors = []
         self.warnings = []
         self.info_messages = []
+        # Every message in the order it was logged, for replaying
+        self.transcript = []
+
+        # Packs that passed, by pack name, and how many were skipped
+        self.state = {}
+        self.skipped = 0
 
     def log_error(self, message: str):
         """Log an error message"""
         self.errors.append(f"❌ ERROR: {message}")
-        print(f"❌ ERROR: {message}")
+        self.transcript.append(self.errors[-1])
+        if self.echo:
+            print(f"❌ ERROR: {message}")
 
     def log_warning(self, message: str):
         """Log a warning message"""
         self.warnings.append(f"⚠️  WARNING: {message}")
-        if self.verbose:
+        self.transcript.append(self.warnings[-1])
+        if self.verbose and self.echo:
             print(f"⚠️  WARNING: {message}")
 
     def log_info(self, message: str):
         """Log an info message"""
         self.info_messages.append(f"ℹ️  INFO: {message}")
-        if self.verbose:
+        self.transcript.append(self.info_messages[-1])
+        if self.verbose and self.echo:
             print(f"ℹ️  INFO: {message}")
 
     def log_success(self, message: str):
@@ -147,7 +294,7 @@ class ManifestValidator:
             pack_info_wp = pack_info_by_filename[filename]
 
             # Check each field
-            for field in ["name", "description", "tags"]:
+            for field in WALLPAPER_FIELDS:
                 if field in pack_info_wp:
                     if not self.compare_values(
                         f"wallpapers[{filename}].{field}",
@@ -166,40 +313,24 @@ class ManifestValidator:
 
         return all_match
 
-    def validate_pack(self, manifest_pack: Dict[str, Any]) -> bool:
+    def validate_pack(
+        self, manifest_pack: Dict[str, Any], pack_info: Dict[str, Any] = None
+    ) -> bool:
         """Validate a single pack against its pack_info.json"""
-        pack_name = manifest_pack.get("pack_name", manifest_pack.get("name", "Unknown"))
+        pack_name = manifest_pack_name(manifest_pack)
         self.log_info(f"Validating pack: {pack_name}")
 
         # Load corresponding pack_info.json
-        pack_info = self.load_pack_info(pack_name)
+        if pack_info is None:
+            pack_info = self.load_pack_info(pack_name)
         if not pack_info:
             return False
 
         all_good = True
 
-        # Fields that should match exactly
-        direct_fields = [
-            "pack_name",
-            "version",
-            "author",
-            "description",
-            "category",
-            "created_date",
-            "shuffle_enabled",
-            "shuffle_on_new_tab",
-            "colors",
-            "recommended_for",
-            "min_resolution",
-            "license",
-            "settings",
-        ]
-
-        for field in direct_fields:
+        for field in DIRECT_FIELDS:
             if field in pack_info:
-                # Handle pack_name vs name inconsistency
-                manifest_field = "name" if field == "pack_name" else field
-                manifest_value = manifest_pack.get(manifest_field)
+                manifest_value = manifest_pack.get(MANIFEST_FIELDS[field])
                 pack_info_value = pack_info.get(field)
 
                 if not self.compare_values(
@@ -218,17 +349,7 @@ class ManifestValidator:
                 all_good = False
 
         # Check for manifest-only fields (these are expected)
-        manifest_only_fields = [
-            "id",
-            "count",
-            "size_bytes",
-            "size_mb",
-            "download_url",
-            "preview_url",
-            "hash",
-            "packed_date",
-        ]
-        for field in manifest_only_fields:
+        for field in MANIFEST_ONLY_FIELDS:
             if field not in manifest_pack:
                 self.log_warning(
                     f"Pack '{pack_name}': Missing manifest field '{field}'"
@@ -236,19 +357,204 @@ class ManifestValidator:
 
         return all_good
 
+    def pack_digest(self, entry_digest: str, pack_info: Dict[str, Any]) -> str:
+        """Digest of everything a pack's validation depends on"""
+        return digest_json([RULES_DIGEST, entry_digest, pack_info])
+
+    def check_pack(
+        self, manifest_pack: Dict[str, Any], known: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate a pack unless it's unchanged since it last passed
+
+        Args:
+            manifest_pack: The pack's manifest entry
+            known: State of the pack's last passing validation, if any
+
+        Returns:
+            Dict with the pack "name", whether it was "skipped", its state
+            entry as "passed" (None if it failed), the "errors", "warnings"
+            and "info" it logged and the "transcript" of all of them
+        """
+        pack_name = manifest_pack_name(manifest_pack)
+        stat = file_stat(self.assets_dir / pack_name / "pack_info.json")
+        pack_info = self.load_pack_info(pack_name)
+        entry_digest = digest_json(manifest_pack)
+        digest = self.pack_digest(entry_digest, pack_info) if pack_info else None
+
+        skipped = bool(known and digest and known.get("digest") == digest)
+        if skipped:
+            self.log_info(f"Unchanged since last validation: {pack_name}")
+            self.warnings.extend(known.get("warnings", []))
+            passed = True
+        else:
+            passed = self.validate_pack(manifest_pack, pack_info) and not self.errors
+
+        return {
+            "name": pack_name,
+            "skipped": skipped,
+            "passed": {
+                "digest": digest,
+                "entry": entry_digest,
+                "stat": stat,
+                "warnings": self.warnings,
+            }
+            if passed
+            else None,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "info": self.info_messages,
+            "transcript": self.transcript,
+        }
+
+    def unchanged_since(
+        self, manifest_pack: Dict[str, Any], known: Dict[str, Any] = None
+    ) -> bool:
+        """Whether a pack's inputs are as they were when it last passed"""
+        if not known:
+            return False
+        pack_info_path = (
+            self.assets_dir / manifest_pack_name(manifest_pack) / "pack_info.json"
+        )
+        return known.get("entry") == digest_json(manifest_pack) and known.get(
+            "stat"
+        ) == file_stat(pack_info_path)
+
+    def load_state(self) -> Dict[str, Any]:
+        """Packs that passed earlier runs, empty if the rules changed since"""
+        if not self.incremental or not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            self.log_warning(f"Ignoring unreadable validation state: {e}")
+            return {}
+        if state.get("rules") != RULES_DIGEST:
+            self.log_info("Validation rules changed, validating every pack")
+            return {}
+        return state.get("packs", {})
+
+    def save_state(self):
+        """Write the passing packs atomically (output versions share inodes)"""
+        if not self.manifest_path.parent.is_dir():
+            return
+        try:
+            with atomic_output(self.state_path) as tmp_path:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"rules": RULES_DIGEST, "packs": self.state}, f, indent=1)
+        except OSError as e:
+            self.log_warning(f"Could not save validation state: {e}")
+
+    def record(self, result: Dict[str, Any]):
+        """Take over the messages and state of one pack's check"""
+        self.errors.extend(result["errors"])
+        self.warnings.extend(result["warnings"])
+        self.info_messages.extend(result["info"])
+        self.transcript.extend(result["transcript"])
+        if self.echo:
+            for message in result["transcript"]:
+                if self.verbose or message in result["errors"]:
+                    print(message)
+        if result["skipped"]:
+            self.skipped += 1
+        if result["passed"]:
+            self.state[result["name"]] = result["passed"]
+        else:
+            self.state.pop(result["name"], None)
+
+    def validate_packs(self, packs: List[Dict[str, Any]]) -> bool:
+        """Validate every pack, in worker processes when jobs > 1"""
+        known = self.load_state()
+        self.state = {}
+        pending = []
+        for pack in packs:
+            previous = known.get(manifest_pack_name(pack))
+            if self.since and self.unchanged_since(pack, previous):
+                self.record(
+                    {
+                        "name": manifest_pack_name(pack),
+                        "skipped": True,
+                        "passed": previous,
+                        "errors": [],
+                        "warnings": previous.get("warnings", []),
+                        "info": [],
+                        "transcript": previous.get("warnings", []),
+                    }
+                )
+            else:
+                pending.append((pack, previous))
+
+        options = {
+            "verbose": self.verbose,
+            "source_dir": self.assets_dir,
+            "manifest_path": self.manifest_path,
+        }
+        if self.jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                # Batched, since one pack is too little work for a round
+                # trip; results come back in manifest order for stable output
+                results = list(
+                    executor.map(
+                        _check_pack_in_worker,
+                        [options] * len(pending),
+                        *zip(*pending),
+                        chunksize=max(1, len(pending) // (self.jobs * 4)),
+                    )
+                )
+        else:
+            results = [
+                _check_pack_in_worker(options, pack, previous)
+                for pack, previous in pending
+            ]
+
+        packs_valid = True
+        for result in results:
+            self.record(result)
+            if not result["passed"]:
+                packs_valid = False
+
+        if self.skipped:
+            self.log_success(
+                f"Skipped {self.skipped} of {len(packs)} packs unchanged since "
+                f"their last validation"
+            )
+        if self.incremental:
+            self.save_state()
+        return packs_valid
+
+    def verify_archives(self, packs: List[Dict[str, Any]]) -> bool:
+        """Check every pack archive against the manifest and source images"""
+        check = IntegrityCheck(
+            self.manifest_path.parent,
+            self.assets_dir,
+            # Hashing waits on I/O and releases the GIL, so it's threaded
+            # even without --jobs
+            workers=max(self.jobs, HASH_THREADS),
+        )
+        all_good = True
+        verified = 0
+        for pack_name, errors, warnings in check.verify(packs):
+            for error in errors:
+                self.log_error(f"Pack '{pack_name}': {error}")
+            for warning in warnings:
+                self.log_warning(f"Pack '{pack_name}': {warning}")
+            if errors:
+                all_good = False
+            else:
+                verified += 1
+
+        if all_good:
+            self.log_success(
+                f"Archives of all {verified} packs match the manifest and sources"
+            )
+        return all_good
+
     def validate_manifest_structure(self, manifest: Dict[str, Any]) -> bool:
         """Validate the overall manifest structure"""
-        required_fields = [
-            "version",
-            "generated",
-            "total_packs",
-            "total_wallpapers",
-            "total_size_mb",
-            "packs",
-        ]
         all_good = True
 
-        for field in required_fields:
+        for field in REQUIRED_MANIFEST_FIELDS:
             if field not in manifest:
                 self.log_error(f"Missing required manifest field: {field}")
                 all_good = False
@@ -265,13 +571,7 @@ class ManifestValidator:
             if not isinstance(features, dict):
                 self.log_warning("Manifest 'features' should be a dictionary")
             else:
-                expected_features = [
-                    "shuffle_supported",
-                    "new_tab_shuffle",
-                    "color_themes",
-                    "multi_resolution",
-                ]
-                for feature in expected_features:
+                for feature in EXPECTED_FEATURES:
                     if feature not in features:
                         self.log_warning(f"Missing feature flag: {feature}")
 
@@ -348,15 +648,20 @@ class ManifestValidator:
 
         # Validate each pack
         print("\n📦 Validating individual packs...")
-        packs_valid = True
-        for pack in manifest.get("packs", []):
-            if not self.validate_pack(pack):
-                packs_valid = False
+        packs_valid = self.validate_packs(manifest.get("packs", []))
+
+        # Verify archives
+        integrity_valid = True
+        if self.integrity:
+            print("\n🔐 Verifying pack archives...")
+            integrity_valid = self.verify_archives(manifest.get("packs", []))
 
         # Print summary
         self.print_summary()
 
-        return structure_valid and completeness_valid and packs_valid
+        return (
+            structure_valid and completeness_valid and packs_valid and integrity_valid
+        )
 
     def print_summary(self):
         """Print validation summary"""
@@ -412,6 +717,12 @@ class ManifestValidator:
         return "".join(diff)
 
 
+def _check_pack_in_worker(options, manifest_pack, known):
+    """Check one pack with a fresh, silent validator"""
+    validator = ManifestValidator(echo=False, **options)
+    return validator.check_pack(manifest_pack, known)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Validate HueSurf wallpaper manifest alignment"
@@ -422,10 +733,45 @@ def main():
     parser.add_argument(
         "--diff", action="store_true", help="Generate diff reports for mismatches"
     )
+    parser.add_argument("--source", help="Source wallpapers directory")
+    parser.add_argument("--manifest", help="Manifest file to validate")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Validate packs in N worker processes (default: 1, 0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--integrity",
+        action="store_true",
+        help="Also hash pack archives and check their entries against the "
+        "manifest and source images",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--since",
+        action="store_true",
+        help="Only validate packs whose manifest entry or pack_info.json "
+        "changed since they last passed",
+    )
+    mode.add_argument(
+        "--full",
+        action="store_true",
+        help="Validate every pack, ignoring results of earlier runs",
+    )
 
     args = parser.parse_args()
 
-    validator = ManifestValidator(verbose=args.verbose)
+    validator = ManifestValidator(
+        verbose=args.verbose,
+        source_dir=args.source,
+        manifest_path=args.manifest,
+        jobs=args.jobs or os.cpu_count(),
+        incremental=not args.full,
+        since=args.since,
+        integrity=args.integrity,
+    )
     success = validator.validate()
 
     if args.diff and validator.errors:
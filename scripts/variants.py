@@ -0,0 +1,106 @@
+"""
+HueSurf Wallpaper Variants
+
+Renders a resolution ladder of each wallpaper in WebP and JPEG so clients can
+download the smallest file that covers their screen instead of the original.
+
+The source is decoded once (JPEG draft mode trims the decode to the largest
+rung) and the rungs are resampled from largest to smallest, each from the one
+before it, so the smaller rungs don't resample the full image again. Rungs
+above the source width are skipped (a rung equal to it is rendered without
+resampling); a source narrower than the smallest rung gets a single variant
+at its own width.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+from pathlib import Path
+
+from PIL import Image
+
+from publish import atomic_output
+from thumbnails import flatten, open_reduced
+
+# Target widths, in pixels
+LADDER = (1280, 1920, 2560, 3840)
+
+# Bumped when the same sources and settings render different variants, so
+# packs built before are redone
+VARIANTS_VERSION = 2
+
+# Output format -> (file extension, MIME type, Pillow save options)
+FORMATS = {
+    "webp": (".webp", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": (
+        ".jpg",
+        "image/jpeg",
+        {"quality": 85, "optimize": True, "progressive": True},
+    ),
+}
+
+
+def ladder_widths(source_width, ladder=LADDER):
+    """Widths to render for a source, largest first"""
+    widths = [width for width in ladder if width <= source_width]
+    return sorted(widths or [source_width], reverse=True)
+
+
+def variant_stem(relative):
+    """File name stem for the variants of a source path relative to its pack"""
+    return relative.lower().replace(" ", "_").replace("/", "__").replace(".", "_")
+
+
+def render_variants(image_path, output_dir, stem, ladder=LADDER, formats=FORMATS):
+    """
+    Render every rung of the ladder for one wallpaper
+
+    Args:
+        image_path: Source image
+        output_dir: Directory the variant files are written to
+        stem: File name stem, see variant_stem()
+        ladder: Target widths
+        formats: Output formats, a subset of FORMATS
+
+    Returns:
+        List of variant dicts (width, height, format, mime, path, size_bytes),
+        ordered by format and then by width
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(image_path) as img:
+        widths = ladder_widths(img.width, ladder)
+        largest = widths[0]
+        box = (largest, round(img.height * largest / img.width) or 1)
+        base = open_reduced(img, box)
+        base.load()
+
+    variants = []
+    current = base
+    for width in widths:
+        height = max(1, round(base.height * width / base.width))
+        if current.width != width:
+            current = current.resize((width, height), Image.Resampling.LANCZOS)
+
+        for fmt, (extension, mime, options) in formats.items():
+            path = output_dir / f"{stem}-{width}w{extension}"
+            # WebP keeps transparency; JPEG is composited onto white
+            rendered = current if fmt == "webp" else flatten(current)
+            if fmt == "webp" and current.mode not in ("RGB", "RGBA"):
+                rendered = current.convert("RGBA" if "A" in current.mode else "RGB")
+            with atomic_output(path) as tmp_path:
+                rendered.save(tmp_path, fmt.upper(), **options)
+            variants.append(
+                {
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "mime": mime,
+                    "path": path,
+                    "size_bytes": path.stat().st_size,
+                }
+            )
+
+    variants.sort(key=lambda variant: (variant["format"], variant["width"]))
+    return variants
@@ -0,0 +1,211 @@
+"""
+HueSurf Source Tree Watcher
+
+Reports which files under a directory tree changed, for the packer's
+--watch mode. On Linux it uses inotify through ctypes: the process sleeps
+in select() until the kernel has events, so an idle watcher costs no CPU.
+Elsewhere, or when inotify can't be set up, it falls back to polling
+(size, mtime) snapshots.
+
+Bursts are debounced: a batch starts with the first event and ends once
+the tree has been quiet for the debounce interval (or max_delay passed),
+so copying a pack of hundreds of files is one batch.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_ATTRIB
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# Returned instead of a set of paths when events were lost
+RESCAN = None
+
+
+class InotifyWatcher:
+    def __init__(self, root):
+        """
+        Watch a directory tree with inotify
+
+        Args:
+            root: Directory to watch, with everything below it
+        """
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = Path(root)
+        self.watches = {}
+        self.add_tree(self.root)
+
+    def add_tree(self, directory):
+        """Watch a directory and all directories below it"""
+        for dirpath, _dirnames, _filenames in os.walk(directory):
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(dirpath), WATCH_MASK | IN_ONLYDIR
+            )
+            if wd < 0:
+                logger.warning(
+                    f"Cannot watch {dirpath}: {os.strerror(ctypes.get_errno())}"
+                )
+                continue
+            self.watches[wd] = Path(dirpath)
+
+    def read(self, timeout=None):
+        """
+        Wait up to timeout seconds (forever if None) for events
+
+        Returns:
+            Set of changed paths (empty on timeout), or RESCAN if the kernel
+            queue overflowed
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return RESCAN
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            changed.add(path)
+            # New directories (created or moved in) need watches of their own
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, root, interval=2.0):
+        """
+        Watch a directory tree by comparing snapshots
+
+        Args:
+            root: Directory to watch
+            interval: Seconds between snapshots
+        """
+        self.root = Path(root)
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout=None):
+        """Sleep for one interval (or timeout, if shorter) and diff the tree"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        snapshot = self.scan()
+        changed = {
+            path
+            for path in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(path) != self.snapshot.get(path)
+        }
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(root, poll_interval=2.0):
+    """inotify watcher for root, or a polling one where that isn't possible"""
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError) as e:
+        logger.info(f"inotify unavailable ({e}), polling every {poll_interval}s")
+        return PollingWatcher(root, poll_interval)
+
+
+def wait_for_batch(watcher, debounce=2.0, max_delay=30.0):
+    """
+    Block until something changes, then collect events until the tree has
+    been quiet for debounce seconds
+
+    Returns:
+        Set of changed paths, or RESCAN if events were lost
+    """
+    changed = set()
+    while not changed:
+        changed = watcher.read()
+        if changed is RESCAN:
+            return RESCAN
+
+    deadline = time.monotonic() + max_delay
+    while time.monotonic() < deadline:
+        more = watcher.read(max(0.0, min(debounce, deadline - time.monotonic())))
+        if more is RESCAN:
+            return RESCAN
+        if not more:
+            break
+        changed |= more
+    return changed
@@ -1,16 +1,143 @@
-from flask import Flask, render_template, request, jsonify, send_file, abort
+from flask import Flask, render_template, request, jsonify, send_file, abort, g
 import os
-import zipfile
+import atexit
 import json
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 import tempfile
 import shutil
 
+import catalog
+from catalog_reader import pack_api_record
+from contact_queue import ContactQueue, SMTPDelivery
+
 app = Flask(__name__)
 
 # Configuration
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "your-secret-key-here")
 app.config["DEBUG"] = os.environ.get("FLASK_ENV") == "development"
+# Fraction of requests that get a Server-Timing header (1.0 = every request)
+app.config["SERVER_TIMING_SAMPLE_RATE"] = float(
+    os.environ.get(
+        "SERVER_TIMING_SAMPLE_RATE", "1.0" if app.config["DEBUG"] else "0.05"
+    )
+)
+
+# Contact submissions: SQLite file, queue bound and optional SMTP delivery
+app.config["CONTACT_DB_PATH"] = os.environ.get(
+    "CONTACT_DB_PATH", str(Path(__file__).parent / "contact.db")
+)
+app.config["CONTACT_QUEUE_SIZE"] = int(os.environ.get("CONTACT_QUEUE_SIZE", "1000"))
+app.config["CONTACT_SMTP_HOST"] = os.environ.get("CONTACT_SMTP_HOST")
+app.config["CONTACT_SMTP_PORT"] = int(os.environ.get("CONTACT_SMTP_PORT", "25"))
+app.config["CONTACT_SMTP_FROM"] = os.environ.get(
+    "CONTACT_SMTP_FROM", "website@huesurf.local"
+)
+app.config["CONTACT_SMTP_TO"] = os.environ.get("CONTACT_SMTP_TO", "team@huesurf.local")
+
+# In-process repacking: seconds a blocking /api/wallpapers/repack waits
+# before cancelling, and packer worker processes per repack
+app.config["REPACK_TIMEOUT"] = float(os.environ.get("REPACK_TIMEOUT", "300"))
+app.config["REPACK_JOBS"] = int(os.environ.get("REPACK_JOBS", "1"))
+# Versioned publishing for repacks (see the packer's --keep-versions and
+# --versions-dir); a published output is staged and swapped even at 0
+app.config["REPACK_KEEP_VERSIONS"] = int(os.environ.get("REPACK_KEEP_VERSIONS", "0"))
+app.config["REPACK_VERSIONS_DIR"] = os.environ.get("REPACK_VERSIONS_DIR")
+# Where repack jobs share their status, so any worker process can report on
+# or cancel a job another one runs
+app.config["REPACK_STATE_DIR"] = os.environ.get(
+    "REPACK_STATE_DIR", os.path.join(tempfile.gettempdir(), "huesurf-repack")
+)
+
+contact_queue = ContactQueue(
+    app.config["CONTACT_DB_PATH"],
+    maxsize=app.config["CONTACT_QUEUE_SIZE"],
+    delivery=SMTPDelivery(
+        app.config["CONTACT_SMTP_HOST"],
+        app.config["CONTACT_SMTP_PORT"],
+        app.config["CONTACT_SMTP_FROM"],
+        app.config["CONTACT_SMTP_TO"],
+    )
+    if app.config["CONTACT_SMTP_HOST"]
+    else None,
+)
+# Flush queued submissions when the worker exits
+atexit.register(contact_queue.stop)
+
+
+class PhaseTimer:
+    """Collects named request phases and renders them as a Server-Timing header"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block; repeated phases with the same name are summed"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def header_value(self):
+        entries = [
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()
+        ]
+        total = time.perf_counter() - self.started
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def timed(name):
+    """Time a phase of the current request if it was sampled for Server-Timing"""
+    timer = g.get("server_timing")
+    return timer.phase(name) if timer else nullcontext()
+
+
+def wallpapers_root():
+    """
+    Packer output version this request reads from, resolved on first use
+
+    Every file of one request comes from the same published version, even
+    if the packer publishes a new one while the request runs.
+    """
+    if "wallpapers_root" not in g:
+        g.wallpapers_root = catalog.published_dir()
+    return g.wallpapers_root
+
+
+@app.before_request
+def hide_static_dotfiles():
+    """
+    Refuse static paths through dot-directories and dot-files: the packer's
+    lock, build caches and temporary files live there
+    """
+    if request.endpoint == "static":
+        filename = (request.view_args or {}).get("filename", "")
+        if any(part.startswith(".") for part in filename.split("/")):
+            abort(404)
+
+
+@app.before_request
+def start_server_timing():
+    rate = app.config["SERVER_TIMING_SAMPLE_RATE"]
+    if rate >= 1.0 or (rate > 0 and random.random() < rate):
+        g.server_timing = PhaseTimer()
+
+
+@app.after_request
+def emit_server_timing(response):
+    timer = g.get("server_timing")
+    if timer:
+        response.headers["Server-Timing"] = timer.header_value()
+    return response
 
 
 @app.route("/")
@@ -61,28 +188,111 @@ def wallpapers():
     return render_template("wallpapers.html")
 
 
+# Status files of finished repack jobs kept in REPACK_STATE_DIR
+REPACK_JOBS_KEPT = 10
+
+# The packer that in-process repacks run; a website-only deploy doesn't have it
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+
+def import_packer():
+    """
+    Make the packer modules in scripts/ importable, on first repack
+
+    Nothing else in the site imports from scripts/, so serving pages works
+    where only website/ is deployed.
+    """
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.append(str(SCRIPTS_DIR))
+
+
+def start_repack_job():
+    """
+    Start an in-process forced repack on a background thread
+
+    Only one packer run can write the output at a time, across all worker
+    processes and the CLI: the packer holds a lock file next to it.
+
+    Returns:
+        (job, running_id); job is None when another run holds the output,
+        and running_id is that job's id (None if it isn't a website job)
+    """
+    # Imported on first use, so serving pages never loads the packer
+    import_packer()
+    from packer_api import PackJob, prune_status
+    from publish import OutputLocked
+
+    state_dir = app.config["REPACK_STATE_DIR"]
+    job = PackJob(
+        {
+            "force": True,
+            "jobs": app.config["REPACK_JOBS"],
+            "keep_versions": app.config["REPACK_KEEP_VERSIONS"],
+            "versions_dir": app.config["REPACK_VERSIONS_DIR"],
+        },
+        state_dir=state_dir,
+    )
+    try:
+        job.start()
+    except OutputLocked:
+        owner = job.packer.output_lock.owner()
+        return None, owner if owner and owner.isalnum() else None
+    prune_status(state_dir, REPACK_JOBS_KEPT)
+    return job, job.id
+
+
+def repack_status_url(job_id):
+    return f"/api/wallpapers/repack/{job_id}" if job_id else None
+
+
 @app.route("/api/wallpapers/repack")
 def repack_wallpapers():
-    """Trigger repacking of wallpapers to static folder"""
+    """
+    Repack wallpapers to the static folder in-process
+
+    Waits for the result by default; with ?async=1 it returns the job's
+    status URL right away instead.
+    """
     try:
-        import subprocess
-        import sys
-
-        # Run the packer script
-        script_path = Path(__file__).parent.parent / "scripts" / "pack_wallpapers.py"
-        result = subprocess.run(
-            [sys.executable, str(script_path), "--force"],
-            capture_output=True,
-            text=True,
-            timeout=300,
-        )
+        job, running_id = start_repack_job()
+        if job is None:
+            return jsonify(
+                {
+                    "success": False,
+                    "message": "A repack is already running",
+                    "job_id": running_id,
+                    "status_url": repack_status_url(running_id),
+                }
+            ), 409
+
+        if request.args.get("async"):
+            return jsonify(
+                {
+                    "success": True,
+                    "message": "Repack started",
+                    "job_id": job.id,
+                    "status_url": repack_status_url(job.id),
+                }
+            ), 202
+
+        result = job.wait(app.config["REPACK_TIMEOUT"])
+        if result is None:
+            job.cancel()
+            return jsonify(
+                {
+                    "success": False,
+                    "message": "Repacking timed out",
+                    "job_id": job.id,
+                    "status_url": repack_status_url(job.id),
+                }
+            ), 500
 
-        if result.returncode == 0:
+        if result["success"]:
             return jsonify(
                 {
                     "success": True,
                     "message": "Wallpapers repacked successfully",
-                    "output": result.stdout,
+                    "result": result,
                 }
             )
         else:
@@ -90,29 +300,77 @@ def repack_wallpapers():
                 {
                     "success": False,
                     "message": "Failed to repack wallpapers",
-                    "error": result.stderr,
+                    "error": result["error"],
+                    "result": result,
                 }
             ), 500
 
-    except subprocess.TimeoutExpired:
-        return jsonify({"success": False, "message": "Repacking timed out"}), 500
     except Exception as e:
         return jsonify(
             {"success": False, "message": f"Error repacking wallpapers: {str(e)}"}
         ), 500
 
 
+@app.route("/api/wallpapers/repack/<job_id>")
+def repack_status(job_id):
+    """Progress, recent events and result of a repack job"""
+    import_packer()
+    from packer_api import read_status
+
+    status = read_status(app.config["REPACK_STATE_DIR"], job_id)
+    if status is None:
+        return jsonify({"success": False, "message": "Unknown repack job"}), 404
+    return jsonify({"success": True, "job": status})
+
+
+@app.route("/api/wallpapers/repack/<job_id>/cancel", methods=["POST"])
+def cancel_repack(job_id):
+    """Stop a running repack job at its next pack or image"""
+    import_packer()
+    from packer_api import read_status, request_cancel
+
+    state_dir = app.config["REPACK_STATE_DIR"]
+    if not request_cancel(state_dir, job_id):
+        return jsonify({"success": False, "message": "Unknown repack job"}), 404
+    return jsonify({"success": True, "job": read_status(state_dir, job_id)})
+
+
 @app.route("/api/contact", methods=["POST"])
 def contact():
     """Handle contact form submissions"""
     try:
         data = request.get_json()
-        name = data.get("name")
-        email = data.get("email")
-        message = data.get("message")
+        name = str(data.get("name") or "").strip()
+        email = str(data.get("email") or "").strip()
+        message = str(data.get("message") or "").strip()
+
+        # Name and email end up in mail headers, so no line breaks there
+        if (
+            not name
+            or not email
+            or not message
+            or any(c in name + email for c in "\r\n")
+            or len(message) > 10000
+        ):
+            return jsonify(
+                {
+                    "success": False,
+                    "message": "Please fill in your name, email and a message.",
+                }
+            ), 400
 
-        # Here you would typically send an email or save to database
-        # For now, we'll just return a success response
+        # Stored and delivered by the background writer
+        try:
+            contact_queue.submit(name, email, message, remote_addr=request.remote_addr)
+        except queue.Full:
+            response = jsonify(
+                {
+                    "success": False,
+                    "message": "We're swamped right now! Please try again in a minute.",
+                }
+            )
+            response.headers["Retry-After"] = "30"
+            return response, 503
 
         return jsonify(
             {
@@ -133,44 +391,21 @@ def contact():
 def get_wallpaper_packs():
     """Get list of available wallpaper packs from static manifest"""
     try:
-        # Try to read from static manifest first
-        manifest_path = (
-            Path(__file__).parent / "static" / "wallpapers" / "manifest.json"
-        )
+        # Shared mmap index written by the packer, no per-worker parsing
+        index = catalog.get_catalog_index(wallpapers_root())
+        if index is not None:
+            with timed("index"):
+                body = catalog.packs_response_body(index)
+            return app.response_class(body, mimetype="application/json")
+
+        # Then the static manifest
+        manifest_path = wallpapers_root() / "manifest.json"
 
         if manifest_path.exists():
-            with open(manifest_path, "r") as f:
+            with timed("manifest"), open(manifest_path, "r") as f:
                 manifest = json.load(f)
 
-            packs = []
-            for pack in manifest.get("packs", []):
-                pack_data = {
-                    "id": pack.get(
-                        "id", pack.get("pack_name", "").lower().replace(" ", "_")
-                    ),
-                    "name": pack.get("name", pack.get("pack_name")),
-                    "count": pack.get("count", 0),
-                    "size_mb": pack.get("size_mb", 0),
-                    "preview": pack.get("preview_url", ""),
-                    "description": pack.get("description", ""),
-                    "shuffle_enabled": pack.get("shuffle_enabled", False),
-                    "shuffle_on_new_tab": pack.get("shuffle_on_new_tab", False),
-                    "download_url": pack.get("download_url", ""),
-                    "category": pack.get("category", "General"),
-                    "author": pack.get("author", "Unknown"),
-                    "version": pack.get("version", "1.0.0"),
-                    "created_date": pack.get("created_date"),
-                    "colors": pack.get("colors", {}),
-                    "recommended_for": pack.get("recommended_for", []),
-                    "min_resolution": pack.get("min_resolution", "1920x1080"),
-                    "license": pack.get("license", "MIT"),
-                    "settings": pack.get("settings", {}),
-                    "wallpapers": pack.get("wallpapers", []),
-                    "size_bytes": pack.get("size_bytes", 0),
-                    "hash": pack.get("hash", ""),
-                    "packed_date": pack.get("packed_date"),
-                }
-                packs.append(pack_data)
+            packs = [pack_api_record(pack) for pack in manifest.get("packs", [])]
 
             return jsonify(
                 {
@@ -183,7 +418,7 @@ def get_wallpaper_packs():
             )
 
         # Fallback to assets directory scanning
-        wallpapers_dir = Path(__file__).parent.parent / "assets" / "Wallpapers"
+        wallpapers_dir = catalog.ASSETS_WALLPAPERS_DIR
         packs = []
 
         if wallpapers_dir.exists():
@@ -193,20 +428,21 @@ def get_wallpaper_packs():
                     pack_info = {}
                     pack_info_path = pack_dir / "pack_info.json"
                     if pack_info_path.exists():
-                        with open(pack_info_path, "r") as f:
+                        with timed("meta"), open(pack_info_path, "r") as f:
                             pack_info = json.load(f)
 
-                    # Count wallpapers in pack
-                    wallpaper_count = len(
-                        list(pack_dir.glob("*.png"))
-                        + list(pack_dir.glob("*.jpg"))
-                        + list(pack_dir.glob("*.jpeg"))
-                    )
+                    with timed("scan"):
+                        # Count wallpapers in pack
+                        wallpaper_count = len(
+                            list(pack_dir.glob("*.png"))
+                            + list(pack_dir.glob("*.jpg"))
+                            + list(pack_dir.glob("*.jpeg"))
+                        )
 
-                    # Calculate pack size
-                    pack_size = sum(
-                        f.stat().st_size for f in pack_dir.rglob("*") if f.is_file()
-                    )
+                        # Calculate pack size
+                        pack_size = sum(
+                            f.stat().st_size for f in pack_dir.rglob("*") if f.is_file()
+                        )
 
                     packs.append(
                         {
@@ -234,90 +470,59 @@ def get_wallpaper_packs():
 
 @app.route("/api/wallpapers/pack/<pack_name>/download")
 def download_wallpaper_pack(pack_name):
-    """Download a wallpaper pack as a zip file from static files"""
+    """
+    Download a wallpaper pack from static files, in the archive format the
+    packer built or the one asked for with ?format=zip|tar.zst
+    """
     try:
+        requested = request.args.get("format")
+        if requested and requested not in catalog.ARCHIVE_MIMETYPES:
+            return jsonify(
+                {"success": False, "message": f"Unknown archive format '{requested}'"}
+            ), 400
+
         # Try static files first
-        static_zip_path = (
-            Path(__file__).parent
-            / "static"
-            / "wallpapers"
-            / "packs"
-            / f"{pack_name.lower().replace(' ', '_')}.zip"
+        static_path, archive_format = catalog.static_pack_archive(
+            pack_name, requested, wallpapers_root()
         )
 
-        if static_zip_path.exists():
-            return send_file(
-                static_zip_path,
-                as_attachment=True,
-                download_name=f"{pack_name}_wallpapers.zip",
-                mimetype="application/zip",
-            )
+        if static_path is not None:
+            with timed("send"):
+                return send_file(
+                    static_path,
+                    as_attachment=True,
+                    download_name=catalog.pack_download_name(pack_name, archive_format),
+                    mimetype=catalog.ARCHIVE_MIMETYPES[archive_format],
+                )
+
+        # Only zips can be built on the fly
+        if requested == "tar.zst":
+            return jsonify(
+                {"success": False, "message": f"No tar.zst archive of '{pack_name}'"}
+            ), 404
 
         # Fallback to dynamic generation from assets
-        wallpapers_dir = Path(__file__).parent.parent / "assets" / "Wallpapers"
-        pack_dir = wallpapers_dir / pack_name
+        pack_dir = catalog.asset_pack_dir(pack_name)
 
-        if not pack_dir.exists() or not pack_dir.is_dir():
+        if pack_dir is None:
             abort(404, description=f"Wallpaper pack '{pack_name}' not found")
 
         # Create temporary zip file
         temp_dir = tempfile.mkdtemp()
-        zip_path = Path(temp_dir) / f"{pack_name}_wallpapers.zip"
-
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            # Add all image files from the pack
-            for file_path in pack_dir.rglob("*"):
-                if file_path.is_file() and file_path.suffix.lower() in [
-                    ".png",
-                    ".jpg",
-                    ".jpeg",
-                    ".webp",
-                ]:
-                    arcname = f"{pack_name}/{file_path.relative_to(pack_dir)}"
-                    zipf.write(file_path, arcname)
-
-            # Add metadata
-            pack_info_path = pack_dir / "pack_info.json"
-            if pack_info_path.exists():
-                with open(pack_info_path, "r") as f:
-                    metadata = json.load(f)
-            else:
-                metadata = {
-                    "pack_name": pack_name,
-                    "version": "1.0.0",
-                    "author": "HueSurf Team",
-                    "description": f"{pack_name} wallpaper pack for HueSurf browser",
-                    "shuffle_enabled": True,
-                    "shuffle_on_new_tab": True,
-                    "count": len(
-                        list(pack_dir.glob("*.png"))
-                        + list(pack_dir.glob("*.jpg"))
-                        + list(pack_dir.glob("*.jpeg"))
-                    ),
-                    "settings": {
-                        "shuffle_interval": "new_tab",
-                        "transition_effect": "fade",
-                        "transition_duration": 500,
-                        "allow_user_shuffle": True,
-                        "remember_last_wallpaper": False,
-                    },
-                }
-            zipf.writestr(f"{pack_name}/pack_info.json", json.dumps(metadata, indent=2))
-
-        @app.after_request
-        def cleanup(response):
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception:
-                pass
-            return response
+        zip_path = Path(temp_dir) / catalog.pack_download_name(pack_name)
 
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name=f"{pack_name}_wallpapers.zip",
-            mimetype="application/zip",
-        )
+        with timed("zip"):
+            catalog.build_pack_zip(pack_dir, pack_name, zip_path)
+
+        with timed("send"):
+            response = send_file(
+                zip_path,
+                as_attachment=True,
+                download_name=catalog.pack_download_name(pack_name),
+                mimetype="application/zip",
+            )
+        response.call_on_close(lambda: shutil.rmtree(temp_dir, ignore_errors=True))
+        return response
     except Exception as e:
         return jsonify(
             {"success": False, "message": f"Error creating wallpaper pack: {str(e)}"}
@@ -326,32 +531,40 @@ def download_wallpaper_pack(pack_name):
 
 @app.route("/api/wallpapers/preview/<pack_name>")
 def get_wallpaper_preview(pack_name):
-    """Get preview image for a wallpaper pack"""
+    """Get preview image for a wallpaper pack, as WebP if the client takes it"""
     try:
         # Try static preview first
-        static_preview_path = (
-            Path(__file__).parent
-            / "static"
-            / "wallpapers"
-            / "previews"
-            / f"{pack_name.lower().replace(' ', '_')}.jpg"
-        )
+        if "image/webp" in request.accept_mimetypes:
+            static_webp_path = catalog.static_preview_path(
+                pack_name, wallpapers_root(), "webp"
+            )
+            if static_webp_path.exists():
+                with timed("send"):
+                    response = send_file(static_webp_path, mimetype="image/webp")
+                response.vary.add("Accept")
+                return response
+
+        static_preview_path = catalog.static_preview_path(pack_name, wallpapers_root())
 
         if static_preview_path.exists():
-            return send_file(static_preview_path, mimetype="image/jpeg")
+            with timed("send"):
+                response = send_file(static_preview_path, mimetype="image/jpeg")
+            response.vary.add("Accept")
+            return response
 
         # Fallback to assets directory
-        wallpapers_dir = Path(__file__).parent.parent / "assets" / "Wallpapers"
-        pack_dir = wallpapers_dir / pack_name
+        pack_dir = catalog.asset_pack_dir(pack_name)
 
-        if not pack_dir.exists() or not pack_dir.is_dir():
+        if pack_dir is None:
             abort(404, description=f"Wallpaper pack '{pack_name}' not found")
 
         # Find first image file
-        for ext in [".png", ".jpg", ".jpeg", ".webp"]:
-            images = list(pack_dir.glob(f"*{ext}"))
+        for ext in catalog.IMAGE_EXTENSIONS:
+            with timed("scan"):
+                images = list(pack_dir.glob(f"*{ext}"))
             if images:
-                return send_file(images[0], mimetype=f"image/{ext[1:]}")
+                with timed("send"):
+                    return send_file(images[0], mimetype=f"image/{ext[1:]}")
 
         abort(404, description="No preview available")
     except Exception as e:
@@ -364,7 +577,13 @@ def get_wallpaper_preview(pack_name):
 def get_all_wallpapers():
     """Get list of all wallpapers with direct download links"""
     try:
-        wallpapers_dir = Path(__file__).parent.parent / "assets" / "Wallpapers"
+        index = catalog.get_catalog_index(wallpapers_root())
+        if index is not None:
+            with timed("index"):
+                body = catalog.wallpapers_response_body(index)
+            return app.response_class(body, mimetype="application/json")
+
+        wallpapers_dir = catalog.ASSETS_WALLPAPERS_DIR
         wallpapers = []
 
         if wallpapers_dir.exists():
@@ -375,14 +594,21 @@ def get_all_wallpapers():
                     wallpaper_metadata = {}
                     pack_info_path = pack_dir / "pack_info.json"
                     if pack_info_path.exists():
-                        with open(pack_info_path, "r") as f:
+                        with timed("meta"), open(pack_info_path, "r") as f:
                             pack_info = json.load(f)
                             # Create lookup dictionary for wallpaper metadata
                             for wp in pack_info.get("wallpapers", []):
                                 wallpaper_metadata[wp["filename"]] = wp
 
-                    for file_path in pack_dir.rglob("*"):
-                        if file_path.is_file() and file_path.suffix.lower() in [
+                    with timed("scan"):
+                        pack_files = [
+                            file_path
+                            for file_path in pack_dir.rglob("*")
+                            if file_path.is_file()
+                        ]
+
+                    for file_path in pack_files:
+                        if file_path.suffix.lower() in [
                             ".png",
                             ".jpg",
                             ".jpeg",
@@ -416,16 +642,16 @@ def get_all_wallpapers():
 def get_single_wallpaper(pack_name, filename):
     """Download a single wallpaper file"""
     try:
-        wallpapers_dir = Path(__file__).parent.parent / "assets" / "Wallpapers"
-        file_path = wallpapers_dir / pack_name / filename
+        file_path = catalog.asset_wallpaper_path(pack_name, filename)
 
-        if not file_path.exists() or not file_path.is_file():
+        if file_path is None:
             abort(
                 404,
                 description=f"Wallpaper '{filename}' not found in pack '{pack_name}'",
             )
 
-        return send_file(file_path, as_attachment=True)
+        with timed("send"):
+            return send_file(file_path, as_attachment=True)
     except Exception as e:
         return jsonify(
             {"success": False, "message": f"Error downloading wallpaper: {str(e)}"}
@@ -438,7 +664,7 @@ def get_random_wallpaper(pack_name):
     try:
         import random
 
-        wallpapers_dir = Path(__file__).parent.parent / "assets" / "Wallpapers"
+        wallpapers_dir = catalog.ASSETS_WALLPAPERS_DIR
         pack_dir = wallpapers_dir / pack_name
 
         if not pack_dir.exists() or not pack_dir.is_dir():
@@ -446,8 +672,9 @@ def get_random_wallpaper(pack_name):
 
         # Find all image files
         images = []
-        for ext in [".png", ".jpg", ".jpeg", ".webp"]:
-            images.extend(list(pack_dir.glob(f"*{ext}")))
+        with timed("scan"):
+            for ext in [".png", ".jpg", ".jpeg", ".webp"]:
+                images.extend(list(pack_dir.glob(f"*{ext}")))
 
         if not images:
             abort(404, description="No wallpapers found in pack")
@@ -459,25 +686,41 @@ def get_random_wallpaper(pack_name):
         pack_info_path = pack_dir / "pack_info.json"
         wallpaper_meta = {}
         if pack_info_path.exists():
-            with open(pack_info_path, "r") as f:
+            with timed("meta"), open(pack_info_path, "r") as f:
                 pack_info = json.load(f)
                 for wp in pack_info.get("wallpapers", []):
                     if wp["filename"] == random_image.name:
                         wallpaper_meta = wp
                         break
 
-        return jsonify(
-            {
-                "success": True,
-                "wallpaper": {
-                    "filename": random_image.name,
-                    "name": wallpaper_meta.get("name", random_image.stem),
-                    "path": f"/api/wallpapers/single/{pack_name}/{random_image.name}",
-                    "description": wallpaper_meta.get("description", ""),
-                    "tags": wallpaper_meta.get("tags", []),
-                },
-            }
-        )
+        wallpaper = {
+            "filename": random_image.name,
+            "name": wallpaper_meta.get("name", random_image.stem),
+            "path": f"/api/wallpapers/single/{pack_name}/{random_image.name}",
+            "description": wallpaper_meta.get("description", ""),
+            "tags": wallpaper_meta.get("tags", []),
+        }
+
+        # Offer the packer's resolution variants; ?width= picks the smallest
+        # one that covers the screen (WebP unless ?format=jpeg)
+        with timed("index"):
+            variants = catalog.wallpaper_variants(
+                pack_name, random_image.name, wallpapers_root()
+            )
+        if variants:
+            wallpaper["variants"] = variants
+            width = request.args.get("width", type=int)
+            if width:
+                formats = (
+                    ("jpeg",)
+                    if request.args.get("format") == "jpeg"
+                    else ("webp", "jpeg")
+                )
+                wallpaper["best_variant"] = catalog.pick_variant(
+                    variants, width, formats
+                )
+
+        return jsonify({"success": True, "wallpaper": wallpaper})
     except Exception as e:
         return jsonify(
             {"success": False, "message": f"Error getting random wallpaper: {str(e)}"}
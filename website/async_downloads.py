@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+HueSurf Async Download Server
+
+Serves the large-transfer wallpaper endpoints on asyncio instead of a WSGI
+worker, so thousands of slow clients can pull pack zips from one process:
+
+    /api/wallpapers/pack/<pack_name>/download[?format=zip|tar.zst]
+    /api/wallpapers/single/<pack_name>/<filename>
+
+File bodies go out through loop.sendfile(), which uses os.sendfile() on plain
+sockets and otherwise falls back to chunked reads in the default executor, so
+the event loop never blocks on disk. Path resolution and on-the-fly pack zips
+come from catalog.py, the same code the Flask app uses. Put it behind the
+same reverse proxy as passenger_wsgi.py and route the two URL patterns here.
+
+Usage:
+    python website/async_downloads.py [--host 127.0.0.1] [--port 5001]
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+import catalog
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: "OK",
+    206: "Partial Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class DownloadServer:
+    def __init__(self, host="127.0.0.1", port=5001, header_timeout=15.0):
+        """
+        Initialize the download server
+
+        Args:
+            host: Interface to bind
+            port: TCP port to bind
+            header_timeout: Seconds a client gets to send its request headers
+        """
+        self.host = host
+        self.port = port
+        self.header_timeout = header_timeout
+        self.active_transfers = 0
+
+    async def serve_forever(self):
+        """Accept connections until cancelled"""
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, backlog=4096
+        )
+        logger.info(f"Serving wallpaper downloads on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """Serve a single request, then close the connection"""
+        try:
+            method, url, headers = await asyncio.wait_for(
+                self.read_request(reader), self.header_timeout
+            )
+            await self.dispatch(writer, method, url, headers)
+        except HTTPError as e:
+            await self.send_error(writer, e.status, e.message, e.headers)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        except (ConnectionError, BrokenPipeError):
+            logger.debug("Client disconnected mid-transfer")
+        except Exception as e:
+            logger.error(f"Error serving download: {e}")
+            await self.send_error(writer, 500, f"Error serving download: {e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def read_request(self, reader):
+        """Parse the request line and headers"""
+        request_line = (await reader.readuntil(b"\r\n")).decode("latin-1").strip()
+        try:
+            method, target, _version = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+            if line == "\r\n":
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        return method.upper(), urlsplit(target), headers
+
+    async def dispatch(self, writer, method, url, headers):
+        """Route a request to the pack or single-wallpaper handler"""
+        if method not in ("GET", "HEAD"):
+            raise HTTPError(405, f"Method {method} not allowed")
+
+        path = url.path
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if len(parts) == 5 and parts[:3] == ["api", "wallpapers", "pack"]:
+            if parts[4] == "download":
+                archive_format = parse_qs(url.query).get("format", [None])[0]
+                return await self.send_pack(
+                    writer, method, headers, parts[3], archive_format
+                )
+        if len(parts) == 5 and parts[:3] == ["api", "wallpapers", "single"]:
+            return await self.send_wallpaper(writer, method, headers, *parts[3:])
+
+        raise HTTPError(404, f"No download route for {path}")
+
+    async def send_pack(self, writer, method, headers, pack_name, archive_format=None):
+        """
+        Send a prebuilt pack archive (the format asked for, or whichever the
+        packer built), or build a zip from assets
+        """
+        if archive_format and archive_format not in catalog.ARCHIVE_MIMETYPES:
+            raise HTTPError(400, f"Unknown archive format '{archive_format}'")
+        # Resolved once, so a publish during the request can't switch versions
+        static_path, static_format = catalog.static_pack_archive(
+            pack_name, archive_format, catalog.published_dir()
+        )
+        if static_path is not None:
+            return await self.send_path(
+                writer,
+                method,
+                headers,
+                static_path,
+                catalog.pack_download_name(pack_name, static_format),
+                catalog.ARCHIVE_MIMETYPES[static_format],
+            )
+        # Only zips can be built on the fly
+        if archive_format == "tar.zst":
+            raise HTTPError(404, f"No tar.zst archive of '{pack_name}'")
+
+        download_name = catalog.pack_download_name(pack_name)
+
+        pack_dir = catalog.asset_pack_dir(pack_name)
+        if pack_dir is None:
+            raise HTTPError(404, f"Wallpaper pack '{pack_name}' not found")
+
+        # Zip building is blocking I/O and CPU, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        temp_dir = tempfile.mkdtemp()
+        try:
+            zip_path = await loop.run_in_executor(
+                None,
+                catalog.build_pack_zip,
+                pack_dir,
+                pack_name,
+                Path(temp_dir) / download_name,
+            )
+            await self.send_path(
+                writer, method, headers, zip_path, download_name, "application/zip"
+            )
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    async def send_wallpaper(self, writer, method, headers, pack_name, filename):
+        """Send a single wallpaper from assets"""
+        file_path = catalog.asset_wallpaper_path(pack_name, filename)
+        if file_path is None:
+            raise HTTPError(
+                404, f"Wallpaper '{filename}' not found in pack '{pack_name}'"
+            )
+        mimetype = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        await self.send_path(writer, method, headers, file_path, filename, mimetype)
+
+    async def send_path(
+        self, writer, method, headers, file_path, download_name, mimetype
+    ):
+        """Stream a file to the client, honouring a single byte range"""
+        loop = asyncio.get_running_loop()
+        f = await loop.run_in_executor(None, open, file_path, "rb")
+        try:
+            # Size of the opened file, which a publish can't swap out
+            size = (await loop.run_in_executor(None, os.fstat, f.fileno())).st_size
+            start, end = self.parse_range(headers.get("range"), size)
+            status = 206 if headers.get("range") else 200
+
+            response_headers = {
+                "Content-Type": mimetype,
+                "Content-Length": str(end - start),
+                "Content-Disposition": (
+                    f"attachment; filename*=UTF-8''{quote(download_name)}"
+                ),
+                "Accept-Ranges": "bytes",
+            }
+            if status == 206:
+                response_headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+            await self.send_head(writer, status, response_headers)
+
+            if method == "GET" and end > start:
+                self.active_transfers += 1
+                try:
+                    await loop.sendfile(writer.transport, f, start, end - start)
+                finally:
+                    self.active_transfers -= 1
+        finally:
+            f.close()
+
+    def parse_range(self, range_header, size):
+        """Return the [start, end) byte span requested by a Range header"""
+        if not range_header:
+            return 0, size
+        # A 416 tells the client the file's size (RFC 9110, 15.5.17)
+        unsatisfiable = {"Content-Range": f"bytes */{size}"}
+        unit, _, spec = range_header.partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            raise HTTPError(416, "Only single byte ranges are supported", unsatisfiable)
+        first, _, last = spec.strip().partition("-")
+        try:
+            if first:
+                start = int(first)
+                end = int(last) + 1 if last else size
+            else:
+                start = max(size - int(last), 0)
+                end = size
+        except ValueError:
+            raise HTTPError(416, f"Invalid range: {range_header}", unsatisfiable)
+        end = min(end, size)
+        if start >= end:
+            raise HTTPError(
+                416, f"Range not satisfiable: {range_header}", unsatisfiable
+            )
+        return start, end
+
+    async def send_head(self, writer, status, headers):
+        """Write the status line and headers"""
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def send_error(self, writer, status, message, headers=None):
+        """Send a JSON error body matching the Flask API"""
+        body = json.dumps({"success": False, "message": message}).encode("utf-8")
+        try:
+            await self.send_head(
+                writer,
+                status,
+                {
+                    "Content-Type": "application/json",
+                    "Content-Length": str(len(body)),
+                    **(headers or {}),
+                },
+            )
+            writer.write(body)
+            await writer.drain()
+        except (ConnectionError, BrokenPipeError):
+            pass
+
+
+def raise_open_file_limit():
+    """Lift the soft fd limit to the hard limit so many transfers can be open"""
+    try:
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve HueSurf wallpaper downloads with asyncio"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=5001, help="Port to bind")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+
+    args = parser.parse_args()
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+
+    raise_open_file_limit()
+    try:
+        asyncio.run(DownloadServer(args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 Download server stopped")
+
+
+if __name__ == "__main__":
+    main()
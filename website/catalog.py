@@ -0,0 +1,249 @@
+"""
+HueSurf Wallpaper Catalog
+
+Path resolution and pack building shared by the Flask app (app.py) and the
+asyncio download server (async_downloads.py), so both serve exactly the same
+files for the same URLs.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import json
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+from catalog_reader import INDEX_FILENAME, CatalogIndex
+from zip_policy import CompressionPolicy, write_text_entry
+
+WEBSITE_DIR = Path(__file__).parent
+STATIC_WALLPAPERS_DIR = WEBSITE_DIR / "static" / "wallpapers"
+ASSETS_WALLPAPERS_DIR = WEBSITE_DIR.parent / "assets" / "Wallpapers"
+
+# Image formats served from the assets fallback
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp"]
+
+# Prebuilt pack archive formats, in lookup order, and their MIME types
+ARCHIVE_MIMETYPES = {"zip": "application/zip", "tar.zst": "application/zstd"}
+
+
+_index_lock = threading.Lock()
+_index = None
+
+
+def published_dir():
+    """
+    Packer output directory, resolved through the symlink the packer swaps
+    when it publishes a new output version
+
+    A request resolves it once and reads every file from the result, so a
+    publish in the middle of the request can't mix two versions.
+    """
+    return Path(os.path.realpath(STATIC_WALLPAPERS_DIR))
+
+
+def get_catalog_index(root=None):
+    """
+    Mapped catalog index, or None if the packer hasn't written one
+
+    The file is re-mapped when the packer swaps in a new one; requests that
+    still hold the previous index keep reading the old mapping.
+
+    Args:
+        root: Output directory to read from (default: STATIC_WALLPAPERS_DIR)
+    """
+    global _index
+    index_path = (root or STATIC_WALLPAPERS_DIR) / INDEX_FILENAME
+    try:
+        stat = os.stat(index_path)
+    except FileNotFoundError:
+        return None
+
+    def is_current(index):
+        return index is not None and (index.stat.st_ino, index.stat.st_mtime_ns) == (
+            stat.st_ino,
+            stat.st_mtime_ns,
+        )
+
+    index = _index
+    if is_current(index):
+        return index
+
+    with _index_lock:
+        if not is_current(_index):
+            _index = CatalogIndex(index_path)
+        return _index
+
+
+def packs_response_body(index):
+    """/api/wallpapers/packs JSON spliced from the index without decoding it"""
+    packs = index.packs_json()
+    return b"".join(
+        [
+            index.meta[:-1],
+            b',"packs":[',
+            b",".join(packs),
+            b'],"success":true,"total_packs":',
+            str(len(packs)).encode("ascii"),
+            b"}",
+        ]
+    )
+
+
+def wallpapers_response_body(index):
+    """/api/wallpapers/all JSON spliced from the index without decoding it"""
+    wallpapers = index.wallpapers_json()
+    return b"".join(
+        [
+            b'{"success":true,"total":',
+            str(len(wallpapers)).encode("ascii"),
+            b',"wallpapers":[',
+            b",".join(wallpapers),
+            b"]}",
+        ]
+    )
+
+
+def wallpaper_variants(pack_name, filename, root=None):
+    """Resolution variants the packer rendered for a wallpaper, or []"""
+    index = get_catalog_index(root)
+    if index is None:
+        return []
+    record = index.wallpaper_json(pack_id(pack_name), filename)
+    if record is None:
+        return []
+    return json.loads(record).get("variants", [])
+
+
+def pick_variant(variants, min_width, formats=("webp", "jpeg")):
+    """
+    Smallest variant at least min_width wide, in the first accepted format
+
+    Falls back to the widest variant when none is wide enough; None if there
+    is no variant in an accepted format.
+    """
+    for fmt in formats:
+        candidates = [variant for variant in variants if variant["format"] == fmt]
+        if not candidates:
+            continue
+        adequate = [variant for variant in candidates if variant["width"] >= min_width]
+        if adequate:
+            return min(adequate, key=lambda variant: variant["width"])
+        return max(candidates, key=lambda variant: variant["width"])
+    return None
+
+
+def pack_id(pack_name):
+    """Convert a pack name to the id used for static file names"""
+    return pack_name.lower().replace(" ", "_")
+
+
+def is_safe_name(name):
+    """Check that a URL segment names a single directory entry"""
+    return (
+        bool(name)
+        and name not in (".", "..")
+        and not any(sep in name for sep in ("/", "\\", "\0"))
+    )
+
+
+def static_pack_archive(pack_name, archive_format=None, root=None):
+    """
+    Prebuilt archive of a pack, as (path, format), or (None, None)
+
+    Args:
+        archive_format: Format to look for (default: whichever the packer
+            built)
+    """
+    formats = [archive_format] if archive_format else list(ARCHIVE_MIMETYPES)
+    for fmt in formats:
+        path = (root or STATIC_WALLPAPERS_DIR) / "packs" / f"{pack_id(pack_name)}.{fmt}"
+        if path.exists():
+            return path, fmt
+    return None, None
+
+
+def static_preview_path(pack_name, root=None, fmt="jpg"):
+    """Path of the prebuilt preview for a pack, "jpg" or "webp" (may not exist)"""
+    return (root or STATIC_WALLPAPERS_DIR) / "previews" / f"{pack_id(pack_name)}.{fmt}"
+
+
+def asset_pack_dir(pack_name):
+    """Source directory of a pack in assets, or None if it doesn't exist"""
+    if not is_safe_name(pack_name):
+        return None
+    pack_dir = ASSETS_WALLPAPERS_DIR / pack_name
+    if not pack_dir.is_dir():
+        return None
+    return pack_dir
+
+
+def asset_wallpaper_path(pack_name, filename):
+    """Source file of a single wallpaper, or None if it doesn't exist"""
+    pack_dir = asset_pack_dir(pack_name)
+    if pack_dir is None or not is_safe_name(filename):
+        return None
+    file_path = pack_dir / filename
+    if not file_path.is_file():
+        return None
+    return file_path
+
+
+def pack_download_name(pack_name, archive_format="zip"):
+    """File name offered to the browser for a pack download"""
+    return f"{pack_name}_wallpapers.{archive_format}"
+
+
+def default_pack_metadata(pack_dir, pack_name):
+    """Metadata written into on-the-fly zips of packs without pack_info.json"""
+    return {
+        "pack_name": pack_name,
+        "version": "1.0.0",
+        "author": "HueSurf Team",
+        "description": f"{pack_name} wallpaper pack for HueSurf browser",
+        "shuffle_enabled": True,
+        "shuffle_on_new_tab": True,
+        "count": len(
+            list(pack_dir.glob("*.png"))
+            + list(pack_dir.glob("*.jpg"))
+            + list(pack_dir.glob("*.jpeg"))
+        ),
+        "settings": {
+            "shuffle_interval": "new_tab",
+            "transition_effect": "fade",
+            "transition_duration": 500,
+            "allow_user_shuffle": True,
+            "remember_last_wallpaper": False,
+        },
+    }
+
+
+def build_pack_zip(pack_dir, pack_name, zip_path):
+    """Build a pack zip straight from the assets directory"""
+    policy = CompressionPolicy()
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        # Add all image files from the pack; already-compressed formats are
+        # stored, so building a zip per request costs little CPU
+        for file_path in pack_dir.rglob("*"):
+            if file_path.is_file() and file_path.suffix.lower() in IMAGE_EXTENSIONS:
+                arcname = f"{pack_name}/{file_path.relative_to(pack_dir)}"
+                compress_type, compresslevel = policy.choose(arcname)
+                zipf.write(file_path, arcname, compress_type, compresslevel)
+
+        # Add metadata
+        pack_info_path = pack_dir / "pack_info.json"
+        if pack_info_path.exists():
+            with open(pack_info_path, "r") as f:
+                metadata = json.load(f)
+        else:
+            metadata = default_pack_metadata(pack_dir, pack_name)
+        write_text_entry(
+            zipf,
+            f"{pack_name}/pack_info.json",
+            json.dumps(metadata, indent=2),
+            policy,
+        )
+
+    return zip_path
@@ -0,0 +1,198 @@
+"""
+HueSurf Catalog Index Reader
+
+Fixed-layout binary index of the wallpaper catalog. The packer writes it next
+to manifest.json (scripts/catalog_index.py); every website worker mmaps the
+same file read-only and answers /api/wallpapers/packs and /api/wallpapers/all
+by slicing pre-encoded JSON out of it, so there is one copy in the page cache
+instead of one parsed copy per worker.
+
+The format lives here, with the website that reads it, so the site doesn't
+need scripts/ deployed next to it.
+
+Layout (little-endian):
+
+    header        HEADER struct, see below
+    pack table    pack_count x PACK_RECORD, in manifest order
+    id order      pack_count x u32 pack table indices, sorted by pack id
+    wallpapers    wallpaper_count x WALLPAPER_RECORD, grouped by pack and
+                  sorted by filename within each pack
+    strings       UTF-8 ids, filenames and compact JSON records
+
+All (offset, length) pairs point into the string section. The index is
+replaced with os.replace(), so readers either see the old file or the new
+one; a mapped old file stays valid until its reader drops it.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+
+MAGIC = b"HSCATIDX"
+FORMAT_VERSION = 1
+INDEX_FILENAME = "catalog.idx"
+
+# magic, version, pack_count, wallpaper_count, meta (off, len),
+# pack table, id order, wallpaper table and string section offsets
+HEADER = struct.Struct("<8sIIIIIQQQQ")
+# id (off, len), json (off, len), first wallpaper index, wallpaper count
+PACK_RECORD = struct.Struct("<IIIIII")
+# filename (off, len), json (off, len)
+WALLPAPER_RECORD = struct.Struct("<IIII")
+ORDER_ENTRY = struct.Struct("<I")
+
+
+def encode_json(value):
+    """Encode a record the same way Flask's jsonify does"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def pack_api_record(pack):
+    """Shape a manifest pack entry as returned by /api/wallpapers/packs"""
+    return {
+        "id": pack.get("id", pack.get("pack_name", "").lower().replace(" ", "_")),
+        "name": pack.get("name", pack.get("pack_name")),
+        "count": pack.get("count", 0),
+        "size_mb": pack.get("size_mb", 0),
+        "preview": pack.get("preview_url", ""),
+        "preview_webp": pack.get("preview_webp_url"),
+        "description": pack.get("description", ""),
+        "shuffle_enabled": pack.get("shuffle_enabled", False),
+        "shuffle_on_new_tab": pack.get("shuffle_on_new_tab", False),
+        "download_url": pack.get("download_url", ""),
+        "category": pack.get("category", "General"),
+        "author": pack.get("author", "Unknown"),
+        "version": pack.get("version", "1.0.0"),
+        "created_date": pack.get("created_date"),
+        "colors": pack.get("colors", {}),
+        "recommended_for": pack.get("recommended_for", []),
+        "min_resolution": pack.get("min_resolution", "1920x1080"),
+        "license": pack.get("license", "MIT"),
+        "settings": pack.get("settings", {}),
+        "wallpapers": pack.get("wallpapers", []),
+        "size_bytes": pack.get("size_bytes", 0),
+        "hash": pack.get("hash", ""),
+        "packed_date": pack.get("packed_date"),
+        "variants": pack.get("variants", {}),
+        "palette": pack.get("palette", {}),
+        "volumes": pack.get("volumes", []),
+        "archive_format": pack.get("archive_format", "zip"),
+        "index_url": pack.get("index_url"),
+    }
+
+
+class CatalogIndex:
+    """Read-only view over a mapped catalog index"""
+
+    def __init__(self, index_path):
+        with open(index_path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            self.pack_count,
+            self.wallpaper_count,
+            meta_offset,
+            meta_length,
+            self.pack_table_offset,
+            self.order_offset,
+            self.wallpaper_table_offset,
+            self.string_offset,
+        ) = HEADER.unpack_from(self.buffer, 0)
+
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(
+                f"Not a version {FORMAT_VERSION} catalog index: {index_path}"
+            )
+        self.meta = self.string(meta_offset, meta_length)
+
+    def string(self, offset, length):
+        """Bytes of a string section entry"""
+        start = self.string_offset + offset
+        return self.buffer[start : start + length]
+
+    def pack_record(self, index):
+        return PACK_RECORD.unpack_from(
+            self.buffer, self.pack_table_offset + index * PACK_RECORD.size
+        )
+
+    def pack_id(self, index):
+        id_offset, id_length = self.pack_record(index)[:2]
+        return self.string(id_offset, id_length)
+
+    def packs_json(self):
+        """Encoded /api/wallpapers/packs records in manifest order"""
+        return [self.string(*self.pack_record(i)[2:4]) for i in range(self.pack_count)]
+
+    def find_pack(self, pack_id):
+        """Pack table index for an id, or None"""
+        key = pack_id.encode("utf-8")
+        order = _Sequence(
+            self.pack_count,
+            lambda i: self.pack_id(
+                ORDER_ENTRY.unpack_from(
+                    self.buffer, self.order_offset + i * ORDER_ENTRY.size
+                )[0]
+            ),
+        )
+        position = bisect_left(order, key)
+        if position < self.pack_count and order[position] == key:
+            return ORDER_ENTRY.unpack_from(
+                self.buffer, self.order_offset + position * ORDER_ENTRY.size
+            )[0]
+        return None
+
+    def pack_json(self, pack_id):
+        """Encoded pack record for an id, or None"""
+        index = self.find_pack(pack_id)
+        if index is None:
+            return None
+        return self.string(*self.pack_record(index)[2:4])
+
+    def wallpaper_record(self, index):
+        return WALLPAPER_RECORD.unpack_from(
+            self.buffer, self.wallpaper_table_offset + index * WALLPAPER_RECORD.size
+        )
+
+    def wallpapers_json(self):
+        """Encoded /api/wallpapers/all records"""
+        return [
+            self.string(*self.wallpaper_record(i)[2:4])
+            for i in range(self.wallpaper_count)
+        ]
+
+    def wallpaper_json(self, pack_id, filename):
+        """Encoded record of one wallpaper in a pack, or None"""
+        index = self.find_pack(pack_id)
+        if index is None:
+            return None
+        first, count = self.pack_record(index)[4:6]
+        filenames = _Sequence(
+            count, lambda i: self.string(*self.wallpaper_record(first + i)[:2])
+        )
+        key = filename.encode("utf-8")
+        position = bisect_left(filenames, key)
+        if position < count and filenames[position] == key:
+            return self.string(*self.wallpaper_record(first + position)[2:4])
+        return None
+
+
+class _Sequence:
+    """Lazy indexable view so bisect can search the mapped tables"""
+
+    def __init__(self, length, getter):
+        self.length = length
+        self.getter = getter
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.getter(index)
@@ -0,0 +1,267 @@
+"""
+HueSurf Contact Queue
+
+Contact form submissions are handed to a bounded in-process queue and a
+background writer thread batch-inserts them into SQLite (WAL mode), so
+/api/contact never waits on disk or SMTP. An optional delivery stage (e.g.
+SMTPDelivery) runs on the writer thread after each batch is committed; rows
+it fails to deliver keep delivered_at NULL and are retried on next start.
+
+A batch that fails to insert (a locked or full database, say) is kept and
+retried with exponential backoff. Meanwhile the queue fills up and submit()
+starts refusing, so clients are asked to retry instead of being told a
+message was received that can't be stored.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import logging
+import queue
+import smtplib
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contact_submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    message TEXT NOT NULL,
+    remote_addr TEXT,
+    submitted_at TEXT NOT NULL,
+    delivered_at TEXT
+)
+"""
+
+# Sentinel telling the writer to flush and exit
+_STOP = object()
+
+
+class ContactQueue:
+    def __init__(
+        self,
+        db_path,
+        maxsize=1000,
+        batch_size=100,
+        flush_interval=1.0,
+        put_timeout=0.05,
+        delivery=None,
+        retry_delay=0.5,
+        max_retry_delay=30.0,
+    ):
+        """
+        Initialize the contact queue
+
+        Args:
+            db_path: SQLite database file
+            maxsize: Submissions held in memory before submit() refuses more
+            batch_size: Maximum submissions per insert transaction
+            flush_interval: Seconds the writer waits to fill a batch
+            put_timeout: Seconds submit() waits for room before giving up
+            delivery: Optional callable taking a list of submission dicts
+            retry_delay: Seconds before the first retry of a failed insert;
+                doubles with every failure
+            max_retry_delay: Longest wait between insert retries
+        """
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.delivery = delivery
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        """Start the writer thread if it isn't running"""
+        with self.start_lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(
+                target=self._run, name="contact-writer", daemon=True
+            )
+            self.thread.start()
+
+    def submit(self, name, email, message, remote_addr=None):
+        """
+        Queue a submission
+
+        Raises:
+            queue.Full: The writer is behind; the caller should ask the client
+                to retry later
+        """
+        self.start()
+        self.queue.put(
+            {
+                "name": name,
+                "email": email,
+                "message": message,
+                "remote_addr": remote_addr,
+                "submitted_at": datetime.now(timezone.utc).isoformat(),
+            },
+            timeout=self.put_timeout,
+        )
+
+    def stop(self, timeout=10.0):
+        """Flush everything queued so far and stop the writer"""
+        if not self.thread or not self.thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    def connect(self):
+        """Open the database in WAL mode and make sure the schema exists"""
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+        return connection
+
+    def _run(self):
+        """Writer loop: collect a batch, insert it in one transaction, deliver"""
+        connection = self.connect()
+        try:
+            self._deliver_pending(connection)
+            stopping = False
+            while not stopping:
+                batch, stopping = self._collect_batch()
+                if batch:
+                    self._write_batch(connection, batch)
+        finally:
+            connection.close()
+
+    def _collect_batch(self):
+        """Block for the first submission, then take what arrives in the window"""
+        first = self.queue.get()
+        if first is _STOP:
+            return self._drain(), True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch + self._drain(), True
+            batch.append(item)
+        return batch, False
+
+    def _drain(self):
+        """Everything still queued, without blocking"""
+        items = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not _STOP:
+                items.append(item)
+
+    def _write_batch(self, connection, batch):
+        """Insert a batch in one transaction, retrying until it's stored"""
+        delay = self.retry_delay
+        attempt = 1
+        while True:
+            try:
+                with connection:
+                    for submission in batch:
+                        cursor = connection.execute(
+                            "INSERT INTO contact_submissions "
+                            "(name, email, message, remote_addr, submitted_at) "
+                            "VALUES (:name, :email, :message, :remote_addr, "
+                            ":submitted_at)",
+                            submission,
+                        )
+                        submission["id"] = cursor.lastrowid
+                break
+            except sqlite3.Error as e:
+                logger.error(
+                    f"Failed to store {len(batch)} contact submissions "
+                    f"(attempt {attempt}), retrying in {delay:.1f}s: {e}"
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                attempt += 1
+
+        logger.debug(f"Stored {len(batch)} contact submissions")
+        self._deliver(connection, batch)
+
+    def _deliver_pending(self, connection):
+        """Retry delivery of rows a previous run stored but never delivered"""
+        if not self.delivery:
+            return
+        connection.row_factory = sqlite3.Row
+        rows = connection.execute(
+            "SELECT * FROM contact_submissions WHERE delivered_at IS NULL ORDER BY id"
+        ).fetchall()
+        connection.row_factory = None
+        for start in range(0, len(rows), self.batch_size):
+            self._deliver(
+                connection, [dict(row) for row in rows[start : start + self.batch_size]]
+            )
+
+    def _deliver(self, connection, batch):
+        if not self.delivery or not batch:
+            return
+        try:
+            self.delivery(batch)
+        except Exception as e:
+            logger.error(f"Failed to deliver {len(batch)} contact submissions: {e}")
+            return
+
+        with connection:
+            connection.executemany(
+                "UPDATE contact_submissions SET delivered_at = ? WHERE id = ?",
+                [
+                    (datetime.now(timezone.utc).isoformat(), submission["id"])
+                    for submission in batch
+                ],
+            )
+
+
+class SMTPDelivery:
+    def __init__(self, host, port, sender, recipient, timeout=10.0):
+        """
+        Email each submission over one SMTP connection per batch
+
+        Point host/port at a local stand-in such as
+        `python -m aiosmtpd -n -l localhost:1025` to try it out.
+        """
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.timeout = timeout
+
+    def __call__(self, batch):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            for submission in batch:
+                smtp.send_message(self.build_message(submission))
+
+    def build_message(self, submission):
+        message = EmailMessage()
+        message["Subject"] = f"HueSurf contact: {submission['name']}"
+        message["From"] = self.sender
+        message["To"] = self.recipient
+        message["Reply-To"] = submission["email"]
+        message.set_content(
+            f"From: {submission['name']} <{submission['email']}>\n"
+            f"Submitted: {submission['submitted_at']}\n\n"
+            f"{submission['message']}\n"
+        )
+        return message
@@ -0,0 +1,94 @@
+"""
+HueSurf Zip Compression Policy
+
+Decides how each zip entry is compressed: formats that are already
+compressed (PNG, JPEG, WebP) are stored, text entries get DEFLATE at level 9
+and anything else the default level. With trial compression on, the first
+chunk of each file is deflated first and the entry is only compressed if
+that saves more than a threshold.
+
+Used by the packer (scripts/pack_archive.py) and by the website's on-the-fly
+pack zips, so it ships with the website.
+
+Author: HueSurf Team
+License: MIT
+"""
+
+import stat
+import time
+import zipfile
+import zlib
+
+# Formats whose payload is already compressed; deflating them saves ~nothing
+PRECOMPRESSED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".zip", ".zst"}
+
+# Small metadata entries that compress well
+TEXT_EXTENSIONS = {".json", ".md", ".txt"}
+
+
+def normalize_entry(zinfo, date_time):
+    """Strip everything host- or time-dependent from an entry header"""
+    zinfo.date_time = date_time
+    zinfo.create_system = 3
+    zinfo.external_attr = (stat.S_IFREG | 0o644) << 16
+
+
+class CompressionPolicy:
+    def __init__(self, level=6, text_level=9, trial=False, min_savings=0.05):
+        """
+        Initialize the compression policy
+
+        Args:
+            level: DEFLATE level for entries that aren't text or precompressed
+            text_level: DEFLATE level for text entries (pack_info.json, README)
+            trial: Decide per file by deflating a sample of its first chunk
+            min_savings: Fraction of the sample a trial must save to compress
+        """
+        self.level = level
+        self.text_level = text_level
+        self.trial = trial
+        self.min_savings = min_savings
+
+    def config(self):
+        """Settings that change the archive bytes, for build cache digests"""
+        return {
+            "level": self.level,
+            "text_level": self.text_level,
+            "trial": self.trial,
+            "min_savings": self.min_savings,
+        }
+
+    def choose(self, arcname, sample=None):
+        """
+        Pick the compression for an entry
+
+        Args:
+            arcname: Entry name; its extension decides without a trial
+            sample: Leading bytes of the entry, used for trial compression
+
+        Returns:
+            (compress_type, compresslevel) tuple
+        """
+        suffix = "." + arcname.rsplit(".", 1)[-1].lower() if "." in arcname else ""
+        if suffix in TEXT_EXTENSIONS:
+            return zipfile.ZIP_DEFLATED, self.text_level
+        if self.trial and sample:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            compressed = len(compressor.compress(sample) + compressor.flush())
+            if 1 - compressed / len(sample) > self.min_savings:
+                return zipfile.ZIP_DEFLATED, self.level
+            return zipfile.ZIP_STORED, None
+        if suffix in PRECOMPRESSED_EXTENSIONS:
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.level
+
+
+def write_text_entry(zipf, arcname, text, policy, date_time=None):
+    """Write an in-memory text entry with the policy's compression"""
+    zinfo = zipfile.ZipInfo(arcname, time.localtime(time.time())[:6])
+    # Same mode ZipFile.writestr() gives entries added by name
+    zinfo.external_attr = 0o600 << 16
+    if date_time:
+        normalize_entry(zinfo, date_time)
+    zinfo.compress_type, compresslevel = policy.choose(arcname)
+    zipf.writestr(zinfo, text, zinfo.compress_type, compresslevel)